@@ -0,0 +1,168 @@
+# Shared I2C bus arbiter.
+#
+# Sensor transactions go straight out on the bus. Display transfers are
+# deferred by their drivers and drained in page-sized chunks in the gaps
+# between sensor reads, so a full OLED frame never holds the bus for longer
+# than one chunk.
+
+# pylint: disable=import-error
+from utime import ticks_us, ticks_diff
+# pylint: enable=import-error
+
+# Time budget for draining deferred chunks per service() call
+DEFAULT_BUDGET_US = 1000
+
+
+class ArbitratedI2C:
+    """machine.I2C compatible handle for one client of an I2CArbiter."""
+    def __init__(self, arbiter, name: str):
+        self._arbiter = arbiter
+        self._i2c = arbiter.i2c
+        self.name = name
+
+        # Occupancy counters
+        self.transactions = 0
+        self.bytes = 0
+        self.busy_us = 0
+
+    def _account(self, start: int, nbytes: int):
+        self.busy_us += ticks_diff(ticks_us(), start)
+        self.transactions += 1
+        self.bytes += nbytes
+
+    def defer(self, writer) -> bool:
+        """
+        Queue a chunked writer on the arbiter. The writer must implement
+        `write_chunk()`, returning True while chunks remain. Returns False when
+        interleaving is disabled, in which case the caller must write
+        synchronously.
+        """
+        return self._arbiter.defer(writer)
+
+    def scan(self):
+        return self._i2c.scan()
+
+    def readfrom(self, addr, nbytes, stop=True):
+        start = ticks_us()
+        data = self._i2c.readfrom(addr, nbytes, stop)
+        self._account(start, nbytes)
+        return data
+
+    def readfrom_into(self, addr, buf, stop=True):
+        start = ticks_us()
+        self._i2c.readfrom_into(addr, buf, stop)
+        self._account(start, len(buf))
+
+    def writeto(self, addr, buf, stop=True):
+        start = ticks_us()
+        acks = self._i2c.writeto(addr, buf, stop)
+        self._account(start, len(buf))
+        return acks
+
+    def writevto(self, addr, vector, stop=True):
+        start = ticks_us()
+        acks = self._i2c.writevto(addr, vector, stop)
+        nbytes = 0
+        for buf in vector:
+            nbytes += len(buf)
+        self._account(start, nbytes)
+        return acks
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        start = ticks_us()
+        data = self._i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+        self._account(start, nbytes)
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        start = ticks_us()
+        self._i2c.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        self._account(start, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        start = ticks_us()
+        self._i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+        self._account(start, len(buf))
+
+
+class I2CArbiter:
+    """Owner of a shared I2C bus, giving sensor reads priority over display transfers."""
+    def __init__(self, i2c, budget_us: int=DEFAULT_BUDGET_US):
+        self.i2c = i2c
+        self.budget_us = budget_us
+        # Deferred writers are only queued while interleaving is enabled
+        self.interleave = False
+        self.clients: dict[str, ArbitratedI2C] = {}
+        self._pending = []
+        self._since = ticks_us()
+
+    def client(self, name: str) -> ArbitratedI2C:
+        if (handle := self.clients.get(name)) is None:
+            handle = ArbitratedI2C(self, name)
+            self.clients[name] = handle
+        return handle
+
+    def defer(self, writer) -> bool:
+        if not self.interleave:
+            return False
+        if writer not in self._pending:
+            self._pending.append(writer)
+        return True
+
+    @property
+    def pending(self) -> bool:
+        """
+        Whether deferred chunks are still waiting for the bus.
+        """
+        return len(self._pending) > 0
+
+    def service(self, budget_us: int=None) -> int:
+        """
+        Drain deferred chunks until the time budget is spent. At least one
+        chunk is sent per call so queued transfers always make progress.
+        Returns the number of chunks sent.
+        """
+        if budget_us is None:
+            budget_us = self.budget_us
+        pending = self._pending
+        chunks = 0
+        start = ticks_us()
+        while pending:
+            writer = pending[0]
+            if not writer.write_chunk():
+                pending.pop(0)
+            chunks += 1
+            if ticks_diff(ticks_us(), start) >= budget_us:
+                break
+        return chunks
+
+    def flush(self):
+        """
+        Send every deferred chunk, blocking until the queue is empty.
+        """
+        pending = self._pending
+        while pending:
+            if not pending[0].write_chunk():
+                pending.pop(0)
+
+    def occupancy(self) -> dict[str, tuple[int, int, int, int]]:
+        """
+        Bus occupancy per client since the last reset, as a dict of
+        name -> (transactions, bytes, busy us, busy per mille).
+        """
+        elapsed = max(1, ticks_diff(ticks_us(), self._since))
+        return {
+            name: (c.transactions, c.bytes, c.busy_us, c.busy_us * 1000 // elapsed)
+            for name, c in self.clients.items()
+        }
+
+    def reset_stats(self):
+        for c in self.clients.values():
+            c.transactions = 0
+            c.bytes = 0
+            c.busy_us = 0
+        self._since = ticks_us()
+
+    def report(self):
+        for name, (transactions, nbytes, busy_us, permille) in self.occupancy().items():
+            print(f'[I2C ] {name}: {transactions} txn, {nbytes} B, {busy_us} us ({permille / 10}%)')
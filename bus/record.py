@@ -0,0 +1,483 @@
+# Raw bus traffic recorder.
+#
+# RecordingI2C and RecordingSPI sit between the machine bus objects and the
+# drivers, like the trace proxies, and log every transaction with its data;
+# RecordingPin logs the edges seen by a pin IRQ handler. Records are packed
+# into a preallocated ring and written to flash in chunks from poll(), so the
+# loop never waits for a whole log write. If the ring fills up recording
+# stops, keeping the log a consistent prefix for replay (see sim/replay.py).
+# That is for good: a single burst of more than `size` bytes between two
+# poll() calls ends the log there, so size the ring for the largest burst
+# (a full OLED frame with write_data) and check `full_ms` after a run.
+# Logging doesn't allocate, except for the view of each chunk poll() writes
+# and the views splitting a record that wraps around the ring.
+#
+# The log starts with MAGIC, a version and a flags byte, followed by records
+#   type (u8), dt (u16, us since the previous record), device (u8),
+#   reg (u8), n (u16), payload
+# with device being an I2C address, an SPI device id or a pin, and reg the
+# register of a *_MEM transaction. READ payloads are the bytes read; WRITE
+# payloads are the bytes written, or absent without WRITE_DATA (n is still the
+# length). WRITE_READ payloads are the bytes read. Other records:
+#   TIME    payload: ticks_us (u32), before the first record and long gaps
+#   EDGE    reg: level, payload: ticks_us (u32) of the edge
+#   ERROR   reg: errno, n: type of the failed transaction, no payload
+#   REPEAT  device: period (1 or 2), n: count, no payload; `count` more
+#           records, each a copy of the one `period` records before it, dt
+#           being the time up to the last of them
+
+# pylint: disable=import-error
+from array import array
+
+import ustruct
+from utime import ticks_ms, ticks_us, ticks_diff
+# pylint: enable=import-error
+
+MAGIC = b'SKBUS'
+VERSION = 1
+
+# Flags
+WRITE_DATA = 0x01
+
+# Record types
+TIME = 0
+READ = 1
+WRITE = 2
+READ_MEM = 3
+WRITE_MEM = 4
+WRITE_READ = 5
+EDGE = 6
+ERROR = 7
+REPEAT = 8
+
+HEADER = '<BHBBH'
+HEADER_SIZE = 7
+
+# SPI device ids start here, above the 7-bit I2C addresses
+SPI_DEVICE = 0x80
+
+# Records up to this payload size are checked for repeats
+_SMALL = 8
+_EDGES = 32
+
+
+class BusRecorder:
+    """Chunked binary log of bus transactions and pin edges."""
+    def __init__(self, path: str, size: int=8192, chunk: int=512, flush_ms: int=100, write_data: bool=False):
+        self.path = path
+        self.chunk = chunk
+        self.flush_ms = flush_ms
+        self.write_data = write_data
+        self.recording = True
+        self.records = 0
+        self.written = 0
+        self.dropped = 0
+        # ticks_ms when the ring overflowed and recording stopped, or None
+        self.full_ms = None
+
+        self._ring = bytearray(size)
+        self._view = memoryview(self._ring)
+        self._head = 0
+        self._tail = 0
+        self._pending = 0
+        self._flushed = ticks_ms()
+
+        # Last two small records for repeat detection, the last one first
+        self._rec = bytearray(HEADER_SIZE + _SMALL)
+        # TIME and REPEAT records are built here, not to clobber _rec
+        self._meta = bytearray(HEADER_SIZE + 4)
+        # Prebuilt views per record length, slicing a memoryview allocates
+        self._rec_views = tuple(memoryview(self._rec)[:n] for n in range(HEADER_SIZE + _SMALL + 1))
+        self._header_view = memoryview(self._meta)[:HEADER_SIZE]
+        self._meta_view = memoryview(self._meta)
+        self._hist = [bytearray(HEADER_SIZE + _SMALL), bytearray(HEADER_SIZE + _SMALL)]
+        self._hist_len = array('i', (0, 0))
+        self._period = 0
+        self._repeats = 0
+        self._repeat_dt = 0
+
+        # Edges come from IRQ context and are only moved into the log by the
+        # main code, as (ticks_us, pin << 1 | level)
+        self._edges = array('i', (0 for _ in range(2 * _EDGES)))
+        self._edge_head = 0
+        self._edge_tail = 0
+
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._file.write(bytes((VERSION, WRITE_DATA if write_data else 0)))
+        self._last = ticks_us()
+        self._time(self._last)
+
+    def _stop(self):
+        # Out of room: stop, rather than leave a gap replay can't follow
+        if self.recording:
+            self.full_ms = ticks_ms()
+        self.recording = False
+        self.dropped += 1
+
+    def _put(self, data) -> bool:
+        n = len(data)
+        if self._pending + n > len(self._ring):
+            self._stop()
+            return False
+        ring = self._ring
+        head = self._head
+        size = len(ring)
+        if head + n <= size:
+            ring[head:head + n] = data
+        else:
+            # Wrapping, once per pass over the ring: two spans, the views of
+            # `data` they take are the only allocation
+            first = size - head
+            data = memoryview(data)
+            view = self._view
+            view[head:] = data[:first]
+            view[:n - first] = data[first:]
+        self._head = (head + n) % size
+        self._pending += n
+        return True
+
+    def _dt(self) -> int:
+        now = ticks_us()
+        dt = ticks_diff(now, self._last)
+        if dt > 0xffff:
+            self._time(now)
+            dt = 0
+        self._last = now
+        return dt
+
+    def _time(self, now: int):
+        self._forget()
+        rec = self._meta
+        ustruct.pack_into(HEADER, rec, 0, TIME, 0, 0, 0, 4)
+        ustruct.pack_into('<I', rec, HEADER_SIZE, now & 0xffffffff)
+        self._put(self._meta_view)
+
+    def _flush_repeat(self):
+        if not self._repeats:
+            return
+        rec = self._meta
+        ustruct.pack_into(HEADER, rec, 0, REPEAT, self._repeat_dt, self._period, 0, self._repeats)
+        self._put(self._header_view)
+        self._repeats = 0
+        self._repeat_dt = 0
+        self._period = 0
+
+    def _forget(self):
+        self._flush_repeat()
+        self._hist_len[0] = 0
+        self._hist_len[1] = 0
+
+    def _same(self, slot: int, n: int) -> bool:
+        # Compare the scratch record to a history slot, ignoring dt
+        if self._hist_len[slot] != n:
+            return False
+        rec = self._rec
+        hist = self._hist[slot]
+        if rec[0] != hist[0]:
+            return False
+        for i in range(3, n):
+            if rec[i] != hist[i]:
+                return False
+        return True
+
+    def _small(self, n: int, dt: int):
+        # Log the record in the scratch buffer, or count it as a repeat of
+        # the last one (AAAA) or the one before (ABAB)
+        period = 0
+        if self._period != 2 and self._same(0, n):
+            period = 1
+        elif self._period != 1 and self._same(1, n):
+            period = 2
+        hist = self._hist
+        if period:
+            if self._repeat_dt + dt > 0xffff or self._repeats == 0xffff:
+                self._flush_repeat()
+            self._period = period
+            self._repeats += 1
+            self._repeat_dt += dt
+            if period == 2:
+                hist[0], hist[1] = hist[1], hist[0]
+                lens = self._hist_len
+                lens[0], lens[1] = lens[1], lens[0]
+            return
+        self._flush_repeat()
+        view = self._rec_views[n]
+        if self._put(view):
+            self.records += 1
+        hist[0], hist[1] = hist[1], hist[0]
+        hist[0][:n] = view
+        self._hist_len[1] = self._hist_len[0]
+        self._hist_len[0] = n
+
+    def record(self, rtype: int, device: int, reg: int, data, n: int=None):
+        """
+        Log a transaction; `data` is its payload or None.
+        """
+        if not self.recording:
+            return
+        self._drain_edges()
+        if n is None:
+            n = len(data) if data is not None else 0
+        size = len(data) if data is not None else 0
+        dt = self._dt()
+        rec = self._rec
+        if size <= _SMALL:
+            ustruct.pack_into(HEADER, rec, 0, rtype, dt, device, reg, n)
+            if size:
+                rec[HEADER_SIZE:HEADER_SIZE + size] = data
+            self._small(HEADER_SIZE + size, dt)
+            return
+        self._forget()
+        if self._pending + HEADER_SIZE + size > len(self._ring):
+            self._stop()
+            return
+        ustruct.pack_into(HEADER, rec, 0, rtype, dt, device, reg, n)
+        self._put(self._rec_views[HEADER_SIZE])
+        self._put(data)
+        self.records += 1
+
+    def record_vector(self, rtype: int, device: int, reg: int, vector, n: int):
+        """
+        Log a transaction whose payload is the buffers of `vector` back to
+        back (as for writevto), or none if `vector` is None.
+        """
+        if vector is None or len(vector) == 1:
+            self.record(rtype, device, reg, vector[0] if vector is not None else None, n)
+            return
+        if not self.recording:
+            return
+        self._drain_edges()
+        dt = self._dt()
+        rec = self._rec
+        ustruct.pack_into(HEADER, rec, 0, rtype, dt, device, reg, n)
+        if n <= _SMALL:
+            pos = HEADER_SIZE
+            for buf in vector:
+                rec[pos:pos + len(buf)] = buf
+                pos += len(buf)
+            self._small(pos, dt)
+            return
+        self._forget()
+        if self._pending + HEADER_SIZE + n > len(self._ring):
+            self._stop()
+            return
+        self._put(self._rec_views[HEADER_SIZE])
+        for buf in vector:
+            self._put(buf)
+        self.records += 1
+
+    def error(self, device: int, errno: int, rtype: int):
+        self.record(ERROR, device, errno, None, rtype)
+
+    def edge(self, pin: int, level: int):
+        """
+        Queue a pin edge, safe to call from an IRQ handler.
+        """
+        head = self._edge_head
+        nxt = head + 2
+        if nxt == 2 * _EDGES:
+            nxt = 0
+        if nxt == self._edge_tail:
+            self.dropped += 1
+            return
+        self._edges[head] = ticks_us()
+        self._edges[head + 1] = pin << 1 | level
+        self._edge_head = nxt
+
+    def _drain_edges(self):
+        edges = self._edges
+        while self._edge_tail != self._edge_head:
+            tail = self._edge_tail
+            t = edges[tail]
+            pin = edges[tail + 1]
+            self._edge_tail = tail + 2 if tail + 2 < 2 * _EDGES else 0
+            dt = self._dt()
+            self._forget()
+            rec = self._rec
+            ustruct.pack_into(HEADER, rec, 0, EDGE, dt, pin >> 1, pin & 1, 4)
+            ustruct.pack_into('<I', rec, HEADER_SIZE, t & 0xffffffff)
+            if self._put(self._rec_views[HEADER_SIZE + 4]):
+                self.records += 1
+
+    def poll(self) -> bool:
+        """
+        Write one chunk to flash if a chunk is ready or `flush_ms` passed.
+        """
+        if self.recording:
+            self._drain_edges()
+        if not self._pending:
+            return False
+        if self._pending < self.chunk and ticks_diff(ticks_ms(), self._flushed) < self.flush_ms:
+            return False
+        self._write(self.chunk)
+        return True
+
+    def _write(self, limit: int):
+        tail = self._tail
+        n = min(self._pending, limit, len(self._ring) - tail)
+        self._file.write(self._view[tail:tail + n])
+        self._tail = (tail + n) % len(self._ring)
+        self._pending -= n
+        self.written += n
+        self._flushed = ticks_ms()
+
+    def close(self):
+        if self.recording:
+            self._drain_edges()
+            self._forget()
+        self.recording = False
+        while self._pending:
+            self._write(self._pending)
+        self._file.close()
+
+
+class RecordingI2C:
+    """machine.I2C compatible proxy logging every transaction."""
+    def __init__(self, i2c, recorder: BusRecorder):
+        self._i2c = i2c
+        self.recorder = recorder
+
+    def scan(self):
+        return self._i2c.scan()
+
+    def readfrom(self, addr, nbytes, stop=True):
+        try:
+            data = self._i2c.readfrom(addr, nbytes, stop)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, READ)
+            raise e
+        self.recorder.record(READ, addr, 0, data)
+        return data
+
+    def readfrom_into(self, addr, buf, stop=True):
+        try:
+            self._i2c.readfrom_into(addr, buf, stop)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, READ)
+            raise e
+        self.recorder.record(READ, addr, 0, buf)
+
+    def writeto(self, addr, buf, stop=True):
+        try:
+            acks = self._i2c.writeto(addr, buf, stop)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, WRITE)
+            raise e
+        rec = self.recorder
+        rec.record(WRITE, addr, 0, buf if rec.write_data else None, len(buf))
+        return acks
+
+    def writevto(self, addr, vector, stop=True):
+        try:
+            acks = self._i2c.writevto(addr, vector, stop)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, WRITE)
+            raise e
+        nbytes = 0
+        for buf in vector:
+            nbytes += len(buf)
+        rec = self.recorder
+        rec.record_vector(WRITE, addr, 0, vector if rec.write_data else None, nbytes)
+        return acks
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        try:
+            data = self._i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, READ_MEM)
+            raise e
+        self.recorder.record(READ_MEM, addr, memaddr, data)
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        try:
+            self._i2c.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, READ_MEM)
+            raise e
+        self.recorder.record(READ_MEM, addr, memaddr, buf)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        try:
+            self._i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+        except OSError as e:
+            self.recorder.error(addr, e.errno, WRITE_MEM)
+            raise e
+        rec = self.recorder
+        rec.record(WRITE_MEM, addr, memaddr, buf if rec.write_data else None, len(buf))
+
+
+class RecordingSPI:
+    """machine.SPI compatible proxy logging every transfer of one device."""
+    def __init__(self, spi, recorder: BusRecorder, device: int=SPI_DEVICE):
+        self._spi = spi
+        self.recorder = recorder
+        self.device = device
+
+    def init(self, *args, **kwargs):
+        self._spi.init(*args, **kwargs)
+
+    def deinit(self):
+        self._spi.deinit()
+
+    def read(self, nbytes, write=0x00):
+        try:
+            data = self._spi.read(nbytes, write)
+        except OSError as e:
+            self.recorder.error(self.device, e.errno, READ)
+            raise e
+        self.recorder.record(READ, self.device, 0, data)
+        return data
+
+    def readinto(self, buf, write=0x00):
+        try:
+            self._spi.readinto(buf, write)
+        except OSError as e:
+            self.recorder.error(self.device, e.errno, READ)
+            raise e
+        self.recorder.record(READ, self.device, 0, buf)
+
+    def write(self, buf):
+        try:
+            self._spi.write(buf)
+        except OSError as e:
+            self.recorder.error(self.device, e.errno, WRITE)
+            raise e
+        rec = self.recorder
+        rec.record(WRITE, self.device, 0, buf if rec.write_data else None, len(buf))
+
+    def write_readinto(self, write_buf, read_buf):
+        try:
+            self._spi.write_readinto(write_buf, read_buf)
+        except OSError as e:
+            self.recorder.error(self.device, e.errno, WRITE_READ)
+            raise e
+        self.recorder.record(WRITE_READ, self.device, 0, read_buf)
+
+
+class RecordingPin:
+    """machine.Pin proxy logging the edges its IRQ handler sees."""
+    def __init__(self, pin, recorder: BusRecorder, pin_id: int):
+        self._pin = pin
+        self.recorder = recorder
+        self.pin_id = pin_id
+        self._handler = None
+        # Bound once, an IRQ handler must not allocate
+        self._on_edge = self._edge
+
+    def _edge(self, pin):
+        self.recorder.edge(self.pin_id, pin.value())
+        self._handler(pin)
+
+    def irq(self, handler=None, trigger=None, **kwargs):
+        self._handler = handler
+        if handler is None:
+            return self._pin.irq(handler=None)
+        return self._pin.irq(handler=self._on_edge, trigger=trigger, **kwargs)
+
+    def value(self, *args):
+        return self._pin.value(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._pin, name)
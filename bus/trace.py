@@ -0,0 +1,223 @@
+# Transaction counting for I2C and SPI buses.
+#
+# TracedI2C and TracedSPI are drop-in replacements for the machine bus objects
+# handed to drivers. Every transaction is counted per device (I2C address, or
+# the name given to an SPI handle, one handle per chip select) into a shared
+# BusTrace, which can also keep a ring of the last transactions. Counters and
+# ring entries live in preallocated arrays, so tracing doesn't allocate once
+# each device has been seen. Each counter carries into a second slot every
+# 2**20, keeping both in MicroPython's small int range for long runs.
+
+# pylint: disable=import-error
+from array import array
+
+from utime import ticks_us, ticks_diff
+# pylint: enable=import-error
+
+# Operations in the trace ring
+READ = 0
+WRITE = 1
+READ_MEM = 2
+WRITE_MEM = 3
+WRITE_READ = 4
+_OP_NAMES = ('read', 'write', 'read_mem', 'write_mem', 'write_read')
+
+# Ring entry: start ticks_us, device index, op << 16 | bytes, duration us
+_ENTRY = 4
+
+# Counter slots per device, each followed by its carry slot
+_TXN = 0
+_BYTES = 2
+_BUSY = 4
+_CARRY_SHIFT = 20
+_CARRY_MASK = (1 << _CARRY_SHIFT) - 1
+
+
+def _add(counters, slot: int, value: int):
+    total = counters[slot] + value
+    if total > _CARRY_MASK:
+        counters[slot + 1] += total >> _CARRY_SHIFT
+        total &= _CARRY_MASK
+    counters[slot] = total
+
+
+def _total(counters, slot: int) -> int:
+    return counters[slot + 1] * (1 << _CARRY_SHIFT) + counters[slot]
+
+
+class BusTrace:
+    """Per-device transaction, byte and time counters with an optional trace ring."""
+    def __init__(self, ring: int=0):
+        # Device key -> array of transactions, bytes and busy us, with carries
+        self.devices: dict = {}
+        self.names: dict = {}
+        # Device keys in order of appearance, indexed from the ring
+        self.keys: list = []
+        self._ids: dict = {}
+        self._ring = array('i', (0 for _ in range(ring * _ENTRY)))
+        self._ring_len = ring
+        self._next = 0
+        self.recorded = 0
+        self._since = ticks_us()
+
+    def name(self, key, name: str):
+        """
+        Label a device key in reports, e.g. an I2C address.
+        """
+        self.names[key] = name
+
+    def record(self, key, op: int, nbytes: int, start: int):
+        duration = ticks_diff(ticks_us(), start)
+        if (counters := self.devices.get(key)) is None:
+            counters = array('I', (0, 0, 0, 0, 0, 0))
+            self.devices[key] = counters
+            self._ids[key] = len(self.keys)
+            self.keys.append(key)
+        _add(counters, _TXN, 1)
+        _add(counters, _BYTES, nbytes)
+        _add(counters, _BUSY, duration)
+
+        if self._ring_len:
+            i = self._next * _ENTRY
+            ring = self._ring
+            ring[i] = start
+            ring[i + 1] = self._ids[key]
+            ring[i + 2] = op << 16 | nbytes
+            ring[i + 3] = duration
+            self._next = (self._next + 1) % self._ring_len
+            self.recorded += 1
+
+    def totals(self, key) -> tuple[int, int, int]:
+        """
+        (transactions, bytes, busy us) of `key` since the last reset.
+        """
+        counters = self.devices.get(key)
+        if counters is None:
+            return 0, 0, 0
+        return _total(counters, _TXN), _total(counters, _BYTES), _total(counters, _BUSY)
+
+    def busy_us(self, key) -> int:
+        counters = self.devices.get(key)
+        return _total(counters, _BUSY) if counters is not None else 0
+
+    def busy_permille(self, key) -> int:
+        """
+        Share of the time since the last reset that `key` held the bus.
+        """
+        return self.busy_us(key) * 1000 // max(1, ticks_diff(ticks_us(), self._since))
+
+    def reset(self):
+        for counters in self.devices.values():
+            for i in range(len(counters)):
+                counters[i] = 0
+        self._since = ticks_us()
+
+    def last(self, count: int=None) -> list[tuple[int, int, str, int, int]]:
+        """
+        Oldest first list of the last `count` ring entries, as
+        (start us, device key, op, bytes, duration us).
+        """
+        available = min(self.recorded, self._ring_len)
+        if count is None or count > available:
+            count = available
+        entries = []
+        for n in range(count):
+            i = ((self._next - count + n) % self._ring_len) * _ENTRY
+            ring = self._ring
+            entries.append((ring[i], self.keys[ring[i + 1]], _OP_NAMES[ring[i + 2] >> 16], ring[i + 2] & 0xffff, ring[i + 3]))
+        return entries
+
+    def report(self):
+        elapsed = max(1, ticks_diff(ticks_us(), self._since))
+        for key in self.devices:
+            transactions, nbytes, busy_us = self.totals(key)
+            name = self.names.get(key, f'0x{key:02x}' if isinstance(key, int) else key)
+            rate = transactions * 1_000_000 // elapsed
+            print(f'[BUS ] {name}: {transactions} txn ({rate}/s), {nbytes} B, {busy_us} us ({busy_us * 1000 // elapsed / 10}%)')
+
+
+class TracedI2C:
+    """machine.I2C compatible proxy counting transactions per address."""
+    def __init__(self, i2c, trace: BusTrace):
+        self._i2c = i2c
+        self.trace = trace
+
+    def scan(self):
+        return self._i2c.scan()
+
+    def readfrom(self, addr, nbytes, stop=True):
+        start = ticks_us()
+        data = self._i2c.readfrom(addr, nbytes, stop)
+        self.trace.record(addr, READ, nbytes, start)
+        return data
+
+    def readfrom_into(self, addr, buf, stop=True):
+        start = ticks_us()
+        self._i2c.readfrom_into(addr, buf, stop)
+        self.trace.record(addr, READ, len(buf), start)
+
+    def writeto(self, addr, buf, stop=True):
+        start = ticks_us()
+        acks = self._i2c.writeto(addr, buf, stop)
+        self.trace.record(addr, WRITE, len(buf), start)
+        return acks
+
+    def writevto(self, addr, vector, stop=True):
+        start = ticks_us()
+        acks = self._i2c.writevto(addr, vector, stop)
+        nbytes = 0
+        for buf in vector:
+            nbytes += len(buf)
+        self.trace.record(addr, WRITE, nbytes, start)
+        return acks
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        start = ticks_us()
+        data = self._i2c.readfrom_mem(addr, memaddr, nbytes, addrsize=addrsize)
+        self.trace.record(addr, READ_MEM, nbytes, start)
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        start = ticks_us()
+        self._i2c.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        self.trace.record(addr, READ_MEM, len(buf), start)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        start = ticks_us()
+        self._i2c.writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+        self.trace.record(addr, WRITE_MEM, len(buf), start)
+
+
+class TracedSPI:
+    """machine.SPI compatible proxy counting transactions for one chip select."""
+    def __init__(self, spi, trace: BusTrace, name: str):
+        self._spi = spi
+        self.trace = trace
+        self.name = name
+
+    def init(self, *args, **kwargs):
+        self._spi.init(*args, **kwargs)
+
+    def deinit(self):
+        self._spi.deinit()
+
+    def read(self, nbytes, write=0x00):
+        start = ticks_us()
+        data = self._spi.read(nbytes, write)
+        self.trace.record(self.name, READ, nbytes, start)
+        return data
+
+    def readinto(self, buf, write=0x00):
+        start = ticks_us()
+        self._spi.readinto(buf, write)
+        self.trace.record(self.name, READ, len(buf), start)
+
+    def write(self, buf):
+        start = ticks_us()
+        self._spi.write(buf)
+        self.trace.record(self.name, WRITE, len(buf), start)
+
+    def write_readinto(self, write_buf, read_buf):
+        start = ticks_us()
+        self._spi.write_readinto(write_buf, read_buf)
+        self.trace.record(self.name, WRITE_READ, len(write_buf), start)
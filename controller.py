@@ -1,22 +1,36 @@
 # pylint: disable=broad-exception-caught
 # pylint: disable=import-error
 import errno
+import gc
+from array import array
 
-from utime import sleep_ms
-from machine import I2C, Pin
+from micropython import const
+
+from utime import sleep_ms, ticks_diff, ticks_ms, ticks_us
+from machine import I2C, Pin, SPI, Timer
 from usb.device.mouse import MouseInterface
 from usb.device.keyboard import KeyboardInterface, KeyCode
 
 import usb.device
 
+from bus import arbiter, record, trace
 from gyro import mpu9250
 from rfid import mfrc522
-from display import ssd1306
-from ir import hx1838
+from display import assets, console, governor, layout, ssd1306, text
+from ir import hx1838, protocols
 
+import heapguard
+import loopstats
 import state
+import telemetry
 # pylint: enable=import-error
 
+# Frame decoding on PIO is only available on RP2040
+try:
+    from ir import pio_nec
+except ImportError:
+    pio_nec = None
+
 # PIN Constants
 SPI_RST = None
 SPI_MISO = 0
@@ -30,11 +44,105 @@ IR_SIGNAL = 6
 # Scaling constants
 GYRO_TO_MOUSE_K = 100.
 
+# Steady-state loop without heap allocation: an integer gyro to mouse path
+# and preallocated storage for every iteration. Automatic garbage collection
+# is off in the loop; it runs at the idle point at the end of an iteration
+# every GC_PERIOD_MS, or sooner when less than GC_MIN_FREE bytes are left.
+ZERO_ALLOC = True
+GC_PERIOD_MS = 1000
+GC_MIN_FREE = 16 * 1024
+
+# Fractional bits of the gyro counts to mouse factor
+_MOUSE_SHIFT = const(16)
+
+# IR Power key, toggling the diagnostics page
+_IR_POWER = const(0x45)
+
 # Loop delay
 LOOP_DELAY_MS = 1
 
-# OLED line limit
-OLED_LINE_LIMIT = 6
+# Boot without the LED flash delays, clicks and settle sleeps: USB enumerates
+# while the sensors are probed and the gyro calibrates, and the LED blinks
+# from a timer until the loop runs. Boot phases are timed either way, see
+# `controller.boot_phases`.
+FAST_BOOT = True
+FAST_BOOT_CALIBRATION = 64
+FAST_BOOT_CALIBRATION_DELAY_MS = 2
+BOOT_BLINK_MS = 100
+
+# Decoded IR frames waiting for the control loop
+IR_QUEUE_LEN = 8
+
+# Accepted IR protocols, as a mask of 1 << ir.protocols ids. NEC alone is
+# decoded on a PIO state machine on RP2040; any other protocol selects the
+# edge-timing HX1838 decoder.
+IR_PROTOCOLS = 1 << protocols.NEC | 1 << protocols.NEC_EXT
+
+# A held IR key repeats every ~108ms (NEC); a longer pause ends the hold.
+# Pauses are measured between frame arrival times stamped by the receiver,
+# so a slow loop or a key send sleeping in between doesn't end the hold.
+IR_REPEAT_TIMEOUT_MS = 150
+
+# Held key acceleration, as (held for ms, half steps per repeat)
+IR_REPEAT_ACCEL = ((0, 0), (400, 1), (1200, 2), (2500, 4))
+
+# Count bus transactions per device, see `controller.bus_trace`, and keep
+# a ring of this many recent ones. Off by default: it adds a proxy to every
+# gyro read.
+BUS_TRACE = False
+BUS_TRACE_RING = 32
+
+# Log raw bus traffic and IR edges to this file for replay on the simulator
+# (see bus/record.py and sim/replay.py); None disables it. IR frames are then
+# decoded in software, PIO edges can't be logged.
+BUS_RECORD = None
+
+# Time per loop given to deferred OLED chunks on the shared I2C bus
+I2C_DISPLAY_BUDGET_US = 1000
+
+# OLED refresh rate cap, independent of the control loop
+OLED_MAX_FPS = 10
+
+# Diagnostics page refresh rate, low so it doesn't disturb what it measures
+DIAG_FPS = 2
+
+# Telemetry channels printing text and emitting binary records at startup;
+# both can be changed at runtime through `controller.telemetry`
+TELEMETRY_TEXT = telemetry.ALL & ~telemetry.GYRO
+TELEMETRY_BINARY = 0
+
+# Loop timing statistics, see `controller.loop_stats`; 0 compiles them out
+_PROFILE = const(1)
+_ST_INPUT = const(0)
+_ST_PROCESS = const(1)
+_ST_OUTPUT = const(2)
+_ST_BUS = const(3)
+_ST_LOOP = const(4)
+_ST_GYRO = const(5)
+_ST_RFID = const(6)
+_ST_IR = const(7)
+_ST_HID = const(8)
+_ST_OLED = const(9)
+_ST_GC = const(10)
+LOOP_STAGES = ('input', 'process', 'output', 'bus', 'loop', 'gyro', 'rfid', 'ir', 'hid', 'oled', 'gc')
+
+# Heap growth per loop stage, see `controller.heap_guard`; 0 compiles it out.
+# Meant for debugging ZERO_ALLOC, reported on exit after a warm-up of loops.
+_HEAP_GUARD = const(0)
+HEAP_GUARD_WARMUP = 20
+
+# Eye preview bitmaps on the device filesystem (see tools/pack_previews.py),
+# and the OLED area left of the layout text they are drawn in
+PREVIEW_PACK = 'previews.skp'
+PREVIEW_X = 2
+PREVIEW_Y = 10
+PREVIEW_MAX_W = 28
+PREVIEW_MAX_H = 54
+
+def _scale(value: int, k: int) -> int:
+    # value * k in fixed point, truncated toward zero like int()
+    value *= k
+    return value >> _MOUSE_SHIFT if value >= 0 else -(-value >> _MOUSE_SHIFT)
 
 class Controller:
     """Controller for all sensors and outputs."""
@@ -44,106 +152,243 @@ class Controller:
         self._ordered_eyes = eye_list
         self._eyes_amount = len(eye_list)
 
+        # IR remote commands, besides the eye shortcuts
+        self._ir_commands = {
+            _IR_POWER: self._ir_power,
+            0x47: self._ir_lightning,
+            0x40: self._ir_up,
+            0x19: self._ir_down,
+            0x07: self._ir_left,
+            0x09: self._ir_right,
+            0x15: self._ir_confirm,
+        }
+        self._ir_event = array('i', (0, 0, 0, 0))
+
+        # Held IR keys: last command, when it was pressed and last repeated
+        self._ir_repeat_steps = {0x07: -1, 0x09: 1}
+        self._ir_last = -1
+        self._ir_press_ms = 0
+        self._ir_last_ms = 0
+        self._ir_credit = 0
+
         # System state
         self.state = state.SystemState(eye_list[0])
 
-        self._setup()
+        # Serial output
+        self.telemetry = telemetry.Telemetry(binary=TELEMETRY_BINARY, text=TELEMETRY_TEXT)
+        self.loop_stats = loopstats.LoopStats(LOOP_STAGES) if _PROFILE else None
+        self.heap_guard = heapguard.HeapGuard(LOOP_STAGES, warmup=HEAP_GUARD_WARMUP) if _HEAP_GUARD else None
+
+        # Loop storage for ZERO_ALLOC: calibrated gyro counts and the counts
+        # to mouse factor
+        self._gyro_counts = array('i', (0, 0, 0))
+        self._mouse_k = 0
+        # Last explicit collection, how long it took and all of them took in us
+        self._gc_ms = 0
+        self.gc_us = 0
+        self.gc_total_us = 0
+
+        # Bus transaction counters
+        if BUS_TRACE:
+            self.bus_trace = trace.BusTrace(ring=BUS_TRACE_RING)
+            self.bus_trace.name(0x68, 'mpu6500')
+            self.bus_trace.name(0x0c, 'ak8963')
+            self.bus_trace.name(0x3c, 'ssd1306')
+        else:
+            self.bus_trace = None
+
+        # Raw bus log, kept across setups
+        self.bus_recorder = None
+        if BUS_RECORD is not None:
+            try:
+                self.bus_recorder = record.BusRecorder(BUS_RECORD)
+            except Exception as e:
+                self.state.last_exception = e
+                self.state.last_exception_module = 'recordsetup'
+
+        # Eye preview bitmaps, streamed from flash when present
+        try:
+            self._previews = assets.AssetPack(PREVIEW_PACK)
+        except (OSError, ValueError):
+            print(f'[DISP] No preview pack ({PREVIEW_PACK})')
+            self._previews = None
+        if self._previews is not None and (self._previews.width > PREVIEW_MAX_W or self._previews.height > PREVIEW_MAX_H):
+            print(f'[DISP] Preview pack bitmaps larger than {PREVIEW_MAX_W}x{PREVIEW_MAX_H}')
+            self._previews.close()
+            self._previews = None
+        # Previews are looked up by eye name unless given as a valid index
+        for eye in eye_list:
+            if self._previews is None:
+                eye.preview = None
+            elif eye.preview is None or not 0 <= eye.preview < self._previews.count:
+                eye.preview = self._previews.find(eye.name)
+
+        # Boot phases as (name, ms), and the time from setup to the loop
+        self.boot_phases = []
+        self.boot_ms = 0
+        self._boot_led = None
+        self._boot_start_ms = None
 
         self._disable_hid = disable_hid
+        self._setup()
+        self._fresh = True
 
     def _change_selected_eye(self, delta: int):
-        self.state.ordered_selection_idx += delta
-        self.state.ordered_selection_idx %= self._eyes_amount
+        # One write, so snapshots never see the index out of range
+        self.state.ordered_selection_idx = (self.state.ordered_selection_idx + delta) % self._eyes_amount
+        self._display_governor.request()
 
-    def _ir_callback(self, data: int, _addr, _ctrl):
-        if (not self.state.enable_ir) or (not self.state.enable_keyboard):
-            return
+    def _ir_power(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Power")
+        self._toggle_diagnostics()
 
-        if data < 0:  # NEC protocol sends repeat codes.
-            return
+    def _ir_lightning(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Lightning")
 
-        if next_eye := self._eye_by_ir.get(data):
-            print(f"[IR  ] Set next eye = {next_eye.name}")
-            self.state.next_eye = next_eye
-            return
+    def _ir_up(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Up")
 
-        if data == 0x45: # Power
-            print("[IR  ] Power")
-            return
+    def _ir_down(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Down")
+
+    def _ir_left(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Left")
+        self._change_selected_eye(-1)
+
+    def _ir_right(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Right")
+        self._change_selected_eye(1)
+
+    def _ir_confirm(self):
+        self.telemetry.log(telemetry.IR, "[IR  ] Confirm")
+        self.state.next_eye = self._ordered_eyes[self.state.ordered_selection_idx]
 
-        if data == 0x47: # Lightning
-            print("[IR  ] Lightning")
+    def _ir_repeat(self, t: int):
+        # `t` is when the frame arrived, not when it was drained
+        if self._ir_last < 0 or ticks_diff(t, self._ir_last_ms) > IR_REPEAT_TIMEOUT_MS:
+            # Repeat of a frame we missed, or of a hold that already ended
+            self._ir_last = -1
+            return
+        self._ir_last_ms = t
+        step = self._ir_repeat_steps.get(self._ir_last)
+        if step is None:
             return
 
-        if data == 0x40: # Up
-            print("[IR  ] Up")
+        held = ticks_diff(t, self._ir_press_ms)
+        rate = 0
+        for hold_ms, half_steps in IR_REPEAT_ACCEL:
+            if held < hold_ms:
+                break
+            rate = half_steps
+        self._ir_credit += rate
+        if self._ir_credit >= 2:
+            self._change_selected_eye(step * (self._ir_credit >> 1))
+            self._ir_credit &= 1
+
+    def _ir_dispatch(self, data: int, _addr: int, t: int):
+        if not self.state.enable_ir:
+            return
+        # Diagnostics stay reachable when a fault disabled the keyboard
+        if (not self.state.enable_keyboard) and data != _IR_POWER:
             return
 
-        if data == 0x19: # Down
-            print("[IR  ] Down")
+        # Protocols without repeat codes resend the whole frame while held
+        if data == hx1838.HX1838.REPEAT or (data == self._ir_last and ticks_diff(t, self._ir_last_ms) <= IR_REPEAT_TIMEOUT_MS):
+            self._ir_repeat(t)
             return
 
-        if data == 0x07: # Left
-            print("[IR  ] Left")
-            self._change_selected_eye(-1)
+        if data < 0:
             return
+        self._ir_last = data
+        self._ir_press_ms = t
+        self._ir_last_ms = t
+        self._ir_credit = 0
 
-        if data == 0x09: # Right
-            print("[IR  ] Right")
-            self._change_selected_eye(1)
+        if next_eye := self._eye_by_ir.get(data):
+            if self.telemetry.text & telemetry.IR:
+                print(f"[IR  ] Set next eye = {next_eye.name}")
+            self.state.next_eye = next_eye
             return
 
-        if data == 0x15: # Enter
-            print("[IR  ] Confirm")
-            self.state.next_eye = self._ordered_eyes[self.state.ordered_selection_idx]
+        if handler := self._ir_commands.get(data):
+            handler()
             return
 
-        print(f"[IR  ] Unknown cmd 0x{data:02X}")
+        if self.telemetry.text & telemetry.IR:
+            print(f"[IR  ] Unknown cmd 0x{data:02X}")
+
+    def _drain_ir(self):
+        event = self._ir_event
+        while self.hx1838.read(event):
+            self.telemetry.event(telemetry.IR, event[3], event[0])
+            self._ir_dispatch(event[0], event[1], event[2])
 
     def _flash(self, duration: int):
-        print(f'[CTRL] flash {duration}ms')
+        if self.telemetry.text & telemetry.CTRL:
+            print(f'[CTRL] flash {duration}ms')
         self.led.on()
         sleep_ms(duration)
         self.led.off()
         sleep_ms(duration)
 
-    def _display_text(self, text: str, line: int, x: int=30, show: bool=True):
-        print(f'[DISP] ({line}) {text}')
+    def _blink(self, _timer):
+        self.led.toggle()
+
+    def _boot_phase(self, name: str, flash: bool = True):
+        # End of a boot phase: timed, then flashed on the LED unless booting
+        # fast. Only device bring-up steps flash, as they always have
+        now = ticks_ms()
+        ms = ticks_diff(now, self._boot_phase_ms)
+        self.boot_phases.append((name, ms))
+        if self.telemetry.text & telemetry.CTRL:
+            print(f'[BOOT] {name} {ms}ms')
+        if flash and not FAST_BOOT:
+            self._flash(200)
+        # Boot steps fill the bus log faster than the loop drains it
+        if self.bus_recorder is not None:
+            while self.bus_recorder.poll():
+                pass
+        self._boot_phase_ms = ticks_ms()
+
+    def _boot_done(self):
+        if self._boot_led is not None:
+            self._boot_led.deinit()
+            self._boot_led = None
+            self.led.off()
+        self.boot_ms = ticks_diff(ticks_ms(), self._boot_start_ms)
+        self._boot_start_ms = None
+        if self.telemetry.text & telemetry.CTRL:
+            print(f'[BOOT] ready after {self.boot_ms}ms')
+
+    def _log(self, text: str):
+        if self.telemetry.text & telemetry.DISP:
+            print(f'[DISP] {text}')
         if self.ssd1306 is None:
             return
         try:
-            self.ssd1306.text(text, x, 10*line)
-            self.state.display_updated = True
-            if show:
-                self.ssd1306.show()
+            self._console.log(text)
         except Exception as e:
             self.state.last_exception = e
             self.state.last_exception_module = 'oledtext'
             self.state.enable_mouse = False
             raise e
 
-    def _typewrite_text(self, text: str, x: int=30, show: bool=True):
-        if self.state.display_text[self.state.display_line] != text:
-            self._display_text(text, self.state.display_line, x=x, show=show)
-            self.state.display_text[self.state.display_line] = text
-        self.state.display_line += 1
-        self.state.display_line %= OLED_LINE_LIMIT
-
-    def _clear_display(self, show: bool=True):
+    def _show_layout(self):
         if self.ssd1306 is None:
             return
         try:
+            self._console.close()
             self.ssd1306.fill(0)
-            self.state.display_line = 1
-            self.state.display_text = ['', '', '', '', '', '']
-            if show:
-                self.ssd1306.show()
+            self._layout.invalidate()
         except Exception as e:
             self.state.last_exception = e
             self.state.last_exception_module = 'oledclear'
             self.state.enable_mouse = False
             raise e
 
+    def _feature_flags(self) -> int:
+        return self.state.flags
+
     def _send_single_key(self, key: KeyCode, down: int=60, up: int=100):
         if self.keyboard is None:
             return
@@ -173,70 +418,121 @@ class Controller:
             raise e
 
     def _setup(self):
+        # Boot time counts from the first setup, or the one retrying after a fault
+        if self._boot_start_ms is None:
+            self._boot_start_ms = ticks_ms()
+        self._boot_phase_ms = ticks_ms()
+        self.boot_phases.clear()
         self.i2c = I2C(0, scl=Pin(I2C_SCL), sda=Pin(I2C_SDA))
         print(str(self.i2c.scan()))
+        i2c = self.i2c
+        if self.bus_recorder is not None:
+            i2c = record.RecordingI2C(i2c, self.bus_recorder)
+        if self.bus_trace is not None:
+            i2c = trace.TracedI2C(i2c, self.bus_trace)
+        self.i2c_bus = arbiter.I2CArbiter(i2c, budget_us=I2C_DISPLAY_BUDGET_US)
 
         # On-board LED
         self.led = Pin("LED", Pin.OUT)
+        if FAST_BOOT:
+            if self._boot_led is not None:
+                self._boot_led.deinit()
+            self._boot_led = Timer(mode=Timer.PERIODIC, period=BOOT_BLINK_MS, callback=self._blink)
+
+        self._boot_phase('i2c')
 
-        self._flash(200)
+        # USB enumeration takes the host a while, start it before the sensors
+        if FAST_BOOT:
+            self._setup_hid()
+            self._start_usb()
 
         # Gyro, Accel, Magnet, Temp
         if self.state.enable_gyro:
             try:
-                self.mpu9250 = mpu9250.BiasedMPU9250(self.i2c)
+                self.mpu9250 = mpu9250.BiasedMPU9250(self.i2c_bus.client('gyro'))
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'gyrosetup'
                 self.state.enable_gyro = False
                 self.mpu9250 = None
 
-            self._flash(200)
+            self._boot_phase('gyro')
         else:
             self.mpu9250 = None
 
         # RFID
         if self.state.enable_rfid:
             try:
-                self.mfrc522 = mfrc522.MFRC522(sck=SPI_SCK, miso=SPI_MISO, mosi=SPI_MOSI, cs=SPI_CS, rst=SPI_RST)
+                spi = SPI(0, baudrate=1000000, sck=Pin(SPI_SCK, Pin.OUT), mosi=Pin(SPI_MOSI, Pin.OUT), miso=Pin(SPI_MISO))
+                if self.bus_recorder is not None:
+                    spi = record.RecordingSPI(spi, self.bus_recorder)
+                if self.bus_trace is not None:
+                    spi = trace.TracedSPI(spi, self.bus_trace, 'mfrc522')
+                self.mfrc522 = mfrc522.MFRC522(sck=SPI_SCK, miso=SPI_MISO, mosi=SPI_MOSI, cs=SPI_CS, rst=SPI_RST, spi=spi)
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'rfidsetup'
                 self.state.enable_rfid = False
                 self.mfrc522 = None
 
-            self._flash(200)
+            self._boot_phase('rfid')
         else:
             self.mfrc522 = None
 
         # OLED
         if self.state.enable_oled:
             try:
-                self.ssd1306 = ssd1306.SSD1306_I2C(self.i2c)
+                self.ssd1306 = ssd1306.SSD1306_I2C(self.i2c_bus.client('oled'))
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'oledsetup'
                 self.state.enable_oled = False
                 self.ssd1306 = None
 
-            self._flash(200)
+            self._boot_phase('oled')
         else:
             self.ssd1306 = None
 
+        # OLED boot/fault log and layout
+        self._console = console.Console(self.ssd1306) if self.ssd1306 is not None else None
+        self._layout = layout.Layout(self.ssd1306)
+        self._layout.add(layout.TextWidget('eye', 30, 10))
+        self._layout.add(layout.TextWidget('selection', 30, 20, prefix='> '))
+        font = text.builtin_font()
+        self._layout.add(layout.NumberWidget('mouse_x', 30, 30, font, prefix='MX: ', width=4))
+        self._layout.add(layout.NumberWidget('mouse_y', 30, 40, font, prefix='MY: ', width=4))
+        self._layout.add(layout.FlagsWidget('flags', 30, 50, count=6))
+        if self._previews is not None:
+            self._layout.add(layout.BitmapWidget('preview', PREVIEW_X, PREVIEW_Y, self._previews))
+        self._display_governor = governor.FrameGovernor(self._render_display, max_fps=OLED_MAX_FPS)
+        self._shown_flags = 0
+        self._diagnostics = False
+
         # IR receiver
         if self.state.enable_ir:
             try:
-                self.hx1838 = hx1838.HX1838(Pin(IR_SIGNAL), self._ir_callback)
+                if self.bus_recorder is not None:
+                    pin = record.RecordingPin(Pin(IR_SIGNAL), self.bus_recorder, IR_SIGNAL)
+                    self.hx1838 = hx1838.HX1838(pin, None, queue_len=IR_QUEUE_LEN, scheduled=True, protos=IR_PROTOCOLS)
+                elif pio_nec is not None and not IR_PROTOCOLS & ~pio_nec.PIONEC.PROTOCOLS:
+                    self.hx1838 = pio_nec.PIONEC(Pin(IR_SIGNAL, Pin.IN), protos=IR_PROTOCOLS)
+                else:
+                    self.hx1838 = hx1838.HX1838(Pin(IR_SIGNAL), None, queue_len=IR_QUEUE_LEN, scheduled=True,
+                                                protos=IR_PROTOCOLS)
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'irsetup'
                 self.state.enable_ir = False
                 self.hx1838 = None
 
-            self._flash(200)
+            self._boot_phase('ir')
         else:
             self.hx1838 = None
 
+        if not FAST_BOOT:
+            self._setup_hid()
+
+    def _setup_hid(self):
         # Keyboard
         if self.state.enable_keyboard:
             try:
@@ -247,7 +543,7 @@ class Controller:
                 self.state.enable_keyboard = False
                 self.keyboard = None
 
-            self._flash(200)
+            self._boot_phase('keyboard')
         else:
             self.keyboard = None
 
@@ -261,58 +557,79 @@ class Controller:
                 self.state.enable_mouse = False
                 self.mouse = None
 
-            self._flash(200)
+            self._boot_phase('mouse')
         else:
             self.mouse = None
 
-    def _initialize(self):
-        # Flash
-        self._flash(300)
-
-        # Clear display
-        self._clear_display(show=False)
-        self._typewrite_text('Initialize')
-
-        # Initialize HID
-        if not self._disable_hid:
-            args = []
-            if self.keyboard is not None:
-                args += [self.keyboard]
-            if self.mouse is not None:
-                args += [self.mouse]
-            if args:
-                usb.device.get().init(*args, builtin_driver=True)
-
-            if self.keyboard is not None:
-                while not self.keyboard.is_open():
-                    sleep_ms(100)
-                self._typewrite_text('Keyboard OK')
-            else:
-                self._typewrite_text('Keyboard SKIP')
+    def _start_usb(self):
+        if self._disable_hid:
+            return
+        args = []
+        if self.keyboard is not None:
+            args += [self.keyboard]
+        if self.mouse is not None:
+            args += [self.mouse]
+        if args:
+            usb.device.get().init(*args, builtin_driver=True)
+
+    def _wait_usb(self):
+        if self._disable_hid:
+            return
+        poll_ms = 5 if FAST_BOOT else 100
+        if self.keyboard is not None:
+            while not self.keyboard.is_open():
+                sleep_ms(poll_ms)
+            self._log('Keyboard OK')
+        else:
+            self._log('Keyboard SKIP')
 
-            if self.mouse is not None:
-                while not self.mouse.is_open():
-                    sleep_ms(100)
-                self._typewrite_text('Mouse OK')
-            else:
-                self._typewrite_text('Mouse SKIP')
+        if self.mouse is not None:
+            while not self.mouse.is_open():
+                sleep_ms(poll_ms)
+            self._log('Mouse OK')
+        else:
+            self._log('Mouse SKIP')
+        self._boot_phase('usb', flash=False)
 
-        # Gyro calibration
+    def _calibrate(self, samples: int, delay: int):
         if self.mpu9250 is not None:
-            self._typewrite_text('Calibrate...')
+            self._log('Calibrate...')
             try:
-                self.mpu9250.calibrate(100)
+                self.mpu9250.calibrate(samples, delay=delay)
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'gyrocal'
                 self.state.enable_gyro = False
                 raise e
             
-            self._typewrite_text('Done!')
+            self._log('Done!')
             print(f'bias={self.mpu9250.calibration})')
             print(f'std={self.mpu9250.calibration_deviation})')
+            self._boot_phase('calibrate', flash=False)
         else:
-            self._typewrite_text('Gyro SKIP')
+            self._log('Gyro SKIP')
+
+    def _initialize(self):
+        # Boot log
+        if FAST_BOOT:
+            self._log('Initialize')
+
+            # Enumeration started in _setup and goes on while calibrating
+            self._calibrate(FAST_BOOT_CALIBRATION, FAST_BOOT_CALIBRATION_DELAY_MS)
+            self._wait_usb()
+            return
+
+        # Flash
+        self._flash(300)
+
+        self._log('Initialize')
+
+        # Initialize HID
+        self._start_usb()
+        self._wait_usb()
+
+        # Gyro calibration
+        self._calibrate(100, 10)
 
         # Flash 3x
         self._flash(300)
@@ -330,50 +647,106 @@ class Controller:
 # pylint: disable=bare-except
     def _input_data(self):
         if self.state.enable_gyro and self.state.enable_mouse:
+            if _HEAP_GUARD:
+                a = gc.mem_alloc()
+            if _PROFILE:
+                t = ticks_us()
             try:
-                self.state.gyro = self.mpu9250.gyro
-                print(f'[GYRO] {self.state.gyro}')
+                if ZERO_ALLOC:
+                    self.mpu9250.gyro_counts_into(self._gyro_counts)
+                    # Float gyro only for the debug outputs showing it
+                    if (self.telemetry.text | self.telemetry.binary) & telemetry.GYRO:
+                        self.state.gyro = self.mpu9250.counts_to_gyro(self._gyro_counts)
+                else:
+                    self.state.gyro = self.mpu9250.gyro
+                if self.telemetry.text & telemetry.GYRO:
+                    print(f'[GYRO] {tuple(self.state.gyro)}')
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'gyroin'
                 self.state.enable_gyro = False
+            if _PROFILE:
+                self.loop_stats.add(_ST_GYRO, ticks_diff(ticks_us(), t))
+            if _HEAP_GUARD:
+                self.heap_guard.add(_ST_GYRO, gc.mem_alloc() - a)
         if self.state.enable_rfid and self.state.enable_keyboard:
+            if _HEAP_GUARD:
+                a = gc.mem_alloc()
+            if _PROFILE:
+                t = ticks_us()
             try:
                 self.state.rfid = self.mfrc522.tag
+                if self.state.rfid and self.telemetry.text & telemetry.RFID:
+                    print(f'[RFID] {self.state.rfid}')
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'rfidin'
                 self.state.enable_rfid = False
+            if _PROFILE:
+                self.loop_stats.add(_ST_RFID, ticks_diff(ticks_us(), t))
+            if _HEAP_GUARD:
+                self.heap_guard.add(_ST_RFID, gc.mem_alloc() - a)
+        if self.state.enable_ir:
+            if _HEAP_GUARD:
+                a = gc.mem_alloc()
+            if _PROFILE:
+                t = ticks_us()
+            try:
+                self._drain_ir()
+            except Exception as e:
+                self.state.last_exception = e
+                self.state.last_exception_module = 'irin'
+                self.state.enable_ir = False
+            if _PROFILE:
+                self.loop_stats.add(_ST_IR, ticks_diff(ticks_us(), t))
+            if _HEAP_GUARD:
+                self.heap_guard.add(_ST_IR, gc.mem_alloc() - a)
 # pylint: enable=bare-except
 
     def _process_data(self):
         # RFID data
         if tag := self.state.rfid:
-            if rfid_eye := self._eye_by_rfid.get(tag):
-                print(f'[CTRL] New eye {rfid_eye.name}')
+            rfid_eye = self._eye_by_rfid.get(tag)
+            if self.telemetry.binary & telemetry.RFID:
+                self.telemetry.event(telemetry.RFID, rfid_eye.pos if rfid_eye else 0xff, int(tag.replace(':', ''), 16))
+            if rfid_eye:
+                if self.telemetry.text & telemetry.CTRL:
+                    print(f'[CTRL] New eye {rfid_eye.name}')
                 self.state.next_eye = rfid_eye
-            else:
+            elif self.telemetry.text & telemetry.CTRL:
                 print(f'[CTRL] Unknown tag {tag}')
 
         # Gyro data
-        mouse_state_x = int(self.state.gyro[0] * GYRO_TO_MOUSE_K)
-        mouse_state_y = int(self.state.gyro[2] * GYRO_TO_MOUSE_K) * -1
-        self.state.mouse = (mouse_state_x, mouse_state_y)
+        if ZERO_ALLOC:
+            counts = self._gyro_counts
+            mouse = self.state.mouse
+            self.state.begin_update()
+            mouse[0] = _scale(counts[0], self._mouse_k)
+            mouse[1] = -_scale(counts[2], self._mouse_k)
+            self.state.end_update()
+        else:
+            mouse_state_x = int(self.state.gyro[0] * GYRO_TO_MOUSE_K)
+            mouse_state_y = int(self.state.gyro[2] * GYRO_TO_MOUSE_K) * -1
+            self.state.mouse = (mouse_state_x, mouse_state_y)
 
         # Magnet data
         # ...
 
     def _output_data(self):
         if not self._disable_hid:
+            if _HEAP_GUARD:
+                a = gc.mem_alloc()
+            if _PROFILE:
+                t = ticks_us()
             # Send keyboard
             if self.state.next_eye is not None:
                 self._send_single_key(self.state.next_eye.key)
 
             # Send mouse
             if self.mouse is not None:
-                mx, my = self.state.mouse
-                mx = max(-127, min(mx, 127))
-                my = max(-127, min(my, 127))
+                mouse = self.state.mouse
+                mx = max(-127, min(mouse[0], 127))
+                my = max(-127, min(mouse[1], 127))
                 if mx != 0 or my != 0:
                     try:
                         self.mouse.move_by(mx, my)
@@ -382,68 +755,252 @@ class Controller:
                         self.state.last_exception_module = 'mousemove'
                         self.state.enable_mouse = False
                         raise e
+            if _PROFILE:
+                self.loop_stats.add(_ST_HID, ticks_diff(ticks_us(), t))
+            if _HEAP_GUARD:
+                self.heap_guard.add(_ST_HID, gc.mem_alloc() - a)
 
         # Update current eye
         if self.state.next_eye:
             self.state.current_eye = self.state.next_eye
             self.state.next_eye = None
             self.state.ordered_selection_idx = self.state.current_eye.pos
+            self._display_governor.request()
+            self.telemetry.event(telemetry.CTRL, 0, self.state.current_eye.pos)
 
-        current_selecting_eye = self._ordered_eyes[self.state.ordered_selection_idx]
-
-        # Update display
-        # TODO temporary only (add arrows for gyro/mouse, separate line for state.selecting_eye)
+        # Update display at the governed frame rate; eye switches and
+        # disabled features are shown immediately
         if self.ssd1306 is not None:
+            flags = self._feature_flags()
+            if flags != self._shown_flags:
+                self._shown_flags = flags
+                self._display_governor.request()
+            if _HEAP_GUARD:
+                a = gc.mem_alloc()
             try:
-                self._clear_display(show=False)
-                self._typewrite_text(self.state.current_eye.name, show=False)
-                self._typewrite_text(f'> {current_selecting_eye.name}', show=False)
-                self._typewrite_text(f'MX: {self.state.mouse[0]}', show=False)
-                self._typewrite_text(f'MY: {self.state.mouse[1]}', show=False)
-                _feature_flags = [
-                    self.state.enable_gyro,
-                    self.state.enable_ir,
-                    self.state.enable_rfid,
-                    self.state.enable_oled,
-                    self.state.enable_keyboard,
-                    self.state.enable_mouse,
-                ]
-                feature_flags = ''.join(['-' if f else 'X' for f in _feature_flags])
-                self._typewrite_text(feature_flags, show=False)
-                if self.state.display_updated:
-                    self.ssd1306.show()
-                    self.state.display_updated = False
+                if _PROFILE:
+                    t = ticks_us()
+                    if self._display_governor.poll():
+                        self.loop_stats.add(_ST_OLED, ticks_diff(ticks_us(), t))
+                else:
+                    self._display_governor.poll()
             except Exception as e:
                 self.state.last_exception = e
                 self.state.last_exception_module = 'oledout'
                 self.state.enable_mouse = False
                 raise e
+            if _HEAP_GUARD:
+                self.heap_guard.add(_ST_OLED, gc.mem_alloc() - a)
+
+    def _toggle_diagnostics(self):
+        if self.ssd1306 is None:
+            return
+        self._diagnostics = not self._diagnostics
+        if self._diagnostics:
+            self._display_governor.set_max_fps(DIAG_FPS)
+            self._diag_start()
+        else:
+            self._display_governor.set_max_fps(OLED_MAX_FPS)
+            self._show_layout()
+        self._display_governor.request()
+
+    def _i2c_busy_us(self) -> int:
+        busy_us = 0
+        for client in self.i2c_bus.clients.values():
+            busy_us += client.busy_us
+        return busy_us
+
+    def _diag_start(self):
+        # Rates on the page are averaged over the time between two frames,
+        # from counters left running for the other reports
+        self._diag_ms = ticks_ms()
+        self._diag_loops = self.loop_stats.loops if _PROFILE else 0
+        self._diag_gyro = self.loop_stats.count(_ST_GYRO) if _PROFILE else 0
+        self._diag_i2c_us = self._i2c_busy_us()
+        self._diag_spi_us = self.bus_trace.busy_us('mfrc522') if self.bus_trace is not None else 0
+        self._diag_gc_us = self.gc_total_us
+
+    def _render_diagnostics(self) -> bool:
+        now = ticks_ms()
+        elapsed = max(1, ticks_diff(now, self._diag_ms))
+        if _PROFILE:
+            loop_hz = (self.loop_stats.loops - self._diag_loops) * 1000 // elapsed
+            gyro_hz = (self.loop_stats.count(_ST_GYRO) - self._diag_gyro) * 1000 // elapsed
+        else:
+            loop_hz = gyro_hz = '-'
+        # Busy us per elapsed ms is per mille
+        i2c_permille = (self._i2c_busy_us() - self._diag_i2c_us) // elapsed
+        # SPI is only timed through the bus trace
+        if self.bus_trace is not None:
+            spi_pct = (self.bus_trace.busy_us('mfrc522') - self._diag_spi_us) // elapsed // 10
+        else:
+            spi_pct = '-'
+        gc_ms_per_s = (self.gc_total_us - self._diag_gc_us) // elapsed
+        ir_dropped = self.hx1838.dropped if self.hx1838 is not None else 0
+        self._diag_start()
+
+        oled = self.ssd1306
+        oled.fill(0)
+        oled.text(f'loop {loop_hz:>5} Hz', 0, 0)
+        oled.text(f'gyro {gyro_hz:>5} Hz', 0, 8)
+        oled.text(f'i2c{i2c_permille // 10:>3}% spi{spi_pct:>3}%', 0, 16)
+        oled.text(f'oled {self._display_governor.busy_us_per_s // 1000:>3} ms/s', 0, 24)
+        oled.text(f'gc{gc_ms_per_s:>4} ms/s{gc.mem_free() // 1024:>3}k', 0, 32)
+        oled.text(f'drop t{self.telemetry.dropped} ir{ir_dropped}', 0, 40)
+        y = 48
+        for module, count in self.state.exception_counts.items():
+            if y > 56:
+                break
+            oled.text(f'{module} {count}', 0, y)
+            y += 8
+        if y == 48:
+            oled.text('no faults', 0, y)
+        oled.show()
+        return True
+
+    def _render_display(self) -> bool:
+        if self._diagnostics:
+            return self._render_diagnostics()
+
+        # Redraw only the widgets whose value changed
+        # TODO add arrows for gyro/mouse
+        current_selecting_eye = self._ordered_eyes[self.state.ordered_selection_idx]
+        self._layout.update('eye', self.state.current_eye.name)
+        self._layout.update('selection', current_selecting_eye.name)
+        self._layout.update('mouse_x', self.state.mouse[0])
+        self._layout.update('mouse_y', self.state.mouse[1])
+        self._layout.update('flags', self._shown_flags)
+        if self._previews is not None:
+            self._layout.update('preview', self.state.current_eye.preview)
+        if not self._layout.dirty:
+            return False
+        self.ssd1306.show()
+        self._layout.dirty = False
+        return True
+
+    def _service_bus(self):
+        # Deferred OLED pages go out in the gap before the next sensor read
+        try:
+            self.i2c_bus.service()
+        except Exception as e:
+            self.state.last_exception = e
+            self.state.last_exception_module = 'oledflush'
+            self.state.enable_mouse = False
+            raise e
+
+    def _zero_alloc_start(self):
+        if self.mpu9250 is not None:
+            self._mouse_k = int(GYRO_TO_MOUSE_K * (1 << _MOUSE_SHIFT) / self.mpu9250.counts_per_unit)
+        self._collect()
+        gc.disable()
+
+    def _collect(self):
+        t = ticks_us()
+        gc.collect()
+        self.gc_us = ticks_diff(ticks_us(), t)
+        self.gc_total_us += self.gc_us
+        self._gc_ms = ticks_ms()
+        if _PROFILE:
+            self.loop_stats.add(_ST_GC, self.gc_us)
 
     def main_loop(self):
         while True:
-            self._setup()
+            # A fast boot keeps the devices set up by __init__
+            if not (FAST_BOOT and self._fresh):
+                self._setup()
+            self._fresh = False
 
             try:
                 self._initialize()
 
-                sleep_ms(1000)
-
+                if not FAST_BOOT:
+                    sleep_ms(1000)
+                self._boot_done()
+
+                # Hand the display over to the layout
+                self._show_layout()
+                self.i2c_bus.interleave = True
+                tel = self.telemetry
+                if ZERO_ALLOC:
+                    self._zero_alloc_start()
+                if _PROFILE:
+                    self.loop_stats.reset()
+                if _HEAP_GUARD:
+                    self.heap_guard.reset()
                 while True:
+                    if _HEAP_GUARD:
+                        a0 = gc.mem_alloc()
+                    t0 = ticks_us()
 
                     # Collect sensor data
                     self._input_data()
+                    t1 = ticks_us()
 
                     # Process sensor data
                     self._process_data()
+                    t2 = ticks_us()
 
                     # Output data
                     self._output_data()
+                    t3 = ticks_us()
+
+                    # Shared bus housekeeping
+                    self._service_bus()
+                    t4 = ticks_us()
+
+                    # Timing statistics and telemetry
+                    if _PROFILE:
+                        stats = self.loop_stats
+                        stats.add(_ST_INPUT, ticks_diff(t1, t0))
+                        stats.add(_ST_PROCESS, ticks_diff(t2, t1))
+                        stats.add(_ST_OUTPUT, ticks_diff(t3, t2))
+                        stats.add(_ST_BUS, ticks_diff(t4, t3))
+                        stats.add(_ST_LOOP, ticks_diff(t4, t0))
+                        stats.loop()
+                    if tel.binary:
+                        tel.sample(self.state.gyro, self.state.mouse,
+                                   ticks_diff(t1, t0), ticks_diff(t2, t1),
+                                   ticks_diff(t3, t2), ticks_diff(t4, t3),
+                                   self._feature_flags())
+                        tel.poll()
+                    if self.bus_recorder is not None:
+                        self.bus_recorder.poll()
+                    if _HEAP_GUARD:
+                        guard = self.heap_guard
+                        a1 = gc.mem_alloc()
+                        guard.add(_ST_LOOP, a1 - a0)
+                        guard.loop()
+
+                    # Idle point: the mouse report for this iteration is out
+                    # and the next sensor read can wait for a collection
+                    if ZERO_ALLOC and (ticks_diff(ticks_ms(), self._gc_ms) >= GC_PERIOD_MS or gc.mem_free() < GC_MIN_FREE):
+                        self._collect()
 
                     # # Sleep
                     # sleep_ms(LOOP_DELAY_MS)
 
+            # Handlers allocate: collect automatically again before they run.
+            # They write the display blocking, after sending any frame the
+            # arbiter still holds
             except KeyboardInterrupt:
+                gc.enable()
                 print('Exit')
+                self.i2c_bus.interleave = False
+                self.i2c_bus.flush()
+                if _PROFILE:
+                    self.loop_stats.report()
+                if _HEAP_GUARD:
+                    self.heap_guard.report()
+                self.i2c_bus.report()
+                if self.bus_trace is not None:
+                    self.bus_trace.report()
+                self.telemetry.flush()
+                if self.bus_recorder is not None:
+                    self.bus_recorder.close()
+                    print(f'[REC ] {self.bus_recorder.records} records, {self.bus_recorder.written} bytes, '
+                          f'{self.bus_recorder.dropped} dropped')
+                    if self.bus_recorder.full_ms is not None:
+                        print('[REC ] ring overflowed, recording stopped early; enlarge it or poll more often')
                 if self.ssd1306 is not None:
                     self.ssd1306.fill(0)
                     self.ssd1306.show()
@@ -452,26 +1009,28 @@ class Controller:
                 return
 
             except OSError as e:
+                gc.enable()
                 print(f'{e.errno} -> {errno.errorcode[e.errno]}')
+                self.i2c_bus.interleave = False
+                self.i2c_bus.flush()
                 if self.ssd1306 is not None:
-                    self._clear_display(show=True)
-                    self._typewrite_text(e.__class__.__name__, x=0, show=False)
-                    self._typewrite_text(str(e.errno), x=0, show=False)
-                    self._typewrite_text(errno.errorcode[e.errno], x=0, show=False)
-                    self._typewrite_text(self.state.last_exception.__class__.__name__, x=0, show=False)
-                    self._typewrite_text(self.state.last_exception_module, x=0, show=False)
-                    self.ssd1306.show()
+                    self._log(e.__class__.__name__)
+                    self._log(str(e.errno))
+                    self._log(errno.errorcode[e.errno])
+                    self._log(self.state.last_exception.__class__.__name__)
+                    self._log(str(self.state.last_exception_module))
                 sleep_ms(3000)
 
             except Exception as e:
+                gc.enable()
+                self.i2c_bus.interleave = False
+                self.i2c_bus.flush()
                 if self.ssd1306 is not None:
-                    self._clear_display(show=True)
-                    self._typewrite_text(e.__class__.__name__, x=0, show=False)
-                    self._typewrite_text(self.state.last_exception.__class__.__name__, x=0, show=False)
-                    self._typewrite_text(self.state.last_exception_module, x=0, show=False)
-                    self.ssd1306.show()
+                    self._log(e.__class__.__name__)
+                    self._log(self.state.last_exception.__class__.__name__)
+                    self._log(str(self.state.last_exception_module))
+                    self._log(str(e))
                 sleep_ms(3000)
-                # content = str(e)
-                # line_size = 128 // 8
-                # for i in range(min(6, len(content)//line_size)):
-                #     self._typewrite_text(content[i*line_size:(i+1)*line_size], x=0)
+
+            finally:
+                gc.enable()
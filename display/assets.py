@@ -0,0 +1,100 @@
+# Packed, run-length encoded bitmap assets streamed from flash.
+#
+# File layout (little endian):
+#   header  b'SKP2', count (u16), width (u8), height (u8)
+#   index   count x (offset (u32), length (u16), name (16 bytes, NUL padded))
+#           of each RLE stream
+#   data    RLE streams, each decoding to one MONO_VLSB bitmap
+#
+# RLE control bytes: c < 0x80 is followed by c + 1 literal bytes, c >= 0x80
+# repeats the next byte c - 0x7e times. Bitmaps are decoded straight from the
+# file in small chunks, so the pack is never loaded into RAM as a whole.
+# tools/pack_previews.py builds pack files from PBM images.
+
+# pylint: disable=import-error
+import framebuf
+import ustruct
+# pylint: enable=import-error
+
+MAGIC = b'SKP2'
+_HEADER = '<4sHBB'
+_HEADER_SIZE = 8
+_ENTRY = '<IH'
+_NAME_SIZE = 16
+_ENTRY_SIZE = 6 + _NAME_SIZE
+
+
+class AssetPack:
+    """Fixed-size bitmaps decoded on demand from a packed RLE asset file."""
+    def __init__(self, path: str, chunk: int=64):
+        self._file = open(path, 'rb')
+        magic, self.count, self.width, self.height = ustruct.unpack(_HEADER, self._file.read(_HEADER_SIZE))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError("Not an asset pack.")
+        self._index = bytearray(self.count * _ENTRY_SIZE)
+        self._file.readinto(self._index)
+
+        # Reusable decode buffers
+        self._size = self.width * ((self.height + 7) // 8)
+        self.bitmap = bytearray(self._size)
+        self.framebuf = framebuf.FrameBuffer(self.bitmap, self.width, self.height, framebuf.MONO_VLSB)
+        self._chunk = bytearray(chunk)
+        self.loaded = -1
+
+    def find(self, name: str):
+        """
+        Index of the bitmap packed under `name`, or None.
+        """
+        key = name.encode()
+        for idx in range(self.count):
+            pos = idx * _ENTRY_SIZE + 6
+            if bytes(self._index[pos:pos + _NAME_SIZE]).rstrip(b'\0') == key:
+                return idx
+        return None
+
+    def load(self, idx: int):
+        """
+        Decode bitmap `idx` into the shared buffer and return its FrameBuffer.
+        The previous bitmap is overwritten; reloading the current one is free.
+        """
+        if idx == self.loaded:
+            return self.framebuf
+        if not 0 <= idx < self.count:
+            raise IndexError("Asset index out of range.")
+        offset, length = ustruct.unpack_from(_ENTRY, self._index, idx * _ENTRY_SIZE)
+        self._file.seek(offset)
+        self.loaded = -1
+
+        bitmap = self.bitmap
+        chunk = self._chunk
+        pos = 0
+        literal = 0
+        run = 0
+        while length > 0:
+            n = self._file.readinto(chunk)
+            if not n:
+                raise ValueError("Truncated asset pack.")
+            n = min(n, length)
+            length -= n
+            for i in range(n):
+                b = chunk[i]
+                if literal:
+                    bitmap[pos] = b
+                    pos += 1
+                    literal -= 1
+                elif run:
+                    for _ in range(run):
+                        bitmap[pos] = b
+                        pos += 1
+                    run = 0
+                elif b < 0x80:
+                    literal = b + 1
+                else:
+                    run = b - 0x7e
+
+        self.loaded = idx
+        return self.framebuf
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,70 @@
+# Hardware-scrolled log console for the SSD1306.
+#
+# Each new line is drawn into the page after the previous one and the display
+# start line register is moved so that page shows up at the bottom. Scrolling
+# therefore costs one page write plus one command, instead of a full redraw.
+# Closing the console only resets the start line; whoever takes the display
+# over redraws it.
+
+_ROW_HEIGHT = 8
+
+
+class Console:
+    """Scrolling text log using the SSD1306 display start line."""
+    def __init__(self, display):
+        self.display = display
+        self.rows = display.height // _ROW_HEIGHT
+        self.cols = display.width // 8
+        # Physical row the next line goes into and number of rows in use
+        self._head = 0
+        self._count = 0
+        self.active = False
+
+    def open(self):
+        """
+        Take over the display, starting from a blank screen.
+        """
+        self._head = 0
+        self._count = 0
+        self.display.fill(0)
+        self.display.set_start_line(0)
+        self.display.show()
+        self.active = True
+
+    def close(self):
+        """
+        Give the display back with the start line reset, e.g. before handing
+        over to the layout, which redraws the screen.
+        """
+        if not self.active:
+            return
+        self.active = False
+        self.display.set_start_line(0)
+
+    def _write_row(self, text: str):
+        row = self._head
+        n = min(len(text), self.cols)
+        y = row * _ROW_HEIGHT
+        self.display.fill_rect(0, y, self.display.width, _ROW_HEIGHT, 0)
+        self.display.text(text[:n], 0, y)
+        # Only this row's page is dirty, so only it goes on the bus
+        self.display.show()
+
+        self._head = (row + 1) % self.rows
+        if self._count < self.rows:
+            self._count += 1
+        else:
+            # Full: the oldest row (the new head) moves to the top
+            self.display.set_start_line(self._head * _ROW_HEIGHT)
+
+    def log(self, text: str):
+        """
+        Append a line, wrapping long text over several rows.
+        """
+        if not self.active:
+            self.open()
+        if not text:
+            self._write_row('')
+            return
+        for start in range(0, len(text), self.cols):
+            self._write_row(text[start:start + self.cols])
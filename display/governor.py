@@ -0,0 +1,65 @@
+# Display frame-rate governor.
+#
+# Decouples OLED refreshes from the control loop: the render callback runs at
+# most max_fps times per second and always draws the latest state, so
+# intermediate states in between are coalesced away. High-priority changes can
+# request an immediate refresh.
+
+# pylint: disable=import-error
+from utime import ticks_us, ticks_diff
+# pylint: enable=import-error
+
+DEFAULT_MAX_FPS = 10
+
+# Statistics window
+_WINDOW_US = 1_000_000
+
+
+class FrameGovernor:
+    """Rate limiter for display refreshes with an immediate-refresh path."""
+    def __init__(self, render, max_fps: int=DEFAULT_MAX_FPS):
+        # render() draws the current state and returns True if a frame was sent
+        self._render = render
+        self.period_us = 0
+        self.set_max_fps(max_fps)
+        self._urgent = False
+        self._last = ticks_us() - self.period_us
+
+        # Achieved frame rate and display time, updated once per window
+        self.fps = 0
+        self.busy_us_per_s = 0
+        self._frames = 0
+        self._busy_us = 0
+        self._window_start = ticks_us()
+
+    def set_max_fps(self, max_fps: int):
+        self.period_us = 1_000_000 // max_fps
+
+    def request(self):
+        """
+        Refresh on the next poll regardless of the frame period.
+        """
+        self._urgent = True
+
+    def poll(self) -> bool:
+        """
+        Render if a frame is due. Returns True if a frame was sent.
+        """
+        now = ticks_us()
+        sent = False
+        if self._urgent or ticks_diff(now, self._last) >= self.period_us:
+            self._urgent = False
+            self._last = now
+            sent = self._render()
+            if sent:
+                self._frames += 1
+            self._busy_us += ticks_diff(ticks_us(), now)
+
+        elapsed = ticks_diff(now, self._window_start)
+        if elapsed >= _WINDOW_US:
+            self.fps = self._frames * 1_000_000 // elapsed
+            self.busy_us_per_s = self._busy_us * 1_000_000 // elapsed
+            self._frames = 0
+            self._busy_us = 0
+            self._window_start = now
+        return sent
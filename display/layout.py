@@ -0,0 +1,135 @@
+# Retained-mode OLED layout.
+#
+# Each widget remembers the value it last rendered and the area it covers, so
+# a frame only erases and redraws the widgets whose value actually changed.
+
+from display import text
+
+# Sentinel that never compares equal to a widget value
+_INVALID = object()
+
+
+class TextWidget:
+    """Single line of text at a fixed position, redrawn only on change."""
+    def __init__(self, name: str, x: int, y: int, prefix: str=''):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.prefix = prefix
+        self.value = _INVALID
+        # Bounding box of the last render
+        self.w = 0
+        self.h = 8
+
+    def render(self, value) -> str:
+        if self.prefix:
+            return self.prefix + str(value)
+        return str(value)
+
+    def draw(self, display, value):
+        label = self.render(value)
+        display.fill_rect(self.x, self.y, self.w, self.h, 0)
+        display.text(label, self.x, self.y)
+        self.w = 8 * len(label)
+
+    def set(self, display, value) -> bool:
+        if value == self.value:
+            return False
+        self.value = value
+        self.draw(display, value)
+        return True
+
+
+class FlagsWidget(TextWidget):
+    """Row of feature flags from a bitmask, most significant flag first."""
+    def __init__(self, name: str, x: int, y: int, count: int, on: str='-', off: str='X'):
+        super().__init__(name, x, y)
+        self.count = count
+        self.on = on
+        self.off = off
+
+    def render(self, value) -> str:
+        label = ''
+        for bit in range(self.count - 1, -1, -1):
+            label += self.on if value & (1 << bit) else self.off
+        return label
+
+
+class NumberWidget(TextWidget):
+    """
+    Fixed-width number drawn from a glyph table. Formatting and drawing don't
+    allocate, and blitted glyphs overwrite the previous value in place. Values
+    that don't fit in `width` characters are clamped to the widest that do.
+    """
+    def __init__(self, name: str, x: int, y: int, font: text.Font, prefix: str='', width: int=4, decimals: int=0):
+        super().__init__(name, x, y, prefix=prefix)
+        self.font = font
+        self.width = width
+        self.decimals = decimals
+        self._prefix = prefix.encode()
+        self._line = text.Line(len(self._prefix) + width + 2)
+        self._chars = len(self._prefix) + width
+        self.w = font.width * self._chars
+        self.h = font.height
+        # Range that fits, in units of 10**-decimals: the sign and whole part
+        # get what the decimals and the dot leave, with at least one digit
+        whole = width - (decimals + 1 if decimals else 0)
+        scale = 10 ** decimals
+        self._max = 10 ** max(whole, 1) * scale - 1
+        self._min = -(10 ** (whole - 1) * scale - 1) if whole > 1 else 0
+
+    def draw(self, display, value):
+        if value > self._max:
+            value = self._max
+        elif value < self._min:
+            value = self._min
+        line = self._line
+        line.clear()
+        line.put(self._prefix)
+        if self.decimals:
+            line.put_fixed(value, self.decimals, self.width)
+        else:
+            line.put_int(value, self.width)
+        text.draw(display, self.font, line, self.x, self.y, self._chars)
+
+
+class BitmapWidget(TextWidget):
+    """Bitmap from an asset pack, by index; None leaves the area blank."""
+    def __init__(self, name: str, x: int, y: int, pack):
+        super().__init__(name, x, y)
+        self.pack = pack
+        self.w = pack.width
+        self.h = pack.height
+
+    def draw(self, display, value):
+        if value is None:
+            display.fill_rect(self.x, self.y, self.w, self.h, 0)
+            return
+        display.framebuf.blit(self.pack.load(value), self.x, self.y)
+        display.invalidate(self.x, self.y, self.w, self.h)
+
+
+class Layout:
+    """Named widgets drawn into a display, tracking whether a show is due."""
+    def __init__(self, display):
+        self.display = display
+        self.widgets: dict[str, TextWidget] = {}
+        self.dirty = False
+
+    def add(self, widget: TextWidget) -> TextWidget:
+        self.widgets[widget.name] = widget
+        return widget
+
+    def update(self, name: str, value) -> bool:
+        if self.widgets[name].set(self.display, value):
+            self.dirty = True
+            return True
+        return False
+
+    def invalidate(self):
+        """
+        Forget rendered values, e.g. after the display was cleared, so every
+        widget redraws on its next update.
+        """
+        for widget in self.widgets.values():
+            widget.value = _INVALID
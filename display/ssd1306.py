@@ -5,6 +5,15 @@ import framebuf
 from utime import sleep_ms
 # pylint: enable=import-error
 
+# Background framebuffer transfers are only available on RP2040
+try:
+    # pylint: disable=import-error
+    import rp2
+    from machine import mem32
+    # pylint: enable=import-error
+except ImportError:
+    rp2 = None
+
 # register definitions
 # pylint: disable=undefined-variable
 SET_CONTRAST        = const(0x81)
@@ -26,21 +35,88 @@ SET_VCOM_DESEL      = const(0xdb)
 SET_CHARGE_PUMP     = const(0x8d)
 # pylint: enable=undefined-variable
 
+# Longest command sequence sent in a single transaction
+CMD_STREAM_MAX      = const(32)
+
+# I2C control byte preceding display data (Co=0, D/C#=1)
+_DATA_PREFIX        = b'\x40'
+
+# RP2040 PL022 SPI registers used for DMA transfers
+_SPI_BASE           = (0x4003c000, 0x40040000)
+_SPI_DREQ_TX        = (16, 18)
+_SSPDR              = const(0x008)
+_SSPSR              = const(0x00c)
+_SSPICR             = const(0x020)
+_SSPDMACR           = const(0x024)
+_SSPSR_RNE          = const(0x04)
+_SSPSR_BSY          = const(0x10)
+_SSPDMACR_TXDMAE    = const(0x02)
+_SSPICR_RORIC       = const(0x01)
+
 
 class SSD1306:
-    def __init__(self, width, height, external_vcc):
+    def __init__(self, width, height, external_vcc, prefix=b''):
         self.width = width
         self.height = height
         self.external_vcc = external_vcc
         self.pages = self.height // 8
-        # Note the subclass must initialize self.framebuf to a framebuffer.
-        # This is necessary because the underlying data buffer is different
-        # between I2C and SPI implementations (I2C needs an extra byte).
+        # Preallocated column/page window command sequence
+        self._window = bytearray((SET_COL_ADDR, 0, width - 1, SET_PAGE_ADDR, 0, self.pages - 1))
+
+        # Front and back framebuffers. Drawing goes to the back buffer while
+        # transfers read from the front one, and show() swaps them without
+        # copying, so chunked or background transfers never tear. Each buffer
+        # starts with `prefix`, reserved for the bus (the I2C data control
+        # byte); the framebuffer views skip it.
+        size = self.pages * width
+        offset = len(prefix)
+        self._bufs = (bytearray(prefix + bytes(size)), bytearray(prefix + bytes(size)))
+        self._views = (memoryview(self._bufs[0])[offset:], memoryview(self._bufs[1])[offset:])
+        self._fbs = (
+            framebuf.FrameBuffer1(self._views[0], width, height),
+            framebuf.FrameBuffer1(self._views[1], width, height),
+        )
+        # Per-page views of both buffers, and a staging buffer the changed
+        # span of a page goes out from. The page is copied in at an offset
+        # that puts the span's first column at `_span_at`, right after
+        # `prefix`, so every span length has a prebuilt view: slicing the
+        # framebuffer per span would allocate
+        self._pages = tuple(
+            tuple(view[page * width:(page + 1) * width] for page in range(self.pages))
+            for view in self._views
+        )
+        self._prefix = prefix
+        self._span_at = offset + width
+        self._stage = bytearray(offset + 2 * width)
+        self._spans = tuple(memoryview(self._stage)[width:width + offset + n] for n in range(width + 1))
+        self._back = 1
+        self.swap()
+
+        # Drawing methods mark dirty column spans per page (lo > hi means
+        # clean). show() trims them by diffing the back buffer against the
+        # front one and queues what is left for transfer, so only changed
+        # columns go on the bus. The front buffer only mirrors display RAM
+        # once a full frame was sent.
+        self._synced = False
+        self._dirty_lo = bytearray(self.pages)
+        self._dirty_hi = bytearray(self.pages)
+        self._tx_lo = bytearray(self.pages)
+        self._tx_hi = bytearray(self.pages)
+        for page in range(self.pages):
+            self._tx_lo[page] = 0xff
+            self._tx_hi[page] = 0
+        self._clean()
+
+        # Bytes-on-bus counters
+        self.bus_bytes = 0
+        self.frame_bytes = 0
+        self._frame_start = 0
+
         self.poweron()
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        self.write_cmds(bytes((
             SET_DISP | 0x00, # off
             # address setting
             SET_MEM_ADDR, 0x00, # horizontal
@@ -61,17 +137,24 @@ class SSD1306:
             SET_NORM_INV, # not inverted
             # charge pump
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
-            SET_DISP | 0x01): # on
-            self.write_cmd(cmd)
+            SET_DISP | 0x01, # on
+        )))
         self.fill(0)
-        self.show()
+        self.show(full=True)
 
     def write_cmd(self, cmd):
         pass
 
+    def write_cmds(self, cmds):
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
     def write_framebuf(self):
         pass
 
+    def write_data(self, buf):
+        pass
+
     def poweron(self):
         pass
 
@@ -79,39 +162,199 @@ class SSD1306:
         self.write_cmd(SET_DISP | 0x00)
 
     def contrast(self, contrast):
-        self.write_cmd(SET_CONTRAST)
-        self.write_cmd(contrast)
+        self.write_cmds(bytes((SET_CONTRAST, contrast)))
 
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
+    def set_start_line(self, line):
+        """
+        Display RAM row shown at the top of the panel, for hardware scrolling.
+        """
+        self.write_cmd(SET_DISP_START_LINE | (line & 0x3f))
+
+    def set_window(self, x0, x1, page0, page1):
         if self.width == 64:
             # displays with width of 64 pixels are shifted by 32
             x0 += 32
             x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_framebuf()
+        window = self._window
+        window[1] = x0
+        window[2] = x1
+        window[4] = page0
+        window[5] = page1
+        self.write_cmds(window)
+
+    def swap(self):
+        """
+        Flip which buffer is drawn and which is sent, without copying. show()
+        does this itself and then brings the changed spans of the new back
+        buffer up to date.
+        """
+        back = self._back ^ 1
+        self._back = back
+        self.buffer = self._bufs[back]
+        self.pixels = self._views[back]
+        self.framebuf = self._fbs[back]
+        self.front_buffer = self._bufs[back ^ 1]
+        self.front = self._views[back ^ 1]
+        self._front_pages = self._pages[back ^ 1]
+
+    def _clean(self):
+        for page in range(self.pages):
+            self._dirty_lo[page] = 0xff
+            self._dirty_hi[page] = 0
+
+    def invalidate(self, x=0, y=0, w=None, h=None):
+        """
+        Mark a region as dirty after drawing into `framebuf` directly. Without
+        arguments the whole display is marked.
+        """
+        if w is None:
+            w = self.width
+        if h is None:
+            h = self.height
+        x0 = max(x, 0)
+        x1 = min(x + w, self.width) - 1
+        if x1 < x0:
+            return
+        page0 = max(y, 0) // 8
+        page1 = (min(y + h, self.height) - 1) // 8
+        lo = self._dirty_lo
+        hi = self._dirty_hi
+        for page in range(page0, page1 + 1):
+            if x0 < lo[page]:
+                lo[page] = x0
+            if x1 > hi[page]:
+                hi[page] = x1
+
+    def _diff(self) -> bool:
+        # Trim the dirty spans to the columns where back and front differ
+        back = self.pixels
+        front = self.front
+        lo = self._dirty_lo
+        hi = self._dirty_hi
+        changed = False
+        for page in range(self.pages):
+            x0 = lo[page]
+            x1 = hi[page]
+            if x0 > x1:
+                continue
+            base = page * self.width
+            while x0 <= x1 and back[base + x0] == front[base + x0]:
+                x0 += 1
+            while x1 >= x0 and back[base + x1] == front[base + x1]:
+                x1 -= 1
+            if x0 > x1:
+                lo[page] = 0xff
+                hi[page] = 0
+                continue
+            lo[page] = x0
+            hi[page] = x1
+            changed = True
+        return changed
+
+    def _prepare(self, full=False) -> bool:
+        """
+        Swap the drawn frame to the front and queue its changes for transfer.
+        Returns False if nothing changed.
+        """
+        if full:
+            self.swap()
+            self.pixels[:] = self.front
+            for page in range(self.pages):
+                self._tx_lo[page] = 0
+                self._tx_hi[page] = self.width - 1
+            self._clean()
+            return True
+        if not self._diff():
+            return False
+        self.swap()
+        back = self.pixels
+        for page in range(self.pages):
+            x0 = self._dirty_lo[page]
+            x1 = self._dirty_hi[page]
+            if x0 > x1:
+                continue
+            # Changed pages are copied back to keep drawing persistent. Out
+            # of the span both buffers already match, so the whole page goes
+            # through its prebuilt view
+            base = page * self.width
+            back[base:base + self.width] = self._front_pages[page]
+            if x0 < self._tx_lo[page]:
+                self._tx_lo[page] = x0
+            if x1 > self._tx_hi[page]:
+                self._tx_hi[page] = x1
+        self._clean()
+        return True
+
+    def _tx_clean(self):
+        for page in range(self.pages):
+            self._tx_lo[page] = 0xff
+            self._tx_hi[page] = 0
+
+    def write_page_span(self, page) -> bool:
+        """
+        Transmit the queued span of a page from the front buffer. Returns True
+        if anything was sent.
+        """
+        x0 = self._tx_lo[page]
+        x1 = self._tx_hi[page]
+        if x0 > x1:
+            return False
+        self._tx_lo[page] = 0xff
+        self._tx_hi[page] = 0
+        stage = self._stage
+        at = self._span_at
+        stage[at - x0:at - x0 + self.width] = self._front_pages[page]
+        stage[at - len(self._prefix):at] = self._prefix
+        self.set_window(x0, x1, page, page)
+        self.write_data(self._spans[x1 - x0 + 1])
+        return True
+
+    def _end_frame(self):
+        self.frame_bytes = self.bus_bytes - self._frame_start
+        self._frame_start = self.bus_bytes
+
+    def show(self, full=False):
+        """
+        Transmit the framebuffer. Only the changed column span of each dirty
+        page is sent unless `full` is set, which resends the whole frame.
+        Bytes sent are reported in `frame_bytes`.
+        """
+        self._frame_start = self.bus_bytes
+        if full or not self._synced:
+            self._prepare(full=True)
+            self._tx_clean()
+            self.set_window(0, self.width - 1, 0, self.pages - 1)
+            self.write_framebuf()
+            self._synced = True
+        else:
+            self._prepare()
+            for page in range(self.pages):
+                self.write_page_span(page)
+        self._end_frame()
 
 # pylint: disable=no-member
     def fill(self, col):
         self.framebuf.fill(col)
+        self.invalidate()
+
+    def fill_rect(self, x, y, w, h, col):
+        self.framebuf.fill_rect(x, y, w, h, col)
+        self.invalidate(x, y, w, h)
 
     def pixel(self, x, y, col):
         self.framebuf.pixel(x, y, col)
+        self.invalidate(x, y, 1, 1)
 
     def scroll(self, dx, dy):
         self.framebuf.scroll(dx, dy)
+        self.invalidate()
 
     def text(self, string, x, y, col=1):
         self.framebuf.text(string, x, y, col)
+        self.invalidate(x, y, 8 * len(string), 8)
 # pylint: enable=no-member
 
 
@@ -120,32 +363,162 @@ class SSD1306_I2C(SSD1306):
         self.i2c = i2c
         self.addr = addr
         self.temp = bytearray(2)
-        # Add an extra byte to the data buffer to hold an I2C data/command byte
-        # to use hardware-compatible I2C transactions.  A memoryview of the
-        # buffer is used to mask this byte from the framebuffer operations
-        # (without a major memory hit as memoryview doesn't copy to a separate
-        # buffer).
-        self.buffer = bytearray(((height // 8) * width) + 1)
-        self.buffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
-        self.framebuf = framebuf.FrameBuffer1(memoryview(self.buffer)[1:], width, height)
-        super().__init__(width, height, external_vcc)
+        # Command stream buffer (Co=0, D/C#=0 followed by command bytes), with
+        # a prebuilt view per stream length so sending doesn't allocate
+        self._cmdbuf = bytearray(1 + CMD_STREAM_MAX)
+        self._cmdviews = tuple(memoryview(self._cmdbuf)[:n + 1] for n in range(CMD_STREAM_MAX + 1))
+        self._next_page = 0
+        # A deferred frame is going out page by page, and another one was
+        # drawn since it started
+        self._sending = False
+        self._frame_dirty = False
+        # Bus arbiter clients can take the frame in chunks between sensor reads
+        self._defer = getattr(i2c, 'defer', None)
+        # Reserve an extra leading byte in both framebuffers for the I2C
+        # data control byte (Co=0, D/C=1), so a full frame goes out in a
+        # single hardware-compatible transaction.
+        super().__init__(width, height, external_vcc, prefix=_DATA_PREFIX)
 
     def write_cmd(self, cmd):
         self.temp[0] = 0x80 # Co=1, D/C#=0
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
+        self.bus_bytes += 2
+
+    def write_cmds(self, cmds):
+        # Pack the whole sequence into as few transactions as possible
+        buf = self._cmdbuf
+        n = 0
+        for cmd in cmds:
+            if n == CMD_STREAM_MAX:
+                self.i2c.writeto(self.addr, self._cmdviews[n])
+                self.bus_bytes += n + 1
+                n = 0
+            n += 1
+            buf[n] = cmd
+        if n:
+            self.i2c.writeto(self.addr, self._cmdviews[n])
+            self.bus_bytes += n + 1
 
     def write_framebuf(self):
         # Blast out the frame buffer using a single I2C transaction to support
         # hardware I2C interfaces.
-        self.i2c.writeto(self.addr, self.buffer)
+        self.i2c.writeto(self.addr, self.front_buffer)
+        self.bus_bytes += len(self.front_buffer)
+
+    def write_data(self, buf):
+        # `buf` starts with the data control byte
+        self.i2c.writeto(self.addr, buf)
+        self.bus_bytes += len(buf)
+
+    def write_chunk(self) -> bool:
+        """
+        Send the next changed page of a deferred frame. Returns True while
+        pages remain. A frame drawn while this one was being sent follows it,
+        starting over from the first page.
+        """
+        if not self._sending:
+            # Already finished by show()
+            return False
+        page = self._next_page
+        while page < self.pages:
+            sent = self.write_page_span(page)
+            page += 1
+            if sent:
+                break
+        if page < self.pages:
+            self._next_page = page
+            return True
+        self._next_page = 0
+        self._end_frame()
+        if self._frame_dirty:
+            self._frame_dirty = False
+            if self._prepare():
+                return True
+        self._sending = False
+        return False
+
+    def show(self, full=False):
+        if self._sending:
+            if not full and self._defer(self):
+                # Restarting at page 0 on every show() would starve the
+                # later pages, so the new frame follows the one in flight
+                self._frame_dirty = True
+                return
+            # Interleaving was turned off mid-frame (or a full resend is
+            # due), so nothing else will send the rest of it: do it here
+            while self.write_chunk():
+                pass
+        if not full and self._synced and self._defer is not None:
+            if self._defer(self):
+                # Pages go out from the front buffer between sensor reads
+                self._sending = True
+                self._next_page = 0
+                self._prepare()
+                return
+        super().show(full=full)
 
     def poweron(self):
         pass
 
 
+class SPIDMA:
+    """Background transfer of a buffer into an RP2040 SPI TX FIFO."""
+    def __init__(self, spi_id):
+        if rp2 is None:
+            raise RuntimeError("DMA transfers need an RP2040.")
+        base = _SPI_BASE[spi_id]
+        self._dr = base + _SSPDR
+        self._sr = base + _SSPSR
+        self._icr = base + _SSPICR
+        self._dmacr = base + _SSPDMACR
+        self._dma = rp2.DMA()
+        self._ctrl = self._dma.pack_ctrl(size=0, inc_write=False, treq_sel=_SPI_DREQ_TX[spi_id])
+        self._active = False
+
+    def start(self, buf, count):
+        mem32[self._dmacr] = _SSPDMACR_TXDMAE
+        self._dma.config(read=buf, write=self._dr, count=count, ctrl=self._ctrl, trigger=True)
+        self._active = True
+
+    @property
+    def busy(self) -> bool:
+        """
+        Whether the transfer is still running, until the last byte has left
+        the shift register.
+        """
+        return self._active and bool(self._dma.active() or mem32[self._sr] & _SSPSR_BSY)
+
+    def finish(self):
+        """
+        Wait for the transfer to complete, then hand the SPI back to
+        blocking use.
+        """
+        if not self._active:
+            return
+        while self.busy:
+            pass
+        # Stop DMA requests, then drop the bytes clocked in while sending
+        mem32[self._dmacr] = 0
+        while mem32[self._sr] & _SSPSR_RNE:
+            _ = mem32[self._dr]
+        mem32[self._icr] = _SSPICR_RORIC
+        self._active = False
+
+    def close(self):
+        self.finish()
+        self._dma.close()
+
+
 class SSD1306_SPI(SSD1306):
-    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):
+    # The bus is configured once at construction; call configure() again if
+    # another device on the same SPI changes its settings.
+    # With dma_spi set to the SPI block number (RP2040 only), show() streams
+    # the front buffer in the background and returns immediately while
+    # drawing continues in the back buffer; `done` reports completion and
+    # wait() finishes the transfer, raising CS.
+    # Otherwise frames are written blocking.
+    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False, dma_spi=None):
         self.rate = 10 * 1024 * 1024
         dc.init(dc.OUT, value=0)
         res.init(res.OUT, value=0)
@@ -154,25 +527,82 @@ class SSD1306_SPI(SSD1306):
         self.dc = dc
         self.res = res
         self.cs = cs
-        self.buffer = bytearray((height // 8) * width)
-        self.framebuf = framebuf.FrameBuffer1(self.buffer, width, height)
+        self._cmd = bytearray(1)
+        self._dma = SPIDMA(dma_spi) if dma_spi is not None else None
+        self.configure()
         super().__init__(width, height, external_vcc)
 
-    def write_cmd(self, cmd):
+    @property
+    def done(self) -> bool:
+        """
+        Whether the last background frame transfer has completed.
+        """
+        return self._dma is None or not self._dma.busy
+
+    def wait(self):
+        """
+        Wait for the background frame transfer, then deselect the display.
+        """
+        if self._dma is not None:
+            self._dma.finish()
+        self.cs.high()
+
+    def configure(self):
         self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+
+    def write_cmd(self, cmd):
+        self._cmd[0] = cmd
+        self.write_cmds(self._cmd)
+
+    def write_cmds(self, cmds):
+        if self._dma is not None:
+            self.wait()
         self.cs.high()
         self.dc.low()
         self.cs.low()
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(cmds)
         self.cs.high()
+        self.bus_bytes += len(cmds)
 
     def write_framebuf(self):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        if self._dma is not None:
+            self.wait()
         self.cs.high()
         self.dc.high()
         self.cs.low()
-        self.spi.write(self.buffer)
+        self.spi.write(self.front_buffer)
         self.cs.high()
+        self.bus_bytes += len(self.front_buffer)
+
+    def write_data(self, buf):
+        if self._dma is not None:
+            self.wait()
+        self.cs.high()
+        self.dc.high()
+        self.cs.low()
+        self.spi.write(buf)
+        self.cs.high()
+        self.bus_bytes += len(buf)
+
+    def show(self, full=False):
+        if self._dma is None or not self._synced:
+            super().show(full=full)
+            return
+        # Background path: the front buffer must not be swapped while it is
+        # still being sent, so finish the previous transfer first
+        self.wait()
+        self._frame_start = self.bus_bytes
+        if not self._prepare(full=full):
+            self._end_frame()
+            return
+        self._tx_clean()
+        self.set_window(0, self.width - 1, 0, self.pages - 1)
+        self.cs.high()
+        self.dc.high()
+        self.cs.low()
+        self._dma.start(self.front_buffer, len(self.front_buffer))
+        self.bus_bytes += len(self.front_buffer)
+        self._end_frame()
 
     def poweron(self):
         self.res.high()
@@ -0,0 +1,186 @@
+# Glyph-cached text rendering for the OLED.
+#
+# Glyphs are kept in a byte table with one MONO_VLSB bitmap per character and
+# blitted into the framebuffer. Lines are composed into preallocated
+# bytearrays, including integer and fixed-point numbers, so redrawing
+# telemetry doesn't touch the heap.
+
+# pylint: disable=import-error
+import framebuf
+# pylint: enable=import-error
+
+# Printable ASCII range covered by the built-in font
+FIRST_CHAR = 32
+CHAR_COUNT = 96
+
+_SPACE = 32
+_MINUS = 45
+_DOT = 46
+_ZERO = 48
+
+_builtin = None
+
+
+class Font:
+    """Glyph table stored as bytes, one MONO_VLSB bitmap per character."""
+    def __init__(self, data, width: int, height: int, chars: bytes):
+        self.data = data
+        self.width = width
+        self.height = height
+        size = width * ((height + 7) // 8)
+        # One FrameBuffer per glyph over its slice of the table, built once
+        view = memoryview(data)
+        self.glyphs = tuple(
+            framebuf.FrameBuffer(view[i * size:(i + 1) * size], width, height, framebuf.MONO_VLSB)
+            for i in range(len(chars))
+        )
+        # Character code -> glyph index, unknown characters map to '?' (or
+        # the first glyph if the font has none)
+        self.lookup = bytearray(256)
+        fallback = chars.find(b'?')
+        if fallback >= 0:
+            for code in range(256):
+                self.lookup[code] = fallback
+        for i, code in enumerate(chars):
+            self.lookup[code] = i
+
+    def glyph(self, code: int):
+        return self.glyphs[self.lookup[code]]
+
+
+def builtin_font() -> Font:
+    """
+    The framebuf built-in 8x8 font, rendered once into a glyph table.
+    """
+    global _builtin # pylint: disable=global-statement
+    if _builtin is None:
+        table = bytearray(CHAR_COUNT * 8)
+        strip = framebuf.FrameBuffer(table, CHAR_COUNT * 8, 8, framebuf.MONO_VLSB)
+        for i in range(CHAR_COUNT):
+            strip.text(chr(FIRST_CHAR + i), i * 8, 0, 1)
+        _builtin = Font(table, 8, 8, bytes(range(FIRST_CHAR, FIRST_CHAR + CHAR_COUNT)))
+    return _builtin
+
+
+def scaled_font(base: Font, chars: str='0123456789-+.: ', scale: int=2) -> Font:
+    """
+    Compact larger font holding only `chars`, scaled up from `base`.
+    """
+    codes = chars.encode()
+    width = base.width * scale
+    height = base.height * scale
+    size = width * ((height + 7) // 8)
+    table = bytearray(size * len(codes))
+    for i, code in enumerate(codes):
+        src = base.glyph(code)
+        dst = framebuf.FrameBuffer(memoryview(table)[i * size:(i + 1) * size], width, height, framebuf.MONO_VLSB)
+        for y in range(base.height):
+            for x in range(base.width):
+                if src.pixel(x, y):
+                    dst.fill_rect(x * scale, y * scale, scale, scale, 1)
+    return Font(table, width, height, codes)
+
+
+class Line:
+    """Preallocated line of text composed without heap allocation."""
+    def __init__(self, size: int):
+        self.buf = bytearray(size)
+        self.n = 0
+
+    def clear(self):
+        self.n = 0
+
+    def put(self, data: bytes):
+        buf = self.buf
+        pos = self.n
+        for code in data:
+            buf[pos] = code
+            pos += 1
+        self.n = pos
+
+    def _put_uint(self, value: int, digits: int):
+        # Write exactly `digits` digits, least significant last
+        buf = self.buf
+        pos = self.n + digits
+        self.n = pos
+        for _ in range(digits):
+            pos -= 1
+            buf[pos] = _ZERO + value % 10
+            value //= 10
+
+    def _pad(self, count: int):
+        buf = self.buf
+        pos = self.n
+        for _ in range(count):
+            buf[pos] = _SPACE
+            pos += 1
+        self.n = pos
+
+    def put_int(self, value: int, width: int=0):
+        """
+        Append an integer, right-aligned in `width` characters.
+        """
+        neg = value < 0
+        if neg:
+            value = -value
+        digits = 1
+        rest = value
+        while rest >= 10:
+            rest //= 10
+            digits += 1
+        self._pad(width - digits - neg)
+        if neg:
+            self.buf[self.n] = _MINUS
+            self.n += 1
+        self._put_uint(value, digits)
+
+    def put_fixed(self, value: int, decimals: int, width: int=0):
+        """
+        Append a fixed-point number given as an integer scaled by
+        10**decimals, e.g. put_fixed(-1234, 2) writes '-12.34'.
+        """
+        neg = value < 0
+        if neg:
+            value = -value
+        scale = 1
+        for _ in range(decimals):
+            scale *= 10
+        whole = value // scale
+        digits = 1
+        rest = whole
+        while rest >= 10:
+            rest //= 10
+            digits += 1
+        self._pad(width - digits - neg - (decimals + 1 if decimals else 0))
+        if neg:
+            self.buf[self.n] = _MINUS
+            self.n += 1
+        self._put_uint(whole, digits)
+        if decimals:
+            self.buf[self.n] = _DOT
+            self.n += 1
+            self._put_uint(value % scale, decimals)
+
+
+def draw(display, font: Font, line: Line, x: int, y: int, chars: int=0):
+    """
+    Blit a line into the display's framebuffer, padding with blanks up to
+    `chars` characters so shorter values erase longer ones. With `chars`
+    set, longer lines are cut to it.
+    """
+    fb = display.framebuf
+    glyphs = font.glyphs
+    lookup = font.lookup
+    buf = line.buf
+    n = line.n
+    if chars and n > chars:
+        n = chars
+    cx = x
+    for i in range(n):
+        fb.blit(glyphs[lookup[buf[i]]], cx, y)
+        cx += font.width
+    blank = glyphs[lookup[_SPACE]]
+    for _ in range(chars - n):
+        fb.blit(blank, cx, y)
+        cx += font.width
+    display.invalidate(x, y, cx - x, font.height)
@@ -143,6 +143,16 @@ class MPU6500:
 
         return tuple(xyz)
 
+    def gyro_raw_into(self, out, buf=bytearray(6)):
+        """
+        X, Y, Z raw gyro counts as signed ints into `out`, without the
+        scaling and offset of `gyro` and without allocating.
+        """
+        self.i2c.readfrom_mem_into(self.address, _GYRO_XOUT_H, buf)
+        for i in range(3):
+            value = buf[2 * i] << 8 | buf[2 * i + 1]
+            out[i] = value - 0x10000 if value & 0x8000 else value
+
     @property
     def temperature(self):
         """
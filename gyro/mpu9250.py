@@ -26,6 +26,7 @@ MicroPython I2C driver for MPU9250 9-axis motion tracking device
 
 # pylint: disable=import-error
 import math
+from array import array
 
 from utime import sleep_ms
 from micropython import const
@@ -109,10 +110,15 @@ class BiasedMPU9250(MPU9250):
         super().__init__(i2c, mpu6500=mpu6500, ak8963=ak8963)
         self.calibration = (0., 0., 0.)
         self.calibration_deviation = (0., 0., 0.)
+        # Raw gyro counts per unit of `gyro`, and the calibration in counts
+        # for gyro_counts_into()
+        self.counts_per_unit = self.mpu6500._gyro_so / self.mpu6500._gyro_sf
+        self.calibration_counts = array('i', (0, 0, 0))
+        self._live_axes = 0b111
         if calibration_samples is not None:
             self.calibrate(calibration_samples)
 
-    def calibrate(self, samples: int):
+    def calibrate(self, samples: int, delay: int=10):
         (x, y, z) = (0., 0., 0.)
         sx = []
         sy = []
@@ -127,7 +133,7 @@ class BiasedMPU9250(MPU9250):
             x += dx / f
             y += dy / f
             z += dz / f
-            sleep_ms(10)
+            sleep_ms(delay)
 
         (dx, dy, dz) = (0., 0., 0.)
         for i in range(samples):
@@ -138,6 +144,13 @@ class BiasedMPU9250(MPU9250):
         self.calibration = (x, y, z)
         self.calibration_deviation = (math.sqrt(dx), math.sqrt(dy), math.sqrt(dz))
 
+        offset = self.mpu6500._gyro_offset
+        self._live_axes = 0
+        for i in range(3):
+            self.calibration_counts[i] = round((self.calibration[i] + offset[i]) * self.counts_per_unit)
+            if abs(self.calibration[i]) >= self.calibration_deviation[i]:
+                self._live_axes |= 1 << i
+
 
     @property
     def gyro(self):
@@ -155,6 +168,24 @@ class BiasedMPU9250(MPU9250):
             z = 0
         return (x, y, z)
 
+    def gyro_counts_into(self, out):
+        """
+        Calibrated X, Y, Z gyro in raw counts into `out`: the integer
+        counterpart of `gyro`, which doesn't allocate.
+        """
+        self.mpu6500.gyro_raw_into(out)
+        calibration = self.calibration_counts
+        live = self._live_axes
+        for i in range(3):
+            out[i] = out[i] - calibration[i] if live & (1 << i) else 0
+
+    def counts_to_gyro(self, counts) -> tuple[float, float, float]:
+        """
+        Gyro counts from gyro_counts_into() in the units of `gyro`.
+        """
+        k = 1 / self.counts_per_unit
+        return (counts[0] * k, counts[1] * k, counts[2] * k)
+
 if __name__ == '__main__':
     i2c = I2C(0, scl=Pin(5), sda=Pin(4))
     print(str(i2c.scan()))
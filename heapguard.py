@@ -0,0 +1,58 @@
+# Heap growth per control loop stage.
+#
+# With automatic collection off (see ZERO_ALLOC in controller.py) the heap in
+# use only grows between explicit collections, so gc.mem_alloc() read around
+# a stage tells how much it allocated. Stages still allocating once the loop
+# is warmed up are the leaks reported. Counts live in preallocated arrays, so
+# the guard doesn't add allocations of its own.
+
+# pylint: disable=import-error
+from array import array
+# pylint: enable=import-error
+
+
+class HeapGuard:
+    """Bytes allocated per loop stage after a warm-up."""
+    def __init__(self, names: tuple, warmup: int=20):
+        self.names = names
+        self.warmup = warmup
+        n = len(names)
+        self._hits = array('I', (0 for _ in range(n)))
+        self._bytes = array('I', (0 for _ in range(n)))
+        self._max = array('I', (0 for _ in range(n)))
+        self.loops = 0
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.names)):
+            self._hits[i] = 0
+            self._bytes[i] = 0
+            self._max[i] = 0
+        self.loops = 0
+
+    def add(self, stage: int, nbytes: int):
+        if nbytes <= 0 or self.loops < self.warmup:
+            return
+        self._hits[stage] += 1
+        self._bytes[stage] += nbytes
+        if nbytes > self._max[stage]:
+            self._max[stage] = nbytes
+
+    def loop(self):
+        self.loops += 1
+
+    def leaks(self) -> list[str]:
+        """
+        Names of the stages that allocated after the warm-up.
+        """
+        return [name for stage, name in enumerate(self.names) if self._hits[stage]]
+
+    def report(self):
+        loops = max(0, self.loops - self.warmup)
+        print(f'[HEAP] {loops} loops checked')
+        for stage, name in enumerate(self.names):
+            if hits := self._hits[stage]:
+                print(f'[HEAP] {name:8} allocated in {hits:6} loops, mean {self._bytes[stage] // hits:6} B, '
+                      f'max {self._max[stage]:6} B')
+        if not self.leaks():
+            print('[HEAP] no allocations')
@@ -10,9 +10,12 @@
 from array import array
 
 from machine import Timer, Pin
-from utime import ticks_us, ticks_diff
+from micropython import schedule
+from utime import ticks_ms, ticks_us, ticks_diff
 # pylint: enable=import-error
 
+from ir import protocols
+
 # from micropython import alloc_emergency_exception_buf
 # alloc_emergency_exception_buf(100)
 
@@ -21,22 +24,29 @@ from utime import ticks_us, ticks_diff
 # of each edge. When the timer times out decode the data. Duration must exceed
 # the worst case block transmission time, but be less than the interval between
 # a block start and a repeat code start (~108ms depending on protocol)
+# Once the leader mark ends the protocol is known, and the timer is shortened
+# to the capture window of that protocol.
+
+# With a queue, decoded frames are stored as (cmd, addr, ticks_ms, protocol) records in a
+# preallocated ring instead of running the callback in timer context; the
+# application drains them with read() at a point of its choosing. Decoding can
+# also be deferred out of the timer callback through micropython.schedule.
 
 
 class HX1838:
     Timer_id = -1  # Software timer but enable override
     # Result/error codes
     # Repeat button code
-    REPEAT = -1
+    REPEAT = protocols.REPEAT
     # Error codes
-    BADSTART = -2
-    BADBLOCK = -3
-    BADREP = -4
-    OVERRUN = -5
-    BADDATA = -6
-    BADADDR = -7
-
-    def __init__(self, pin, callback, *args, nedges=100, tblock=100):  # Optional args for callback
+    BADSTART = protocols.BADSTART
+    BADBLOCK = protocols.BADBLOCK
+    BADREP = protocols.BADREP
+    OVERRUN = protocols.OVERRUN
+    BADDATA = protocols.BADDATA
+    BADADDR = protocols.BADADDR
+
+    def __init__(self, pin, callback, *args, nedges=100, tblock=100, queue_len=0, scheduled=False, protos=protocols.ALL):  # Optional args for callback
         self._pin = pin
         self._nedges = nedges
         self._tblock = tblock
@@ -45,15 +55,25 @@ class HX1838:
         self._errf = lambda _: None
         self.verbose = False
 
+        # Event ring, 4 ints per record, one slot kept free to tell full from empty
+        self._queue_len = queue_len
+        self._events = array("i", (0 for _ in range(4 * queue_len)))
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
         self._times = array("i", (0 for _ in range(nedges + 1)))  # +1 for overrun
         pin.irq(handler=self._cb_pin, trigger=(Pin.IRQ_FALLING | Pin.IRQ_RISING))
         self.edge = 0
         self.tim = Timer(self.Timer_id)  # Defaul is sofware timer
-        self.cb = self.decode
+        if scheduled:
+            # Bound methods allocate, so keep the reference schedule() gets
+            self._decode = self.decode
+            self.cb = self._schedule_decode
+        else:
+            self.cb = self.decode
 
-        self._extended = False
-        self._addr = 0
-        self._leader = 4000  # 4.5ms for Samsung else 9ms
+        self._decoder = protocols.Decoder(protos)
 
     # Pin interrupt. Save time of each edge for later decode.
     def _cb_pin(self, line):
@@ -62,15 +82,61 @@ class HX1838:
         if self.edge <= self._nedges:  # Allow 1 extra pulse to record overrun
             if not self.edge:  # First edge received
                 self.tim.init(period=self._tblock, mode=Timer.ONE_SHOT, callback=self.cb)
+            elif self.edge == 1:  # End of the leader mark
+                desc = self._decoder.classify(ticks_diff(t, self._times[0]))
+                if desc is not None and desc[protocols.BLOCK] < self._tblock:
+                    self.tim.init(period=desc[protocols.BLOCK], mode=Timer.ONE_SHOT, callback=self.cb)
             self._times[self.edge] = t
             self.edge += 1
 
+    def _schedule_decode(self, _):
+        try:
+            schedule(self._decode, None)
+        except RuntimeError:  # Scheduler queue full, drop the frame
+            self.edge = 0
+
     def do_callback(self, cmd, addr, ext, thresh=0):
         self.edge = 0
-        if cmd >= thresh:
-            self.callback(cmd, addr, ext, *self.args)
-        else:
+        if cmd < thresh:
             self._errf(cmd)
+        elif self._queue_len:
+            self._push(cmd, addr, ext)
+        else:
+            self.callback(cmd, addr, ext, *self.args)
+
+    def _push(self, cmd, addr, proto):
+        head = self._head
+        nxt = head + 4
+        if nxt == 4 * self._queue_len:
+            nxt = 0
+        if nxt == self._tail:
+            self.dropped += 1
+            return
+        events = self._events
+        events[head] = cmd
+        events[head + 1] = addr
+        events[head + 2] = ticks_ms()
+        events[head + 3] = proto
+        self._head = nxt
+
+    def read(self, event) -> bool:
+        """
+        Pop the oldest queued (cmd, addr, ticks_ms, protocol) record into
+        `event`, a 4-slot array. Returns False if the queue is empty.
+        """
+        tail = self._tail
+        if tail == self._head:
+            return False
+        events = self._events
+        event[0] = events[tail]
+        event[1] = events[tail + 1]
+        event[2] = events[tail + 2]
+        event[3] = events[tail + 3]
+        tail += 4
+        if tail == 4 * self._queue_len:
+            tail = 0
+        self._tail = tail
+        return True
 
     def error_function(self, func):
         self._errf = func
@@ -80,42 +146,14 @@ class HX1838:
         self.tim.deinit()
 
     def decode(self, _):
-        try:
-            if self.edge > 68:
-                raise RuntimeError(self.OVERRUN)
-            width = ticks_diff(self._times[1], self._times[0])
-            if width < self._leader:  # 9ms leading mark for all valid data
-                raise RuntimeError(self.BADSTART)
-            width = ticks_diff(self._times[2], self._times[1])
-            if width > 3000:  # 4.5ms space for normal data
-                if self.edge < 68:  # Haven't received the correct number of edges
-                    raise RuntimeError(self.BADBLOCK)
-                # Time spaces only (marks are always 562.5µs)
-                # Space is 1.6875ms (1) or 562.5µs (0)
-                # Skip last bit which is always 1
-                val = 0
-                for edge in range(3, 68 - 2, 2):
-                    val >>= 1
-                    if ticks_diff(self._times[edge + 1], self._times[edge]) > 1120:
-                        val |= 0x80000000
-            elif width > 1700: # 2.5ms space for a repeat code. Should have exactly 4 edges.
-                raise RuntimeError(self.REPEAT if self.edge == 4 else self.BADREP)  # Treat REPEAT as error.
-            else:
-                raise RuntimeError(self.BADSTART)
-            addr = val & 0xff  # 8 bit addr
-            cmd = (val >> 16) & 0xff
-            if cmd != (val >> 24) ^ 0xff:
-                raise RuntimeError(self.BADDATA)
-            if addr != ((val >> 8) ^ 0xff) & 0xff:  # 8 bit addr doesn't match check
-                if not self._extended:
-                    raise RuntimeError(self.BADADDR)
-                addr |= val & 0xff00  # pass assumed 16 bit address to callback
-            self._addr = addr
-        except RuntimeError as e:
-            cmd = e.args[0]
-            addr = self._addr if cmd == self.REPEAT else 0  # REPEAT uses last address
+        decoder = self._decoder
+        if self.edge > self._nedges:
+            cmd = self.OVERRUN
+        else:
+            cmd = decoder.decode(self._times, self.edge)
+        addr = decoder.addr if cmd >= self.REPEAT else 0  # REPEAT uses last address
         # Set up for new data burst and run user callback
-        self.do_callback(cmd, addr, 0, self.REPEAT)
+        self.do_callback(cmd, addr, decoder.proto, self.REPEAT)
 
 if __name__ == '__main__':
     import gc
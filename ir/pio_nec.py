@@ -0,0 +1,160 @@
+# NEC IR receiver running on an RP2040 PIO state machine.
+#
+# The state machine times the bursts and gaps of a frame itself and shifts the
+# 32 data bits into the RX FIFO, so a whole frame costs one FIFO word instead
+# of ~68 pin interrupts and a timer callback. Repeat codes are recognised from
+# their short leader gap and pushed as an all-ones word, which can never pass
+# the NEC checksum. The FIFO doubles as the event queue: read() has the same
+# interface as HX1838.read(), which remains the fallback without PIO.
+#
+# Every push is followed by a state machine IRQ, whose handler stamps the
+# word into a ring running alongside the FIFO. Frames then carry the time they
+# arrived rather than the time the loop got to them, which the hold
+# detection in the controller relies on.
+#
+# Based on the nec_receive program from the Raspberry Pi pico-examples.
+
+# pylint: disable=import-error
+from array import array
+
+import rp2
+import uctypes
+from machine import mem32
+from utime import ticks_ms
+# pylint: enable=import-error
+
+from ir import protocols
+
+# One tick per 1/10 of the 562.5us NEC burst
+_SM_FREQ = 17_778
+_PIO_BASE = (0x50200000, 0x50300000)
+_FDEBUG = 0x008  # RXSTALL in bits 0-3, write 1 to clear
+# Joined RX FIFO depth, plus the free slot telling a full stamp ring from empty
+_STAMPS = 9
+
+
+# pylint: disable=undefined-variable
+@rp2.asm_pio(in_shiftdir=rp2.PIO.SHIFT_RIGHT, fifo_join=rp2.PIO.JOIN_RX)
+def _nec_receive():
+    wrap_target()
+    label("next_burst")
+    set(x, 30)                  # Bursts longer than ~3.4ms are a leader
+    wait(0, pin, 0)
+    label("burst_loop")
+    jmp(pin, "data_bit")
+    jmp(x_dec, "burst_loop")
+    mov(isr, null)              # Leader: start a new word
+    set(y, 31)                  # Bits left in it
+    wait(1, pin, 0)
+    nop()                   [31]
+    nop()                   [11]
+    jmp(pin, "next_burst")      # Still idle 2.5ms later: 4.5ms data gap
+    mov(isr, invert(null))      # Burst after 2.25ms: repeat code
+    push(noblock)
+    irq(rel(0))                 # Stamp the word
+    jmp("next_burst")
+    label("data_bit")
+    nop()                   [14]
+    in_(pins, 1)                # Short gap (0) if the next burst has started
+    jmp(y_dec, "next_burst")
+    push(noblock)               # 32nd bit, later ones wait for a leader
+    irq(rel(0))                 # Stamp the word
+    wrap()
+# pylint: enable=undefined-variable
+
+
+class PIONEC:
+    """NEC receiver decoding whole frames on a PIO state machine."""
+    # Protocols the state machine can receive, as a protocols.Decoder mask
+    PROTOCOLS = 1 << protocols.NEC | 1 << protocols.NEC_EXT
+    REPEAT = protocols.REPEAT
+    BADDATA = protocols.BADDATA
+    BADADDR = protocols.BADADDR
+
+    def __init__(self, pin, sm_id: int=0, protos: int=protocols.ALL):
+        self._extended = protos & (1 << protocols.NEC_EXT)
+        self._addr = 0
+        self._errf = lambda _: None
+        self.dropped = 0
+
+        # Words are pulled into a 32-bit slot and read back through a byte
+        # view, as a 32-bit int would be allocated on the heap
+        self._raw = array('I', (0,))
+        self._word = uctypes.bytearray_at(uctypes.addressof(self._raw), 4)
+        self._fdebug = _PIO_BASE[sm_id >> 2] + _FDEBUG
+        self._stall = 1 << (sm_id & 3)
+
+        # Arrival times of the words in the FIFO, in ticks_ms
+        self._stamps = array('i', (0 for _ in range(_STAMPS)))
+        self._head = 0
+        self._tail = 0
+
+        self._sm = rp2.StateMachine(sm_id, _nec_receive, freq=_SM_FREQ, in_base=pin, jmp_pin=pin)
+        self._sm.irq(self._stamp)
+        self._sm.active(1)
+
+    def _stamp(self, _sm):
+        head = self._head
+        nxt = head + 1
+        if nxt == _STAMPS:
+            nxt = 0
+        # A word dropped on a full FIFO leaves its stamp out as well
+        if nxt != self._tail:
+            self._stamps[head] = ticks_ms()
+            self._head = nxt
+
+    def _pop_stamp(self) -> int:
+        tail = self._tail
+        if tail == self._head:
+            # Word pushed but its IRQ not handled yet
+            return ticks_ms()
+        self._tail = tail + 1 if tail + 1 < _STAMPS else 0
+        return self._stamps[tail]
+
+    def error_function(self, func):
+        self._errf = func
+
+    def close(self):
+        self._sm.active(0)
+        self._sm.irq(None)
+
+    def read(self, event) -> bool:
+        """
+        Pop the oldest received frame as (cmd, addr, ticks_ms, protocol) into
+        `event`, a 4-slot array, like HX1838.read(); the time is when the
+        frame arrived. Frames failing the checksum are reported to the error
+        function and skipped. Returns False if nothing valid is pending.
+        """
+        if mem32[self._fdebug] & self._stall:
+            # FIFO was full and a word was dropped
+            mem32[self._fdebug] = self._stall
+            self.dropped += 1
+        sm = self._sm
+        word = self._word
+        while sm.rx_fifo():
+            sm.get(self._raw)
+            t = self._pop_stamp()
+            addr = word[0]
+            naddr = word[1]
+            cmd = word[2]
+            ncmd = word[3]
+            proto = protocols.NEC
+            if addr & naddr & cmd & ncmd == 0xff:
+                cmd = self.REPEAT
+                addr = self._addr
+            elif cmd != ncmd ^ 0xff:
+                self._errf(self.BADDATA)
+                continue
+            elif addr != naddr ^ 0xff:
+                if not self._extended:
+                    self._errf(self.BADADDR)
+                    continue
+                addr |= naddr << 8
+                proto = protocols.NEC_EXT
+            self._addr = addr
+            event[0] = cmd
+            event[1] = addr
+            event[2] = t
+            event[3] = proto
+            return True
+        return False
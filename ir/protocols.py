@@ -0,0 +1,217 @@
+# Table-driven IR protocol decoding from recorded edge times.
+#
+# Every protocol is a row of timings in PROTOCOLS. The protocol of a frame is
+# picked from its leader mark alone, so receivers can shorten their capture
+# window as soon as the first mark ends. Pulse distance (NEC, Samsung) and
+# pulse width (Sony SIRC) codings share one loop, which times either the
+# space or the mark of each bit; RC5 is Manchester coded and walked in half
+# bits instead.
+#
+# Edge times start at the first falling edge of the demodulated receiver
+# output, which is low during a burst: even edges start a mark, odd ones a
+# space.
+
+# pylint: disable=import-error
+from utime import ticks_diff
+# pylint: enable=import-error
+
+# Protocol ids, passed on with each frame
+NEC = 0
+NEC_EXT = 1
+SAMSUNG = 2
+SONY = 3
+RC5 = 4
+ALL = 0x1f
+
+# Result/error codes
+REPEAT = -1
+BADSTART = -2
+BADBLOCK = -3
+BADREP = -4
+OVERRUN = -5
+BADDATA = -6
+BADADDR = -7
+
+# Bit codings
+DISTANCE = 0  # Value in the space after each mark
+WIDTH = 1     # Value in the mark width
+BIPHASE = 2   # Value in the direction of the mid-bit transition
+
+# Descriptor fields
+ID = 0
+CODING = 1
+LEADER_MIN = 2  # Leader mark range (us)
+LEADER_MAX = 3
+SPLIT = 4       # Timed interval above this is a 1 (us), half bit for BIPHASE
+GAP = 5         # Untimed interval above this ends the frame (us)
+BITS_MIN = 6
+BITS_MAX = 7
+BLOCK = 8       # Capture window after the leader mark (ms)
+
+PROTOCOLS = (
+    # id      coding    leader        split gap   bits    block
+    (NEC,     DISTANCE, 7000, 11000,  1120, 1000, 32, 32, 100),
+    (SAMSUNG, DISTANCE, 3500, 5500,   1120, 1000, 32, 32, 75),
+    (SONY,    WIDTH,    2100, 3200,   900,  1000, 12, 20, 40),
+    (RC5,     BIPHASE,  600,  2100,   889,  0,    14, 14, 28),
+)
+
+# Interval standing for "the rest of the frame is idle" in the biphase walk
+_IDLE = 32
+
+
+class Decoder:
+    """Decodes one frame of edge times with the PROTOCOLS table."""
+    def __init__(self, protocols: int=ALL):
+        # Bitmask of accepted protocol ids
+        self.enabled = protocols
+        self.proto = NEC
+        self.addr = 0
+        self._bits = bytearray(4)
+        # Last RC5 frame, to tell held keys from new presses by the toggle bit
+        self._rc5_last = -1
+
+    def classify(self, mark: int):
+        """
+        Return the descriptor of the enabled protocol with a leader mark of
+        `mark` us, or None.
+        """
+        for desc in PROTOCOLS:
+            if desc[LEADER_MIN] <= mark < desc[LEADER_MAX]:
+                if self.enabled & (1 << desc[ID]):
+                    return desc
+                return None
+        return None
+
+    def decode(self, times, nedges: int) -> int:
+        """
+        Decode the first frame in `times[:nedges]`. Returns the command or a
+        negative result code; the address and protocol of the frame are left
+        in `addr` and `proto`. REPEAT keeps the address of the last frame.
+        """
+        if nedges < 3:
+            return BADSTART
+        desc = self.classify(ticks_diff(times[1], times[0]))
+        if desc is None:
+            return BADSTART
+        proto = desc[ID]
+        if proto == RC5:
+            return self._biphase(times, nedges, desc)
+        if proto == NEC:
+            space = ticks_diff(times[2], times[1])
+            if space < 3000:  # 2.25ms space for a repeat code, with exactly 4 edges
+                if space > 1700:
+                    if nedges != 4:
+                        return BADREP
+                    self.proto = NEC
+                    return REPEAT
+                return BADSTART
+
+        n = self._pulses(times, nedges, desc)
+        if n < desc[BITS_MIN]:
+            return BADBLOCK
+        bits = self._bits
+        if proto == SONY:
+            if n != 12 and n != 15 and n != 20:
+                return BADBLOCK
+            val = bits[0] | bits[1] << 8 | bits[2] << 16
+            self.proto = SONY
+            self.addr = val >> 7
+            return val & 0x7f
+
+        cmd = bits[2]
+        if cmd != bits[3] ^ 0xff:
+            return BADDATA
+        addr = bits[0]
+        if proto == SAMSUNG:
+            if addr != bits[1]:
+                return BADADDR
+        elif addr != bits[1] ^ 0xff:
+            if not self.enabled & (1 << NEC_EXT):
+                return BADADDR
+            proto = NEC_EXT
+            addr |= bits[1] << 8
+        self.proto = proto
+        self.addr = addr
+        return cmd
+
+    def _pulses(self, times, nedges: int, desc) -> int:
+        """
+        Shift pulse coded bits LSB first into `_bits`, returning their count.
+        Bit i is timed by the interval starting at edge `first + 2 * i`; the
+        interval before it is the other half of the bit and must stay short.
+        """
+        bits = self._bits
+        bits[0] = 0
+        bits[1] = 0
+        bits[2] = 0
+        bits[3] = 0
+        split = desc[SPLIT]
+        gap = desc[GAP]
+        nmax = desc[BITS_MAX]
+        e = 3 if desc[CODING] == DISTANCE else 2
+        n = 0
+        while n < nmax and e + 1 < nedges:
+            if ticks_diff(times[e], times[e - 1]) > gap:
+                break
+            if ticks_diff(times[e + 1], times[e]) > split:
+                bits[n >> 3] |= 1 << (n & 7)
+            n += 1
+            e += 2
+        return n
+
+    def _halves(self, times, nedges: int, e: int, unit: int) -> int:
+        # Half bits in the interval starting at edge e, 0 if invalid
+        if e + 1 >= nedges:
+            return _IDLE
+        width = ticks_diff(times[e + 1], times[e])
+        if width < unit + (unit >> 1):
+            return 1
+        if width < 2 * unit + (unit >> 1):
+            return 2
+        return _IDLE if e & 1 else 0
+
+    def _biphase(self, times, nedges: int, desc) -> int:
+        # The first edge is the middle of start bit S1, a 1. From there on
+        # each bit is two half bits of opposite level, the second one giving
+        # the value (mark = 1). Bits are sent MSB first: S1, S2 (inverted
+        # command bit 6), toggle, 5 address bits, 6 command bits.
+        unit = desc[SPLIT]
+        e = 0
+        level = 1
+        left = self._halves(times, nedges, 0, unit) - 1
+        if left < 0:
+            return BADBLOCK
+        val = 1
+        for _ in range(desc[BITS_MAX] - 1):
+            if not left:
+                e += 1
+                level ^= 1
+                left = self._halves(times, nedges, e, unit)
+                if not left:
+                    return BADBLOCK
+            first = level
+            left -= 1
+            if not left:
+                e += 1
+                level ^= 1
+                left = self._halves(times, nedges, e, unit)
+                if not left:
+                    return BADBLOCK
+            if first == level:
+                return BADDATA
+            left -= 1
+            val = (val << 1) | level
+
+        cmd = val & 0x3f
+        if not val & 0x1000:
+            cmd |= 0x40
+        addr = (val >> 6) & 0x1f
+        self.proto = RC5
+        frame = val & 0x1fff
+        if frame == self._rc5_last:
+            # Same toggle bit as the previous frame: the key is being held
+            return REPEAT
+        self._rc5_last = frame
+        self.addr = addr
+        return cmd
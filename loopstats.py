@@ -0,0 +1,109 @@
+# Control loop timing statistics.
+#
+# Durations are binned into fixed log2 histograms (bucket b holds 2**b to
+# 2**(b+1) - 1 us), kept with min/max/sum in preallocated arrays, so adding a
+# sample doesn't allocate. Percentiles are read back from the histograms and
+# are therefore rounded up to a power of two.
+# Sums carry into a second counter every 2**20 us, which keeps both within
+# MicroPython's small int range (adding doesn't allocate a long int) for
+# years of time spent in one stage.
+
+# pylint: disable=import-error
+from array import array
+
+from utime import ticks_ms, ticks_diff
+# pylint: enable=import-error
+
+BUCKETS = 17  # Up to 65.5ms, longer durations land in the last bucket
+_CARRY_SHIFT = 20
+_CARRY_MASK = (1 << _CARRY_SHIFT) - 1
+
+
+class LoopStats:
+    """Per-stage duration histograms and loop rate."""
+    def __init__(self, names: tuple):
+        self.names = names
+        n = len(names)
+        self._hist = array('I', (0 for _ in range(n * BUCKETS)))
+        self._count = array('I', (0 for _ in range(n)))
+        self._sum = array('I', (0 for _ in range(n)))
+        self._sum_hi = array('I', (0 for _ in range(n)))
+        self._min = array('I', (0 for _ in range(n)))
+        self._max = array('I', (0 for _ in range(n)))
+        self.loops = 0
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self._hist)):
+            self._hist[i] = 0
+        for i in range(len(self.names)):
+            self._count[i] = 0
+            self._sum[i] = 0
+            self._sum_hi[i] = 0
+            self._min[i] = 0xffffffff
+            self._max[i] = 0
+        self.loops = 0
+        self._since = ticks_ms()
+
+    def add(self, stage: int, us: int):
+        bucket = 0
+        v = us
+        while v > 1 and bucket < BUCKETS - 1:
+            v >>= 1
+            bucket += 1
+        self._hist[stage * BUCKETS + bucket] += 1
+        self._count[stage] += 1
+        total = self._sum[stage] + us
+        if total > _CARRY_MASK:
+            self._sum_hi[stage] += total >> _CARRY_SHIFT
+            total &= _CARRY_MASK
+        self._sum[stage] = total
+        if us < self._min[stage]:
+            self._min[stage] = us
+        if us > self._max[stage]:
+            self._max[stage] = us
+
+    def loop(self):
+        self.loops += 1
+
+    def count(self, stage: int) -> int:
+        return self._count[stage]
+
+    def loops_per_s(self) -> float:
+        elapsed = ticks_diff(ticks_ms(), self._since)
+        return self.loops * 1000 / elapsed if elapsed > 0 else 0.
+
+    def percentile(self, stage: int, pct: float) -> int:
+        """
+        Upper bound of the bucket holding the `pct` percentile of a stage.
+        """
+        target = self._count[stage] * pct / 100
+        seen = 0
+        base = stage * BUCKETS
+        for bucket in range(BUCKETS):
+            seen += self._hist[base + bucket]
+            if seen >= target:
+                return (2 << bucket) - 1
+        return self._max[stage]
+
+    def stats(self, stage: int) -> tuple[int, float, int, int]:
+        """
+        (min, mean, p99, max) of a stage in us.
+        """
+        count = self._count[stage]
+        if not count:
+            return 0, 0., 0, 0
+        total = self._sum_hi[stage] * (1 << _CARRY_SHIFT) + self._sum[stage]
+        return self._min[stage], total / count, min(self.percentile(stage, 99), self._max[stage]), self._max[stage]
+
+    def report(self):
+        """
+        Print the loop rate and each stage's stats. p99 is the upper bound of
+        its power-of-two histogram bucket, so it reads up to twice the actual
+        percentile, capped at the max.
+        """
+        print(f'[LOOP] {self.loops_per_s():.1f} loops/s')
+        for stage, name in enumerate(self.names):
+            if self._count[stage]:
+                lo, mean, p99, hi = self.stats(stage)
+                print(f'[LOOP] {name:8} min {lo:6} mean {mean:8.1f} p99 {p99:6} max {hi:6} us')
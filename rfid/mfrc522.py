@@ -13,11 +13,13 @@ class MFRC522:
     AUTHENT1A = 0x60
     AUTHENT1B = 0x61
 
-    def __init__(self, sck, mosi, miso, rst, cs):
+    def __init__(self, sck, mosi, miso, rst, cs, spi=None):
 
-        self.sck = Pin(sck, Pin.OUT)
-        self.mosi = Pin(mosi, Pin.OUT)
-        self.miso = Pin(miso)
+        # An SPI bus passed in must already be set up on sck/mosi/miso
+        if spi is None:
+            self.sck = Pin(sck, Pin.OUT)
+            self.mosi = Pin(mosi, Pin.OUT)
+            self.miso = Pin(miso)
         if rst is not None:
             self.rst = Pin(rst, Pin.OUT)
         else:
@@ -28,7 +30,17 @@ class MFRC522:
             self.rst.value(0)
         self.cs.value(1)
 
-        self.spi = SPI(0,baudrate=1000000,sck=self.sck, mosi= self.mosi, miso= self.miso)
+        if spi is None:
+            spi = SPI(0,baudrate=1000000,sck=self.sck, mosi= self.mosi, miso= self.miso)
+        self.spi = spi
+
+        # Transfer buffers, so polling for a tag doesn't allocate
+        self._wbuf = bytearray(1)
+        self._rbuf = bytearray(1)
+        self._req = bytearray(1)
+        self.recv = bytearray(16)
+        self.recv_len = 0
+        self.bits = 0
 
         if rst is not None:
             self.rst.value(1)
@@ -36,19 +48,24 @@ class MFRC522:
 
     def _wreg(self, reg, val):
 
+        buf = self._wbuf
         self.cs.value(0)
-        self.spi.write(b'%c' % int(0xff & ((reg << 1) & 0x7e)))
-        self.spi.write(b'%c' % int(0xff & val))
+        buf[0] = (reg << 1) & 0x7e
+        self.spi.write(buf)
+        buf[0] = 0xff & val
+        self.spi.write(buf)
         self.cs.value(1)
 
     def _rreg(self, reg):
 
+        buf = self._wbuf
         self.cs.value(0)
-        self.spi.write(b'%c' % int(0xff & (((reg << 1) & 0x7e) | 0x80)))
-        val = self.spi.read(1)
+        buf[0] = ((reg << 1) & 0x7e) | 0x80
+        self.spi.write(buf)
+        self.spi.readinto(self._rbuf)
         self.cs.value(1)
 
-        return val[0]
+        return self._rbuf[0]
 
     def _sflags(self, reg, mask):
         self._wreg(reg, self._rreg(reg) | mask)
@@ -57,9 +74,13 @@ class MFRC522:
         self._wreg(reg, self._rreg(reg) & (~mask))
 
     def _tocard(self, cmd, send):
+        """
+        Run `cmd` on the bytes of `send`. Returns the status, the bytes
+        received are left in recv[:recv_len] and their bit count in `bits`.
+        """
 
-        recv = []
         bits = irq_en = wait_irq = n = 0
+        self.recv_len = 0
         stat = self.ERR
 
         if cmd == 0x0E:
@@ -74,8 +95,8 @@ class MFRC522:
         self._sflags(0x0A, 0x80)
         self._wreg(0x01, 0x00)
 
-        for c in send:
-            self._wreg(0x09, c)
+        for i in range(len(send)):
+            self._wreg(0x09, send[i])
         self._wreg(0x01, cmd)
 
         if cmd == 0x0C:
@@ -109,12 +130,17 @@ class MFRC522:
                     elif n > 16:
                         n = 16
 
-                    for _ in range(n):
-                        recv.append(self._rreg(0x09))
+                    for i in range(n):
+                        self.recv[i] = self._rreg(0x09)
+                    self.recv_len = n
             else:
                 stat = self.ERR
 
-        return stat, recv, bits
+        self.bits = bits
+        return stat
+
+    def _received(self):
+        return list(self.recv[:self.recv_len])
 
     def _crc(self, data):
 
@@ -158,28 +184,35 @@ class MFRC522:
 
     def request(self, mode):
 
-        self._wreg(0x0D, 0x07)
-        (stat, recv, bits) = self._tocard(0x0C, [mode])
+        stat = self._request(mode)
+        return stat, self.bits
+
+    def _request(self, mode):
 
-        # print("request {} {} {}".format(stat, recv, bits))
+        self._wreg(0x0D, 0x07)
+        self._req[0] = mode
+        stat = self._tocard(0x0C, self._req)
 
-        if (stat != self.OK) | (bits != 0x10):
+        if (stat != self.OK) | (self.bits != 0x10):
             stat = self.ERR
 
-        return stat, bits
+        return stat
 
     def anticoll(self):
 
+        stat = self._anticoll()
+        return stat, self._received()
+
+    def _anticoll(self):
+
         ser_chk = 0
-        ser = [0x93, 0x20]
 
         self._wreg(0x0D, 0x00)
-        (stat, recv, bits) = self._tocard(0x0C, ser)
-
-        # print("anticoll {} {} {}".format(stat, recv, bits))
+        stat = self._tocard(0x0C, b'\x93\x20')
 
         if stat == self.OK:
-            if len(recv) == 5:
+            recv = self.recv
+            if self.recv_len == 5:
                 for i in range(4):
                     ser_chk = ser_chk ^ recv[i]
                 if ser_chk != recv[4]:
@@ -187,17 +220,17 @@ class MFRC522:
             else:
                 stat = self.ERR
 
-        return stat, recv
+        return stat
 
     def select_tag(self, ser):
 
         buf = [0x93, 0x70] + ser[:5]
         buf += self._crc(buf)
-        (stat, recv, bits) = self._tocard(0x0C, buf)
-        return self.OK if (stat == self.OK) and (bits == 0x18) else self.ERR
+        stat = self._tocard(0x0C, buf)
+        return self.OK if (stat == self.OK) and (self.bits == 0x18) else self.ERR
 
     def auth(self, mode, addr, sect, ser):
-        return self._tocard(0x0E, [mode, addr] + sect + ser[:4])[0]
+        return self._tocard(0x0E, [mode, addr] + sect + ser[:4])
 
     def stop_crypto1(self):
         self._cflags(0x08, 0x08)
@@ -206,52 +239,55 @@ class MFRC522:
 
         data = [0x30, addr]
         data += self._crc(data)
-        (stat, recv, _) = self._tocard(0x0C, data)
-        return recv if stat == self.OK else None
+        stat = self._tocard(0x0C, data)
+        return self._received() if stat == self.OK else None
+
+    def _acked(self, stat) -> bool:
+        # A write is acknowledged by one 4 bit reply, 0xA. recv[0] is only
+        # looked at if this exchange filled it, not left over from another
+        return stat == self.OK and self.bits == 4 and self.recv_len == 1 and (self.recv[0] & 0x0F) == 0x0A
 
     def write(self, addr, data):
 
         buf = [0xA0, addr]
         buf += self._crc(buf)
-        (stat, recv, bits) = self._tocard(0x0C, buf)
+        stat = self._tocard(0x0C, buf)
 
-        if not (stat == self.OK) or not (bits == 4) or not ((recv[0] & 0x0F) == 0x0A):
+        if not self._acked(stat):
             stat = self.ERR
         else:
             buf = []
             for i in range(16):
                 buf.append(data[i])
             buf += self._crc(buf)
-            (stat, recv, bits) = self._tocard(0x0C, buf)
-            if not (stat == self.OK) or not (bits == 4) or not ((recv[0] & 0x0F) == 0x0A):
+            stat = self._tocard(0x0C, buf)
+            if not self._acked(stat):
                 stat = self.ERR
 
         return stat
 
     def get_uid(self):
-        (stat, tag_type) = self.request(self.REQIDL)
-
-        if stat == self.OK:
-
-            (stat, raw_uid) = self.anticoll()
-
-            if stat == self.OK:
-                # print("New card detected")
-                # print("  - tag type: 0x%02x" % tag_type)
-                # print("  - uid	 : 0x%02x%02x%02x%02x" % (raw_uid[0], raw_uid[1], raw_uid[2], raw_uid[3]))
-                print(f'[RFID] {raw_uid[0]:02X}:{raw_uid[1]:02X}:{raw_uid[2]:02X}:{raw_uid[3]:02X}')
-                
-                return raw_uid
-
+        if self.read_uid():
+            return self._received()
         return None
 
+    def read_uid(self) -> bool:
+        """
+        Look for a tag, leaving its UID and check byte in recv[:5]. Doesn't
+        allocate.
+        """
+        if self._request(self.REQIDL) == self.OK:
+            return self._anticoll() == self.OK
+        return False
+
     @property
     def tag(self) -> str|None:
         """
-        Current tag on reader.
+        Current tag on reader. Only a tag being present allocates.
         """
         self.init()
-        if uid := self.get_uid():
+        if self.read_uid():
+            uid = self.recv
             return f"{uid[0]:02X}:{uid[1]:02X}:{uid[2]:02X}:{uid[3]:02X}"
         return None
 
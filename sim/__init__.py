@@ -0,0 +1,3 @@
+# Simulator for running the controller on Linux, under CPython or the
+# MicroPython Unix port, against register-level models of the board's chips.
+# See sim/run.py.
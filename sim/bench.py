@@ -0,0 +1,248 @@
+"""
+End-to-end latency and throughput benchmark on the simulated board.
+
+Boots main.py on the simulator, then injects timestamped stimuli and matches
+them with the HID reports they cause:
+
+    gyro  rotation step -> first mouse report moving that way
+    tag   tag placed on the reader -> the eye's key press
+    ir    start of an NEC frame for an eye shortcut -> the eye's key press
+
+followed by a stretch of continuous rotation to measure throughput, and
+reports the boot time up to the main loop. Stimuli
+are spread over the loop period with a seeded phase, so the latency
+distributions cover where in the loop they land, and the whole run is
+deterministic. Results can be saved as a JSON baseline and later runs checked
+against it:
+
+    python -m sim.bench --save sim/bench_baseline.json
+    python -m sim.bench --check sim/bench_baseline.json
+
+--check exits with status 1 when a latency or the boot time grew, the
+throughput dropped or more stimuli went unanswered than in the baseline.
+"""
+
+import json
+import sys
+
+from sim import board, devices, run
+
+VERSION = 1
+
+# Main loop running by then, also without FAST_BOOT, in s
+START = 14.
+
+# Trials per stimulus and time between them in s
+TRIALS = 20
+GYRO_PERIOD = 0.6
+GYRO_HOLD = 0.3
+GYRO_RATE = (60., 0., 0.)
+TAG_PERIOD = 1.
+TAG_HOLD = 0.3
+IR_PERIOD = 1.
+THROUGHPUT_S = 3.
+THROUGHPUT_RATE = (45., 0., -30.)
+
+# Stimulus phase jitter in s, about one loop period
+JITTER = 0.06
+
+# Tags and remote shortcuts of the named eyes in main.py, cycled through
+TAG_UIDS = ('19:80:F6:04', 'C5:56:64:01', '83:C4:B9:27', 'C3:57:B2:27', '83:0A:47:28')
+IR_CODES = (0x0C, 0x18, 0x5E, 0x08, 0x1C)
+
+# Allowed change against a baseline before --check fails
+TOLERANCE = 0.1
+SLACK_US = 500
+
+
+class Trial:
+    """A stimulus at `t` us, answered by a report at `answer` us."""
+    def __init__(self, kind: str, t: int, expect):
+        self.kind = kind
+        self.t = t
+        self.expect = expect
+        self.answer = None
+
+
+def schedule(sim: board.Board, trials: int, start: float, seed: int) -> tuple[list[Trial], tuple[int, int]]:
+    """
+    Queue every stimulus on the board. Returns the trials and the throughput
+    window in us.
+    """
+    jitter = devices.Random(seed)
+    plan = []
+    t = start
+    for _ in range(trials):
+        at = t + (jitter.uniform() + 1) / 2 * JITTER
+        sim.motion.step(at, GYRO_RATE)
+        sim.motion.step(at + GYRO_HOLD, (0., 0., 0.))
+        plan.append(Trial('gyro', int(at * 1e6), 1))
+        t += GYRO_PERIOD
+    for i in range(trials):
+        at = t + (jitter.uniform() + 1) / 2 * JITTER
+        uid = TAG_UIDS[i % len(TAG_UIDS)]
+        sim.tag(uid, at, TAG_HOLD)
+        plan.append(Trial('tag', int(at * 1e6), uid))
+        t += TAG_PERIOD
+    for i in range(trials):
+        at = t + (jitter.uniform() + 1) / 2 * JITTER
+        code = IR_CODES[i % len(IR_CODES)]
+        sim.remote.press(at, code)
+        plan.append(Trial('ir', int(at * 1e6), code))
+        t += IR_PERIOD
+    sim.motion.step(t, THROUGHPUT_RATE)
+    sim.motion.step(t + THROUGHPUT_S, (0., 0., 0.))
+    window = (int(t * 1e6), int((t + THROUGHPUT_S) * 1e6))
+    return plan, window
+
+
+def match(plan: list[Trial], reports: list, eyes: list):
+    """
+    Answer each trial with the first matching report before the next trial.
+    """
+    keys_by_tag = {eye.rfid: eye.key for eye in eyes}
+    keys_by_ir = {eye.ir: eye.key for eye in eyes if eye.ir is not None}
+    for n, trial in enumerate(plan):
+        end = plan[n + 1].t if n + 1 < len(plan) else None
+        if trial.kind == 'gyro':
+            kind = 'mouse'
+            wanted = lambda payload: payload[0] * trial.expect > 0
+        else:
+            kind = 'keys'
+            key = keys_by_tag[trial.expect] if trial.kind == 'tag' else keys_by_ir[trial.expect]
+            wanted = lambda payload, key=key: payload == (key,)
+        for t, report_kind, payload in reports:
+            if t < trial.t or report_kind != kind:
+                continue
+            if end is not None and t >= end:
+                break
+            if wanted(payload):
+                trial.answer = t
+                break
+
+
+def distribution(values: list[int]) -> dict:
+    if not values:
+        return {'n': 0}
+    values = sorted(values)
+    pick = lambda pct: values[min(len(values) - 1, int(len(values) * pct / 100))]
+    return {
+        'n': len(values),
+        'min': values[0],
+        'p50': pick(50),
+        'p90': pick(90),
+        'max': values[-1],
+        'mean': sum(values) // len(values),
+    }
+
+
+def results(sim: board.Board, plan: list[Trial], window: tuple[int, int], samples: tuple[int, int], seed: int,
+            boot_ms: int) -> dict:
+    latency = {}
+    missed = {}
+    for kind in ('gyro', 'tag', 'ir'):
+        trials = [trial for trial in plan if trial.kind == kind]
+        latency[kind] = distribution([trial.answer - trial.t for trial in trials if trial.answer is not None])
+        missed[kind] = sum(1 for trial in trials if trial.answer is None)
+    seconds = (window[1] - window[0]) / 1e6
+    moves = [r for r in sim.reports('mouse') if window[0] <= r[0] < window[1]]
+    return {
+        'version': VERSION,
+        'seed': seed,
+        'boot_ms': boot_ms,
+        'latency_us': latency,
+        'missed': missed,
+        'throughput': {
+            'mouse_reports_per_s': round(len(moves) / seconds, 1),
+            'gyro_samples_per_s': round((samples[1] - samples[0]) / seconds, 1),
+        },
+    }
+
+
+def report(result: dict):
+    print(f'{"stimulus":>8} {"n":>4} {"miss":>4} {"min":>8} {"p50":>8} {"p90":>8} {"max":>8} {"mean":>8}  (ms)')
+    for kind, dist in result['latency_us'].items():
+        missed = result['missed'][kind]
+        if not dist['n']:
+            print(f'{kind:>8} {0:>4} {missed:>4}')
+            continue
+        columns = ' '.join(f'{dist[k] / 1000:>8.1f}' for k in ('min', 'p50', 'p90', 'max', 'mean'))
+        print(f'{kind:>8} {dist["n"]:>4} {missed:>4} {columns}')
+    for name, value in result['throughput'].items():
+        print(f'{name}: {value}')
+    print(f'boot: {result["boot_ms"]} ms')
+
+
+def check(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regressions of `result` against `baseline`, as messages.
+    """
+    problems = []
+    for kind, dist in baseline['latency_us'].items():
+        new = result['latency_us'].get(kind, {'n': 0})
+        if not new['n']:
+            if dist['n']:
+                problems.append(f'{kind}: no answered trials')
+            continue
+        for stat in ('p50', 'p90', 'max'):
+            if stat in dist and new[stat] > dist[stat] * (1 + tolerance) + SLACK_US:
+                problems.append(f'{kind} {stat} latency {new[stat]} us, baseline {dist[stat]} us')
+    for kind, count in baseline['missed'].items():
+        if result['missed'].get(kind, 0) > count:
+            problems.append(f'{kind}: {result["missed"][kind]} missed, baseline {count}')
+    for name, value in baseline['throughput'].items():
+        if result['throughput'].get(name, 0) < value * (1 - tolerance):
+            problems.append(f'{name} {result["throughput"].get(name, 0)}, baseline {value}')
+    if 'boot_ms' in baseline and result['boot_ms'] > baseline['boot_ms'] * (1 + tolerance) + SLACK_US // 1000:
+        problems.append(f'boot {result["boot_ms"]} ms, baseline {baseline["boot_ms"]} ms')
+    return problems
+
+
+def main(argv: list[str]) -> int:
+    import argparse  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trials', type=int, default=TRIALS, help='trials per stimulus')
+    parser.add_argument('--start', type=float, default=START, help='first stimulus in s, after boot')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--root', default='.', help='repository root holding main.py')
+    parser.add_argument('--save', metavar='FILE', help='write the results as a JSON baseline')
+    parser.add_argument('--check', metavar='FILE', help='compare against a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    sim = board.Board(seed=args.seed)
+    plan, window = schedule(sim, args.trials, args.start, args.seed)
+    # Stop shortly after the throughput window
+    sim.clock.deadline = window[1] + 500_000
+
+    # Gyro samples taken during the throughput window
+    samples = [0, 0]
+    sim.clock.at(window[0], lambda: samples.__setitem__(0, sim.mpu6500.samples))
+    sim.clock.at(window[1], lambda: samples.__setitem__(1, sim.mpu6500.samples))
+
+    namespace = run.run_main(args.root)
+    if 'eyes' not in namespace:
+        print('[BENCH] main.py did not finish booting')
+        return 2
+    match(plan, sim.world.reports, namespace['eyes'])
+    result = results(sim, plan, window, samples, args.seed, namespace['controller'].boot_ms)
+    report(result)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)
+        problems = check(result, baseline, args.tolerance)
+        for problem in problems:
+            print(f'[BENCH] regression: {problem}')
+        if problems:
+            return 1
+        print('[BENCH] no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
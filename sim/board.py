@@ -0,0 +1,42 @@
+# The board as wired in controller.py, with a model behind every device.
+
+from sim import devices, world
+
+# Pins and buses from controller.py
+I2C_ID = 0
+SPI_ID = 0
+SPI_CS = 1
+IR_SIGNAL = 6
+
+
+class Board:
+    """Simulated world with the sensor board's devices attached."""
+    def __init__(self, seconds: float=None, seed: int=1, cpu_scale: float=0., motion: devices.Motion=None):
+        self.world = world.World(seconds=seconds, cpu_scale=cpu_scale)
+        world.install(self.world)
+        self.clock = self.world.clock
+
+        self.motion = motion if motion is not None else devices.Motion(seed=seed)
+        self.mpu6500 = devices.MPU6500(self.motion)
+        self.ak8963 = devices.AK8963(self.mpu6500)
+        self.ssd1306 = devices.SSD1306()
+        self.world.add_i2c(I2C_ID, devices.MPU6500.ADDRESS, self.mpu6500)
+        self.world.add_i2c(I2C_ID, devices.AK8963.ADDRESS, self.ak8963)
+        self.world.add_i2c(I2C_ID, devices.SSD1306.ADDRESS, self.ssd1306)
+
+        self.mfrc522 = devices.MFRC522()
+        self.world.add_spi(SPI_ID, SPI_CS, self.mfrc522)
+
+        self.remote = devices.IRRemote(IR_SIGNAL)
+
+    def tag(self, uid: str, start: float, duration: float=0.5):
+        """
+        Hold tag `uid` on the reader from `start` s.
+        """
+        self.mfrc522.tags.append(devices.Tag(uid, start, start + duration))
+
+    def reports(self, kind: str=None) -> list:
+        """
+        HID reports so far as (time us, kind, payload), optionally of one kind.
+        """
+        return [r for r in self.world.reports if kind is None or r[1] == kind]
@@ -0,0 +1,110 @@
+# Virtual time for the simulator.
+#
+# Nothing in the simulation waits on the wall clock. Time moves forward when
+# the code under test sleeps, spends time on a simulated bus, or reads a tick
+# counter (a crude stand-in for CPU time). Pin edges, timer expiries and
+# other device events are queued at their virtual time and run as the clock
+# passes them; micropython.schedule() callbacks run right after.
+# With a `cpu_scale`, host CPU time spent in the code under test is also
+# charged, scaled to the target; runs are then no longer deterministic.
+
+import heapq
+import time
+
+_perf_ns = getattr(time, 'perf_counter_ns', None) or getattr(time, 'time_ns')
+
+# MicroPython tick counters wrap at 2**30
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+
+class Deadline(KeyboardInterrupt):
+    """Raised once when virtual time reaches the end of the run."""
+
+
+class Clock:
+    """Virtual microsecond clock with an event queue."""
+    def __init__(self, deadline_us: int=None, tick_cost_us: int=1, cpu_scale: float=0.):
+        self.now = 0
+        self.deadline = deadline_us
+        self.expired = False
+        # Cost of reading a tick counter, so busy loops still make progress
+        self.tick_cost_us = tick_cost_us
+        # How much slower the target runs than the host, e.g. 30
+        self.cpu_scale = cpu_scale
+        self._cpu_mark = _perf_ns() if cpu_scale else 0
+        self._events = []
+        self._seq = 0
+        self._scheduled = []
+        self._dispatching = False
+
+    def at(self, t_us: int, callback, *args):
+        """
+        Run `callback(*args)` when the clock reaches `t_us`.
+        """
+        self._seq += 1
+        heapq.heappush(self._events, (t_us, self._seq, callback, args))
+
+    def after(self, delay_us: int, callback, *args):
+        self.at(self.now + delay_us, callback, *args)
+
+    def cancel(self, callback):
+        self._events = [e for e in self._events if e[2] is not callback]
+        heapq.heapify(self._events)
+
+    def schedule(self, callback, arg):
+        self._scheduled.append((callback, arg))
+
+    def pending(self) -> int:
+        """
+        Number of scheduled callbacks waiting to run.
+        """
+        return len(self._scheduled)
+
+    def advance(self, us: int):
+        """
+        Move time forward by `us`, running every event due on the way.
+        """
+        if self.cpu_scale and not self._dispatching:
+            us += int((_perf_ns() - self._cpu_mark) * self.cpu_scale / 1000)
+        target = self.now + max(0, us)
+        if not self._dispatching:
+            self._dispatching = True
+            try:
+                while self._events and self._events[0][0] <= target:
+                    t, _, callback, args = heapq.heappop(self._events)
+                    self.now = max(self.now, t)
+                    callback(*args)
+                    self._run_scheduled()
+                self._run_scheduled()
+            finally:
+                self._dispatching = False
+                # Time spent in device models isn't charged to the target
+                if self.cpu_scale:
+                    self._cpu_mark = _perf_ns()
+        self.now = max(self.now, target)
+        if self.deadline is not None and not self.expired and self.now >= self.deadline:
+            self.expired = True
+            raise Deadline()
+
+    def _run_scheduled(self):
+        while self._scheduled:
+            callback, arg = self._scheduled.pop(0)
+            callback(arg)
+
+    def ticks_us(self) -> int:
+        self.advance(self.tick_cost_us)
+        return self.now & TICKS_MAX
+
+    def ticks_ms(self) -> int:
+        self.advance(self.tick_cost_us)
+        return (self.now // 1000) & TICKS_MAX
+
+
+def ticks_diff(a: int, b: int) -> int:
+    return ((a - b + _TICKS_HALF) & TICKS_MAX) - _TICKS_HALF
+
+
+def ticks_add(a: int, delta: int) -> int:
+    return (a + delta) & TICKS_MAX
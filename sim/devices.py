@@ -0,0 +1,561 @@
+# Register-level models of the chips on the board.
+#
+# Each model answers at the register level the way its driver expects, so
+# the drivers under gyro/, display/, rfid/ and ir/ run unmodified against
+# them. Sensor values are taken from scripted profiles at the virtual time of
+# the read.
+
+from sim import world
+
+_G = 16384  # LSB per g at +-2g
+_GYRO_LSB_PER_DPS = (131., 65.5, 32.8, 16.4)
+
+
+class Random:
+    """Small LCG, the same sequence under CPython and MicroPython."""
+    def __init__(self, seed: int=1):
+        self.state = seed & 0x7fffffff
+
+    def next(self) -> int:
+        self.state = (self.state * 1103515245 + 12345) & 0x7fffffff
+        return self.state
+
+    def uniform(self) -> float:
+        """
+        Uniform in [-1, 1).
+        """
+        return self.next() / 0x40000000 - 1.
+
+    def gauss(self, sigma: float) -> float:
+        """
+        Roughly normal, from a sum of three uniforms.
+        """
+        return (self.uniform() + self.uniform() + self.uniform()) * sigma
+
+
+class RegisterDevice:
+    """I2C device with byte registers and an auto-incrementing pointer."""
+    def __init__(self, size: int=128):
+        self.regs = bytearray(size)
+        self.pointer = 0
+
+    def present(self) -> bool:
+        return True
+
+    def get(self, reg: int) -> int:
+        return self.regs[reg % len(self.regs)]
+
+    def set(self, reg: int, value: int):
+        self.regs[reg % len(self.regs)] = value
+
+    def read(self, memaddr, nbytes: int) -> bytes:
+        if memaddr is not None:
+            self.pointer = memaddr
+        data = bytes(self.get(self.pointer + i) for i in range(nbytes))
+        self.pointer += nbytes
+        return data
+
+    def write(self, memaddr, data: bytes):
+        if memaddr is None:
+            if not data:
+                return
+            memaddr = data[0]
+            data = data[1:]
+        for i, value in enumerate(data):
+            self.set(memaddr + i, value)
+        self.pointer = memaddr + len(data)
+
+
+class Motion:
+    """
+    Angular rate profile in deg/s as a list of (start s, (x, y, z)) steps,
+    plus a constant bias and white noise.
+    """
+    def __init__(self, steps: list=None, bias: tuple=(1.2, -0.9, 0.7), noise: float=0.15, seed: int=1):
+        self.steps = sorted(steps or [])
+        self.bias = bias
+        self.noise = noise
+        self.random = Random(seed)
+
+    def at(self, t_us: int) -> tuple[float, float, float]:
+        rate = (0., 0., 0.)
+        for start, value in self.steps:
+            if start * 1_000_000 > t_us:
+                break
+            rate = value
+        random = self.random
+        return tuple(rate[i] + self.bias[i] + random.gauss(self.noise) for i in range(3))
+
+    def step(self, t_s: float, rate: tuple):
+        self.steps.append((t_s, rate))
+        self.steps.sort()
+
+
+class MPU6500(RegisterDevice):
+    """MPU6500 part of an MPU9250, with the AK8963 behind its I2C bypass."""
+    ADDRESS = 0x68
+
+    def __init__(self, motion: Motion=None, whoami: int=0x71):
+        super().__init__()
+        self.motion = motion if motion is not None else Motion()
+        self.regs[0x75] = whoami
+        self.regs[0x6b] = 0x01
+        self._sample = bytearray(14)
+        self.samples = 0
+
+    @property
+    def bypass(self) -> bool:
+        return bool(self.regs[0x37] & 0x02)
+
+    def set(self, reg: int, value: int):
+        if reg == 0x6b and value & 0x80:
+            # Device reset, the bit clears itself
+            whoami = self.regs[0x75]
+            self.regs[:] = bytes(len(self.regs))
+            self.regs[0x75] = whoami
+            self.regs[0x6b] = 0x01
+            return
+        super().set(reg, value)
+
+    def read(self, memaddr, nbytes: int) -> bytes:
+        start = self.pointer if memaddr is None else memaddr
+        if start < 0x49 and start + nbytes > 0x3b:
+            self._latch()
+        return super().read(memaddr, nbytes)
+
+    def get(self, reg: int) -> int:
+        if 0x3b <= reg <= 0x48:
+            return self._sample[reg - 0x3b]
+        return super().get(reg)
+
+    def _latch(self):
+        # Output registers are sampled once per burst read
+        self.samples += 1
+        rates = self.motion.at(world.current.clock.now)
+        lsb = _GYRO_LSB_PER_DPS[(self.regs[0x1b] >> 3) & 3]
+        accel_lsb = _G >> ((self.regs[0x1c] >> 3) & 3)
+        values = (0, 0, accel_lsb, 0) + tuple(int(rate * lsb) for rate in rates)
+        for i, value in enumerate(values):
+            value = max(-32768, min(32767, value)) & 0xffff
+            self._sample[2 * i] = value >> 8
+            self._sample[2 * i + 1] = value & 0xff
+
+
+class AK8963(RegisterDevice):
+    """Magnetometer, only reachable while the MPU6500 bypass is enabled."""
+    ADDRESS = 0x0c
+
+    def __init__(self, mpu6500: MPU6500, field: tuple=(200, -120, 380)):
+        super().__init__(0x20)
+        self.mpu6500 = mpu6500
+        self.field = field
+        self.regs[0x00] = 0x48
+
+    def present(self) -> bool:
+        return self.mpu6500.bypass
+
+    def get(self, reg: int) -> int:
+        mode = self.regs[0x0a] & 0x0f
+        if 0x10 <= reg <= 0x12:
+            # Sensitivity adjustment, only readable in fuse ROM access mode
+            return 0xb0 if mode == 0x0f else 0
+        if reg == 0x02:
+            return 0x01 if mode in (0x02, 0x06) else 0
+        if 0x03 <= reg <= 0x08:
+            value = self.field[(reg - 3) // 2] & 0xffff
+            return value & 0xff if reg & 1 else value >> 8
+        if reg == 0x09:
+            return 0x10 if self.regs[0x0a] & 0x10 else 0
+        return super().get(reg)
+
+
+# Command argument counts
+_SSD1306_ARGS = {
+    0x20: 1, 0x21: 2, 0x22: 2, 0x26: 6, 0x27: 6, 0x29: 5, 0x2a: 5,
+    0x81: 1, 0x8d: 1, 0xa3: 2, 0xa8: 1, 0xd3: 1, 0xd5: 1, 0xd9: 1, 0xda: 1, 0xdb: 1,
+}
+
+
+class SSD1306:
+    """SSD1306 controller with its display RAM, on I2C."""
+    ADDRESS = 0x3c
+
+    def __init__(self, width: int=128, height: int=64):
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.ram = bytearray(width * self.pages)
+        self.on = False
+        self.inverted = False
+        self.contrast = 0x7f
+        self.start_line = 0
+        self.seg_remap = False
+        self.com_reverse = False
+        self.mode = 2
+        self.col_start, self.col_end = 0, width - 1
+        self.page_start, self.page_end = 0, self.pages - 1
+        self.col = 0
+        self.page = 0
+        self._cmd = bytearray()
+        self.data_bytes = 0
+        self.frames = 0
+
+    def present(self) -> bool:
+        return True
+
+    def read(self, memaddr, nbytes: int) -> bytes:
+        return bytes(nbytes)
+
+    def write(self, memaddr, data: bytes):
+        if memaddr is not None:
+            data = bytes((memaddr,)) + data
+        i = 0
+        while i < len(data):
+            control = data[i]
+            i += 1
+            if control & 0x80:
+                # Co set, one byte follows before the next control byte
+                if i < len(data):
+                    self._byte(control, data[i])
+                i += 1
+                continue
+            for value in data[i:]:
+                self._byte(control, value)
+            return
+
+    def _byte(self, control: int, value: int):
+        if control & 0x40:
+            self._data(value)
+        else:
+            self._command(value)
+
+    def _data(self, value: int):
+        self.data_bytes += 1
+        self.ram[self.page * self.width + self.col] = value
+        if self.mode == 2:
+            self.col = (self.col + 1) % self.width
+            return
+        self.col += 1
+        if self.col > self.col_end:
+            self.col = self.col_start
+            if self.mode == 0:
+                self.page += 1
+                if self.page > self.page_end:
+                    self.page = self.page_start
+                    self.frames += 1
+
+    def _command(self, value: int):
+        cmd = self._cmd
+        cmd.append(value)
+        if len(cmd) <= _SSD1306_ARGS.get(cmd[0], 0):
+            return
+        op = cmd[0]
+        args = cmd[1:]
+        self._cmd = bytearray()
+        if op == 0x20:
+            self.mode = args[0] & 3
+        elif op == 0x21:
+            self.col_start, self.col_end = args[0] & 0x7f, args[1] & 0x7f
+            self.col = self.col_start
+        elif op == 0x22:
+            self.page_start, self.page_end = args[0] & 7, args[1] & 7
+            self.page = self.page_start
+        elif op == 0x81:
+            self.contrast = args[0]
+        elif op <= 0x0f:
+            self.col = (self.col & 0xf0) | op
+        elif op <= 0x1f:
+            self.col = (self.col & 0x0f) | (op & 0x0f) << 4
+        elif 0x40 <= op <= 0x7f:
+            self.start_line = op & 0x3f
+        elif op in (0xa0, 0xa1):
+            self.seg_remap = bool(op & 1)
+        elif op in (0xa6, 0xa7):
+            self.inverted = bool(op & 1)
+        elif op in (0xae, 0xaf):
+            self.on = bool(op & 1)
+        elif op in (0xc0, 0xc8):
+            self.com_reverse = bool(op & 8)
+        elif 0xb0 <= op <= 0xb7:
+            self.page = op & 7
+
+    def pixel(self, x: int, y: int) -> int:
+        """
+        Pixel as seen on the panel, top left being (0, 0).
+        """
+        # The driver's remap settings are the upright orientation
+        if not self.seg_remap:
+            x = self.width - 1 - x
+        if not self.com_reverse:
+            y = self.height - 1 - y
+        y = (y + self.start_line) % self.height
+        value = (self.ram[(y >> 3) * self.width + x] >> (y & 7)) & 1
+        return value ^ self.inverted
+
+    def render(self) -> str:
+        """
+        Panel contents as text, two pixel rows per line.
+        """
+        if not self.on:
+            return '(display off)'
+        chars = ' \'.:'
+        lines = []
+        for y in range(0, self.height, 2):
+            lines.append(''.join(chars[self.pixel(x, y) | self.pixel(x, y + 1) << 1] for x in range(self.width)).rstrip())
+        return '\n'.join(lines)
+
+
+def crc_a(data) -> int:
+    """
+    ISO 14443-3 CRC_A, sent LSB first.
+    """
+    crc = 0x6363
+    for value in data:
+        crc ^= value
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+    return crc
+
+
+class Tag:
+    """A 4-byte UID tag held on the reader from `start` to `end` s."""
+    def __init__(self, uid: str, start: float, end: float):
+        self.uid = bytes(int(part, 16) for part in uid.split(':'))
+        self.start = int(start * 1_000_000)
+        self.end = int(end * 1_000_000)
+
+
+# MFRC522 registers used by the driver
+_COMMAND = 0x01
+_COM_IRQ = 0x04
+_DIV_IRQ = 0x05
+_ERROR = 0x06
+_FIFO_DATA = 0x09
+_FIFO_LEVEL = 0x0a
+_CONTROL = 0x0c
+_BIT_FRAMING = 0x0d
+_CRC_RESULT_MSB = 0x21
+_CRC_RESULT_LSB = 0x22
+_T_MODE = 0x2a
+_T_PRESCALER = 0x2b
+_T_RELOAD_H = 0x2c
+_T_RELOAD_L = 0x2d
+
+_IDLE = 0x00
+_CALC_CRC = 0x03
+_TRANSCEIVE = 0x0c
+_MF_AUTHENT = 0x0e
+_SOFT_RESET = 0x0f
+
+# Air time of a short frame and the tag's answer
+_FRAME_US = 150
+
+
+class MFRC522:
+    """MFRC522 reader on SPI with ISO 14443A tags coming and going."""
+    def __init__(self, tags: list=None):
+        self.tags = tags if tags is not None else []
+        self.regs = bytearray(0x40)
+        self.fifo = bytearray()
+        self._addr = None
+        self._command = _IDLE
+        self.frames = 0
+        # Bound once so a pending expiry can be cancelled
+        self._expire = self._timer_expired
+        self._reset()
+
+    def _reset(self):
+        world.current.clock.cancel(self._expire)
+        self.regs[:] = bytes(len(self.regs))
+        self.regs[_COMMAND] = 0x20
+        self.regs[_T_PRESCALER] = 0x00
+        self.fifo = bytearray()
+        self._command = _IDLE
+
+    def tag(self):
+        now = world.current.clock.now
+        for tag in self.tags:
+            if tag.start <= now < tag.end:
+                return tag
+        return None
+
+    def select(self, level: int):
+        # Raising chip select ends the transaction
+        if level:
+            self._addr = None
+
+    def exchange(self, data: bytes) -> bytes:
+        out = bytearray(len(data))
+        for i, value in enumerate(data):
+            if self._addr is None:
+                self._addr = value
+                continue
+            reg = (self._addr >> 1) & 0x3f
+            if self._addr & 0x80:
+                out[i] = self._read(reg)
+            else:
+                self._write(reg, value)
+        return bytes(out)
+
+    def _read(self, reg: int) -> int:
+        if reg == _FIFO_DATA:
+            if not self.fifo:
+                return 0
+            value = self.fifo[0]
+            self.fifo = self.fifo[1:]
+            return value
+        if reg == _FIFO_LEVEL:
+            return len(self.fifo)
+        if reg == _COMMAND:
+            return (self.regs[_COMMAND] & 0xf0) | self._command
+        return self.regs[reg]
+
+    def _write(self, reg: int, value: int):
+        if reg == _COMMAND:
+            self._run(value & 0x0f)
+            return
+        if reg in (_COM_IRQ, _DIV_IRQ):
+            # Bit 7 selects whether the marked bits are set or cleared
+            if value & 0x80:
+                self.regs[reg] |= value & 0x7f
+            else:
+                self.regs[reg] &= ~value & 0x7f
+            return
+        if reg == _FIFO_DATA:
+            if len(self.fifo) < 64:
+                self.fifo.append(value)
+            return
+        if reg == _FIFO_LEVEL:
+            if value & 0x80:
+                self.fifo = bytearray()
+            return
+        self.regs[reg] = value
+        if reg == _BIT_FRAMING and value & 0x80 and self._command == _TRANSCEIVE:
+            self._transceive()
+
+    def _run(self, command: int):
+        if command == _SOFT_RESET:
+            self._reset()
+            return
+        self._command = command
+        if command == _CALC_CRC:
+            crc = crc_a(self.fifo)
+            self.regs[_CRC_RESULT_LSB] = crc & 0xff
+            self.regs[_CRC_RESULT_MSB] = crc >> 8
+            self.regs[_DIV_IRQ] |= 0x04
+        elif command == _MF_AUTHENT:
+            # Authentication isn't modelled, it always times out
+            self.fifo = bytearray()
+            self._timeout()
+
+    def _timer_us(self) -> int:
+        prescaler = (self.regs[_T_MODE] & 0x0f) << 8 | self.regs[_T_PRESCALER]
+        reload = self.regs[_T_RELOAD_H] << 8 | self.regs[_T_RELOAD_L]
+        return (2 * prescaler + 1) * (reload + 1) * 1_000_000 // 13_560_000
+
+    def _timeout(self):
+        # The timer restarts at the end of each transmission
+        world.current.clock.cancel(self._expire)
+        world.current.clock.after(max(1, self._timer_us()), self._expire)
+
+    def _timer_expired(self):
+        self.regs[_COM_IRQ] |= 0x01  # TimerIRq
+
+    def _transceive(self):
+        world.current.clock.cancel(self._expire)
+        frame = bytes(self.fifo)
+        self.fifo = bytearray()
+        self.frames += 1
+        self.regs[_COM_IRQ] |= 0x40  # TxIRq
+        self.regs[_ERROR] = 0
+        reply = self._answer(frame, self.regs[_BIT_FRAMING] & 0x07)
+        if reply is None:
+            self._timeout()
+            return
+        world.current.clock.after(_FRAME_US, self._receive, reply)
+
+    def _receive(self, reply: bytes):
+        self.fifo = bytearray(reply)
+        # Whole bytes only
+        self.regs[_CONTROL] &= ~0x07 & 0xff
+        self.regs[_COM_IRQ] |= 0x30  # RxIRq, IdleIRq
+
+    def _answer(self, frame: bytes, last_bits: int):
+        tag = self.tag()
+        if tag is None or not frame:
+            return None
+        if last_bits == 7 and frame[0] in (0x26, 0x52):
+            # ATQA of a single size UID tag
+            return b'\x04\x00'
+        uid = tag.uid
+        bcc = uid[0] ^ uid[1] ^ uid[2] ^ uid[3]
+        if frame[:2] == b'\x93\x20':
+            return uid + bytes((bcc,))
+        if frame[:2] == b'\x93\x70' and frame[2:6] == uid and len(frame) == 9:
+            if crc_a(frame[:7]) != frame[7] | frame[8] << 8:
+                return None
+            sak = 0x08
+            crc = crc_a((sak,))
+            return bytes((sak, crc & 0xff, crc >> 8))
+        return None
+
+
+# NEC timings in us
+_NEC_LEADER_MARK = 9000
+_NEC_LEADER_SPACE = 4500
+_NEC_REPEAT_SPACE = 2250
+_NEC_MARK = 562
+_NEC_ZERO = 562
+_NEC_ONE = 1687
+_NEC_PERIOD = 108_000
+
+
+class IRRemote:
+    """NEC remote seen through an HX1838 receiver, whose output idles high."""
+    def __init__(self, pin=6):
+        self.pin = pin
+        self.frames = 0
+        world.current.pin(pin).level = 1
+
+    def _edge(self, t: int, level: int):
+        world.current.clock.at(t, world.current.drive, self.pin, level)
+
+    def _burst(self, t: int, mark: int, space: int) -> int:
+        self._edge(t, 0)
+        self._edge(t + mark, 1)
+        return t + mark + space
+
+    def frame_edges(self, t: int, cmd: int, addr: int=0x00) -> int:
+        """
+        Queue a full frame at `t` us. Returns the time of its last edge.
+        """
+        if addr > 0xff:
+            data = addr | cmd << 16 | (cmd ^ 0xff) << 24
+        else:
+            data = addr | (addr ^ 0xff) << 8 | cmd << 16 | (cmd ^ 0xff) << 24
+        t = self._burst(t, _NEC_LEADER_MARK, _NEC_LEADER_SPACE)
+        for bit in range(32):
+            t = self._burst(t, _NEC_MARK, _NEC_ONE if data >> bit & 1 else _NEC_ZERO)
+        self._edge(t, 0)
+        self._edge(t + _NEC_MARK, 1)
+        self.frames += 1
+        return t + _NEC_MARK
+
+    def repeat_edges(self, t: int) -> int:
+        t = self._burst(t, _NEC_LEADER_MARK, _NEC_REPEAT_SPACE)
+        self._edge(t, 0)
+        self._edge(t + _NEC_MARK, 1)
+        return t + _NEC_MARK
+
+    def press(self, t_s: float, cmd: int, addr: int=0x00, hold_s: float=0.):
+        """
+        Press a key at `t_s` s, holding it for `hold_s` s, which sends repeat
+        codes every 108ms.
+        """
+        t = int(t_s * 1_000_000)
+        self.frame_edges(t, cmd, addr)
+        end = t + int(hold_s * 1_000_000)
+        t += _NEC_PERIOD
+        while t <= end:
+            self.repeat_edges(t)
+            t += _NEC_PERIOD
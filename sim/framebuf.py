@@ -0,0 +1,139 @@
+# Fake `framebuf` module, MONO_VLSB only (all the displays here use it).
+#
+# Text uses a 5x7 font in 8x8 cells, close to the built-in one, so text
+# rendered on the simulated OLED stays readable.
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+# Columns of ' ' to '~', LSB at the top
+_FONT = bytes.fromhex(
+    '0000000000' '00005f0000' '0007000700' '147f147f14' '242a7f2a12' '2313086462' '3649552250' '0005030000'
+    '001c224100' '0041221c00' '082a1c2a08' '08083e0808' '0050300000' '0808080808' '0060600000' '2010080402'
+    '3e5149453e' '00427f4000' '4261514946' '2141454b31' '1814127f10' '2745454539' '3c4a494930' '0171090503'
+    '3649494936' '064949291e' '0036360000' '0056360000' '0814224100' '1414141414' '0041221408' '0201510906'
+    '324979413e' '7e1111117e' '7f49494936' '3e41414122' '7f4141221c' '7f49494941' '7f09090101' '3e41415132'
+    '7f0808087f' '00417f4100' '2040413f01' '7f08142241' '7f40404040' '7f0204027f' '7f0408107f' '3e4141413e'
+    '7f09090906' '3e4151215e' '7f09192946' '4649494931' '01017f0101' '3f4040403f' '1f2040201f' '7f2018207f'
+    '6314081463' '0304780403' '6151494543' '00007f4141' '0204081020' '41417f0000' '0402010204' '4040404040'
+    '0001020400' '2054545478' '7f48444438' '3844444420' '384444487f' '3854545418' '087e090102' '081454543c'
+    '7f08040478' '00447d4000' '2040443d00' '007f102844' '00417f4000' '7c04180478' '7c08040478' '3844444438'
+    '7c14141408' '081414187c' '7c08040408' '4854545420' '043f444020' '3c4040207c' '1c2040201c' '3c4030403c'
+    '4428102844' '0c5050503c' '4464544c44' '0008364100' '00007f0000' '0041360800' '1008081008'
+)
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width: int, height: int, format: int=MONO_VLSB, stride: int=None):
+        if format != MONO_VLSB:
+            raise ValueError('only MONO_VLSB is simulated')
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.stride = width if stride is None else stride
+        if len(buffer) < ((height + 7) // 8) * self.stride:
+            raise ValueError('buffer too small')
+
+    def _set(self, x: int, y: int, c: int):
+        i = (y >> 3) * self.stride + x
+        if c:
+            self.buffer[i] |= 1 << (y & 7)
+        else:
+            self.buffer[i] &= ~(1 << (y & 7)) & 0xff
+
+    def _get(self, x: int, y: int) -> int:
+        return (self.buffer[(y >> 3) * self.stride + x] >> (y & 7)) & 1
+
+    def pixel(self, x: int, y: int, c: int=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        if c is None:
+            return self._get(x, y)
+        self._set(x, y, c)
+        return None
+
+    def fill(self, c: int):
+        value = 0xff if c else 0x00
+        for i in range(((self.height + 7) // 8) * self.stride):
+            self.buffer[i] = value
+
+    def fill_rect(self, x: int, y: int, w: int, h: int, c: int):
+        x0 = max(x, 0)
+        x1 = min(x + w, self.width)
+        y0 = max(y, 0)
+        y1 = min(y + h, self.height)
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self._set(xx, yy, c)
+
+    def hline(self, x: int, y: int, w: int, c: int):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x: int, y: int, h: int, c: int):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x: int, y: int, w: int, h: int, c: int, f: bool=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.fill_rect(x, y, w, 1, c)
+        self.fill_rect(x, y + h - 1, w, 1, c)
+        self.fill_rect(x, y, 1, h, c)
+        self.fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1: int, y1: int, x2: int, y2: int, c: int):
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def text(self, s: str, x: int, y: int, c: int=1):
+        for ch in s:
+            code = ord(ch)
+            if not 32 <= code <= 126:
+                code = 127
+            for col in range(5):
+                bits = _FONT[(code - 32) * 5 + col] if code < 127 else 0x7f
+                for row in range(8):
+                    if bits >> row & 1:
+                        self.pixel(x + col, y + row, c)
+            x += 8
+
+    def blit(self, fbuf, x: int, y: int, key: int=-1, palette=None):
+        for sy in range(fbuf.height):
+            yy = y + sy
+            if not 0 <= yy < self.height:
+                continue
+            for sx in range(fbuf.width):
+                xx = x + sx
+                if not 0 <= xx < self.width:
+                    continue
+                c = fbuf._get(sx, sy)
+                if c != key:
+                    self._set(xx, yy, c)
+
+    def scroll(self, xstep: int, ystep: int):
+        pixels = [[self._get(x, y) for x in range(self.width)] for y in range(self.height)]
+        for y in range(self.height):
+            for x in range(self.width):
+                sx = x - xstep
+                sy = y - ystep
+                if 0 <= sx < self.width and 0 <= sy < self.height:
+                    self._set(x, y, pixels[sy][sx])
+
+
+def FrameBuffer1(buffer, width: int, height: int, stride: int=None) -> FrameBuffer:
+    return FrameBuffer(buffer, width, height, MONO_VLSB, stride)
@@ -0,0 +1,44 @@
+# Fake `gc` module for CPython, adding MicroPython's heap counters.
+#
+# With tracemalloc tracing the counters follow Python allocations, otherwise
+# the heap looks untouched.
+
+import gc
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# RP2040 MicroPython heap
+HEAP_SIZE = 192 * 1024
+
+
+def collect():
+    gc.collect()
+
+
+def enable():
+    gc.enable()
+
+
+def disable():
+    gc.disable()
+
+
+def isenabled() -> bool:
+    return gc.isenabled()
+
+
+def mem_alloc() -> int:
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+def mem_free() -> int:
+    return max(0, HEAP_SIZE - mem_alloc())
+
+
+def threshold(amount: int=None):
+    return -1 if amount is None else None
@@ -0,0 +1,226 @@
+# Fake `machine` module backed by the simulated world.
+#
+# Pins keep their level and IRQ handler in the world, so a device model can
+# drive an input (the IR receiver) or watch an output (a chip select). I2C
+# and SPI transactions are routed to the device models on the bus and cost
+# virtual time according to the bus clock.
+
+import errno
+
+from sim import world
+
+# Fixed cost of a bus call on top of the bits on the wire
+_I2C_OVERHEAD_US = 20
+_SPI_OVERHEAD_US = 3
+
+
+def _clock():
+    return world.current.clock
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._state = world.current.pin(id)
+        if mode != -1:
+            self._state.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self._state.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._state.level
+        world.current.drive(self.id, 1 if v else 0)
+        return None
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(1 - self._state.level)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._state.handler = handler
+        self._state.trigger = trigger
+        self._state.pin = self
+
+
+class I2C:
+    def __init__(self, id=0, scl=None, sda=None, freq=400_000, timeout=50_000):
+        self.id = id
+        self.freq = freq
+        self._bus = world.current.i2c_bus(id)
+
+    def _spend(self, nbytes: int):
+        # Address byte plus data, 9 clocks per byte
+        _clock().advance(_I2C_OVERHEAD_US + (nbytes + 1) * 9_000_000 // self.freq)
+
+    def _device(self, addr: int):
+        device = self._bus.get(addr)
+        if device is None or not device.present():
+            self._spend(0)
+            raise OSError(errno.EIO)
+        return device
+
+    def scan(self) -> list[int]:
+        self._spend(0)
+        return sorted(addr for addr, device in self._bus.items() if device.present())
+
+    def readfrom(self, addr, nbytes, stop=True) -> bytes:
+        device = self._device(addr)
+        self._spend(nbytes)
+        return bytes(device.read(None, nbytes))
+
+    def readfrom_into(self, addr, buf, stop=True):
+        device = self._device(addr)
+        self._spend(len(buf))
+        buf[:] = device.read(None, len(buf))
+
+    def writeto(self, addr, buf, stop=True) -> int:
+        device = self._device(addr)
+        self._spend(len(buf))
+        device.write(None, bytes(buf))
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True) -> int:
+        data = b''.join(bytes(buf) for buf in vector)
+        return self.writeto(addr, data, stop)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8) -> bytes:
+        device = self._device(addr)
+        self._spend(nbytes + 1)
+        return bytes(device.read(memaddr, nbytes))
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        device = self._device(addr)
+        self._spend(len(buf) + 1)
+        buf[:] = device.read(memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        device = self._device(addr)
+        self._spend(len(buf) + 1)
+        device.write(memaddr, bytes(buf))
+
+
+class SoftI2C(I2C):
+    pass
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id=0, baudrate=1_000_000, polarity=0, phase=0, bits=8, firstbit=MSB,
+                 sck=None, mosi=None, miso=None):
+        self.id = id
+        self.baudrate = baudrate
+        self._bus = world.current.spi_bus(id)
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def _spend(self, nbytes: int):
+        _clock().advance(_SPI_OVERHEAD_US + nbytes * 8_000_000 // self.baudrate)
+
+    def _exchange(self, data: bytes) -> bytes:
+        self._spend(len(data))
+        device = self._bus.selected()
+        if device is None:
+            return b'\xff' * len(data)
+        return bytes(device.exchange(data))
+
+    def read(self, nbytes, write=0x00) -> bytes:
+        return self._exchange(bytes((write,)) * nbytes)
+
+    def readinto(self, buf, write=0x00):
+        buf[:] = self._exchange(bytes((write,)) * len(buf))
+
+    def write(self, buf):
+        self._exchange(bytes(buf))
+
+    def write_readinto(self, write_buf, read_buf):
+        read_buf[:] = self._exchange(bytes(write_buf))
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self._callback = None
+        self._period_us = 0
+        self._mode = mode
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        if freq > 0:
+            self._period_us = 1_000_000 // freq
+        else:
+            self._period_us = max(1, period) * 1000
+        self._mode = mode
+        self._callback = callback
+        _clock().after(self._period_us, self._fire)
+
+    def _fire(self):
+        callback = self._callback
+        if callback is None:
+            return
+        if self._mode == Timer.PERIODIC:
+            _clock().after(self._period_us, self._fire)
+        else:
+            self._callback = None
+        callback(self)
+
+    def deinit(self):
+        if self._callback is not None:
+            _clock().cancel(self._fire)
+        self._callback = None
+
+
+def freq(hz=None):
+    return 125_000_000 if hz is None else None
+
+
+def unique_id() -> bytes:
+    return b'SIMULATE'
+
+
+def reset():
+    raise SystemExit('machine.reset()')
+
+
+def idle():
+    _clock().advance(1)
@@ -0,0 +1,38 @@
+# Fake `micropython` module. schedule() queues on the virtual clock, so
+# deferred callbacks run after the IRQ that scheduled them, as on the device.
+
+from sim import world
+
+# Pending scheduled callbacks before schedule() raises, as on the RP2040 port
+SCHEDULER_DEPTH = 8
+
+
+def const(value):
+    return value
+
+
+def schedule(callback, arg):
+    sim_clock = world.current.clock
+    if sim_clock.pending() >= SCHEDULER_DEPTH:
+        raise RuntimeError('schedule queue full')
+    sim_clock.schedule(callback, arg)
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def alloc_emergency_exception_buf(size: int):
+    pass
+
+
+def mem_info(verbose: int=0):
+    print('mem: simulated')
+
+
+def opt_level(level: int=None):
+    return 0 if level is None else None
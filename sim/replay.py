@@ -0,0 +1,288 @@
+"""
+Replay a bus log recorded on the device into main.py on the simulator.
+
+Record on the device with BUS_RECORD set in controller.py, copy the log off
+the board, then from the repository root:
+
+    python -m sim.replay bus.log --show
+
+Every bus device in the log is replaced by one answering the driver's
+transactions with the recorded data, in the recorded order per device, so
+the unmodified drivers and Controller see the same sensor noise, bias drift
+and read errors as in the field. Pin edges (the IR receiver) are replayed at
+their recorded times, aligned on the first bus transaction. Writes to the
+OLED go to a display model, for --show, without being matched against the
+log: when and how a frame is split into transfers follows the loop timing,
+which differs between the device and the simulator.
+
+The run ends when a device has no recorded transactions left, or when the
+code asks a device for something else than what was recorded (it diverged
+from the recording); both stop the controller with a KeyboardInterrupt, so
+it prints its usual exit report.
+"""
+
+import sys
+
+from sim import board, clock, devices, world
+
+# Log format, see bus/record.py; that module needs MicroPython to import
+MAGIC = b'SKBUS'
+VERSION = 1
+WRITE_DATA = 0x01
+TIME = 0
+READ = 1
+WRITE = 2
+READ_MEM = 3
+WRITE_MEM = 4
+WRITE_READ = 5
+EDGE = 6
+ERROR = 7
+REPEAT = 8
+HEADER_SIZE = 7
+SPI_DEVICE = 0x80
+
+# Display models fed with the replayed writes, by I2C address
+_MODELS = {devices.SSD1306.ADDRESS: devices.SSD1306}
+
+_READS = (READ, READ_MEM, WRITE_READ)
+_NAMES = ('time', 'read', 'write', 'read_mem', 'write_mem', 'write_read', 'edge', 'error', 'repeat')
+
+
+class Exhausted(KeyboardInterrupt):
+    """A device ran out of recorded transactions."""
+
+
+class Diverged(KeyboardInterrupt):
+    """The code under test asked a device for something not recorded."""
+
+
+class Record:
+    """One transaction or edge of a log, `t` in us since the log started."""
+    def __init__(self, t: int, rtype: int, device: int, reg: int, n: int, payload: bytes=None):
+        self.t = t
+        self.type = rtype
+        self.device = device
+        self.reg = reg
+        self.n = n
+        self.payload = payload
+
+    def __repr__(self):
+        return f'{_NAMES[self.type]} dev 0x{self.device:02x} reg 0x{self.reg:02x} n {self.n} at {self.t} us'
+
+
+def parse(data: bytes) -> list[Record]:
+    """
+    Decode a log, expanding repeats.
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('not a bus log')
+    pos = len(MAGIC)
+    version = data[pos]
+    flags = data[pos + 1]
+    if version != VERSION:
+        raise ValueError(f'unsupported log version {version}')
+    pos += 2
+    write_data = flags & WRITE_DATA
+
+    records = []
+    # Device ticks_us at log time `base_t`, from the last TIME record
+    base = None
+    base_t = 0
+    now = 0
+    while pos + HEADER_SIZE <= len(data):
+        rtype, dt, device, reg, n = _header(data, pos)
+        pos += HEADER_SIZE
+        if rtype in (TIME, EDGE):
+            size = 4
+        elif rtype in _READS or (rtype in (WRITE, WRITE_MEM) and write_data):
+            size = n
+        else:
+            size = 0
+        if pos + size > len(data):
+            break  # Log cut short while recording
+        payload = bytes(data[pos:pos + size])
+        pos += size
+
+        if rtype == TIME:
+            ticks = int.from_bytes(payload, 'little') & clock.TICKS_MAX
+            if base is not None:
+                now = base_t + clock.ticks_diff(ticks, base)
+            base = ticks
+            base_t = now
+            continue
+        now += dt
+        if rtype == REPEAT:
+            period = device
+            for _ in range(n):
+                copy = records[-period]
+                records.append(Record(now, copy.type, copy.device, copy.reg, copy.n, copy.payload))
+            continue
+        if rtype == EDGE:
+            # Edges are logged some time after they happen, with their own ticks
+            ticks = int.from_bytes(payload, 'little') & clock.TICKS_MAX
+            t = now + clock.ticks_diff(ticks, clock.ticks_add(base, now - base_t))
+            records.append(Record(t, rtype, device, reg, 0))
+            continue
+        records.append(Record(now, rtype, device, reg, n, payload if size else None))
+    return records
+
+
+def _header(data: bytes, pos: int) -> tuple[int, int, int, int, int]:
+    return (data[pos], data[pos + 1] | data[pos + 2] << 8, data[pos + 3], data[pos + 4],
+            data[pos + 5] | data[pos + 6] << 8)
+
+
+class Replay:
+    """Per-device queues of a parsed log."""
+    def __init__(self, records: list[Record]):
+        self.records = records
+        self.queues = {}
+        self.edges = []
+        for rec in records:
+            if rec.type == EDGE:
+                self.edges.append(rec)
+            else:
+                self.queues.setdefault(rec.device, []).append(rec)
+        self.stopped = None
+        self._offset = None
+
+    def started(self, rec: Record):
+        # Align the recorded time line on the first transaction replayed
+        if self._offset is not None:
+            return
+        sim_clock = world.current.clock
+        self._offset = sim_clock.now - rec.t
+        for edge in self.edges:
+            sim_clock.at(max(sim_clock.now, edge.t + self._offset), world.current.drive, edge.device, edge.reg)
+
+    def stop(self, error: KeyboardInterrupt):
+        if self.stopped is None:
+            self.stopped = error
+        raise error
+
+
+class ReplayDevice:
+    """Bus device answering from its recorded transactions."""
+    def __init__(self, replay: Replay, device: int, model=None):
+        self.replay = replay
+        self.device = device
+        self.queue = replay.queues.get(device, [])
+        self.pos = 0
+        # Write-only displays are fed to their model unchecked
+        self.model = model
+
+    def present(self) -> bool:
+        return True
+
+    def _next(self, types: tuple, n: int, reg: int=None) -> Record:
+        # Once stopped, let the controller's exit path use the bus
+        if self.replay.stopped is not None:
+            return None
+        if self.pos >= len(self.queue):
+            self.replay.stop(Exhausted(f'device 0x{self.device:02x}: end of log'))
+        rec = self.queue[self.pos]
+        self.pos += 1
+        self.replay.started(rec)
+        if rec.type == ERROR:
+            if rec.n in types:
+                raise OSError(rec.reg)
+        elif rec.type in types and rec.n == n and (reg is None or rec.reg == reg):
+            return rec
+        wanted = '/'.join(_NAMES[t] for t in types)
+        return self.replay.stop(Diverged(f'device 0x{self.device:02x}: {wanted} of {n} bytes, log has {rec}'))
+
+    def read(self, memaddr, nbytes: int) -> bytes:
+        if memaddr is None:
+            rec = self._next((READ,), nbytes)
+        else:
+            rec = self._next((READ_MEM,), nbytes, memaddr)
+        return rec.payload if rec is not None else bytes(nbytes)
+
+    def write(self, memaddr, data: bytes):
+        if self.model is not None:
+            self.model.write(memaddr, data)
+            return
+        if memaddr is None:
+            rec = self._next((WRITE,), len(data))
+        else:
+            rec = self._next((WRITE_MEM,), len(data), memaddr)
+        if rec is not None and rec.payload is not None and rec.payload != data:
+            self.replay.stop(Diverged(f'device 0x{self.device:02x}: wrote other data than {rec}'))
+
+    def select(self, level: int):
+        pass
+
+    def exchange(self, data: bytes) -> bytes:
+        rec = self._next((READ, WRITE, WRITE_READ), len(data))
+        if rec is None:
+            return bytes(len(data))
+        if rec.type == WRITE:
+            if rec.payload is not None and rec.payload != data:
+                self.replay.stop(Diverged(f'device 0x{self.device:02x}: wrote other data than {rec}'))
+            return bytes(len(data))
+        return rec.payload
+
+
+class ReplayBoard:
+    """Simulated world with the devices of a bus log."""
+    def __init__(self, path: str, seconds: float=None):
+        with open(path, 'rb') as f:
+            self.replay = Replay(parse(f.read()))
+        self.world = world.World(seconds=seconds)
+        world.install(self.world)
+        self.clock = self.world.clock
+
+        self.devices = {}
+        self.models = {}
+        for device in self.replay.queues:
+            if device >= SPI_DEVICE:
+                replayed = ReplayDevice(self.replay, device)
+                self.world.add_spi(board.SPI_ID, board.SPI_CS + device - SPI_DEVICE, replayed)
+            else:
+                model = _MODELS[device]() if device in _MODELS else None
+                if model is not None:
+                    self.models[device] = model
+                replayed = ReplayDevice(self.replay, device, model)
+                self.world.add_i2c(board.I2C_ID, device, replayed)
+            self.devices[device] = replayed
+        # Inputs idle at the level opposite to their first edge
+        for edge in reversed(self.replay.edges):
+            self.world.pin(edge.device).level = 1 - edge.reg
+
+    def summary(self, show: bool):
+        for device, replayed in sorted(self.devices.items()):
+            if replayed.model is not None:
+                print(f'[SIM ] 0x{device:02x}: {len(replayed.queue)} transactions logged, display writes not checked')
+                continue
+            print(f'[SIM ] 0x{device:02x}: {replayed.pos}/{len(replayed.queue)} transactions replayed')
+        print(f'[SIM ] {len(self.replay.edges)} edges, {self.clock.now / 1e6:.3f} s simulated')
+        moves = [r for r in self.world.reports if r[1] == 'mouse']
+        keys = [r for r in self.world.reports if r[1] == 'keys' and r[2]]
+        print(f'[SIM ] {len(moves)} mouse reports, {len(keys)} key presses')
+        if isinstance(self.replay.stopped, Diverged):
+            print(f'[SIM ] diverged: {self.replay.stopped}')
+        elif self.replay.stopped is not None:
+            print(f'[SIM ] {self.replay.stopped}')
+        if show:
+            for model in self.models.values():
+                print(model.render())
+
+
+def main(argv: list[str]) -> int:
+    import argparse  # pylint: disable=import-outside-toplevel
+    from sim import run  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('log', help='bus log recorded on the device')
+    parser.add_argument('--seconds', type=float, help='stop after this much virtual time')
+    parser.add_argument('--show', action='store_true', help='print the OLED contents at the end')
+    parser.add_argument('--root', default='.', help='repository root holding main.py')
+    args = parser.parse_args(argv)
+
+    sim = ReplayBoard(args.log, seconds=args.seconds)
+    run.run_main(args.root)
+    sim.summary(args.show)
+    return 1 if isinstance(sim.replay.stopped, Diverged) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,187 @@
+"""
+Run main.py unmodified on the simulated board.
+
+From the repository root, under CPython or the MicroPython Unix port:
+
+    python -m sim.run --seconds 25 --show
+
+Virtual time only moves when the code sleeps, uses a bus or reads a tick
+counter, so a run is deterministic for a given seed and takes as long as the
+host needs to execute it. The default scenario keeps still through boot and
+calibration, then moves, touches the 'vu' tag, holds Right on the remote and
+presses Power to open the diagnostics page. The run ends with a
+KeyboardInterrupt at the deadline, so the controller prints its usual exit
+report, followed by a summary of the HID reports.
+
+With --telemetry FILE the controller also emits binary telemetry, and the
+serial link, text and records in the order written, is saved to FILE for
+tools/telemetry_profile.py. Every 8th flush is preceded by a stray record
+header, as printed text can contain one. The records actually sent are
+summarised next to it in a .json file, for the profiler's --check.
+"""
+
+import json
+import os
+import sys
+
+from sim import board
+
+# Scenario times in s; boot takes ~0.4s, or ~12s with FAST_BOOT off
+MOTION = ((14., (40., 0., -25.)), (15., (0., 0., 0.)), (16., (-90., 0., 60.)), (16.5, (0., 0., 0.)))
+TAG = ('C5:56:64:01', 18.)
+IR_RIGHT = (0x09, 20., 1.5)
+IR_POWER = (0x45, 23.)
+
+
+def scenario(sim: board.Board):
+    for t, rate in MOTION:
+        sim.motion.step(t, rate)
+    sim.tag(TAG[0], TAG[1])
+    sim.remote.press(IR_RIGHT[1], IR_RIGHT[0], hold_s=IR_RIGHT[2])
+    sim.remote.press(IR_POWER[1], IR_POWER[0])
+
+
+def run_main(root: str='.') -> dict:
+    """
+    Execute main.py as on the device. Returns its globals once the
+    controller exits.
+    """
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    path = root + '/main.py'
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec')
+    namespace = {'__name__': '__main__', '__file__': path}
+    try:
+        exec(code, namespace)  # pylint: disable=exec-used
+    except KeyboardInterrupt:
+        # Deadline before the controller reached its loop
+        print('[SIM ] Stopped during boot')
+    return namespace
+
+
+def capture_display(sim: board.Board):
+    """
+    Keep what the OLED shows just before the deadline, the controller
+    clears it on exit.
+    """
+    sim.screen = ''
+
+    def capture():
+        sim.screen = sim.ssd1306.render()
+    sim.clock.at(sim.clock.deadline - 1000, capture)
+
+
+class Link:
+    """USB serial link: text and binary telemetry, in the order written."""
+    STRAY = b'\xa5\x01\x16'
+    STRAY_EVERY = 8
+
+    def __init__(self, echo):
+        self.echo = echo
+        self.buffer = self
+        self.data = bytearray()
+        self.records = bytearray()
+        self.flushes = 0
+
+    def write(self, chunk) -> int:
+        if isinstance(chunk, str):
+            self.echo.write(chunk)
+            self.data += chunk.encode()
+            return len(chunk)
+        # Telemetry flushes write through `buffer`
+        if self.flushes % self.STRAY_EVERY == 0:
+            self.data += self.STRAY
+        self.flushes += 1
+        self.data += chunk
+        self.records += chunk
+        return len(chunk)
+
+    def flush(self):
+        self.echo.flush()
+
+    def truth(self) -> dict:
+        """
+        Counts of the records sent, walked in order without any text.
+        """
+        import struct  # pylint: disable=import-outside-toplevel
+        counts = {1: 0, 2: 0}
+        times = []
+        dropped = 0
+        last = None
+        pos = 0
+        while pos + 3 <= len(self.records):
+            rtype, size = self.records[pos + 1], self.records[pos + 2]
+            seq, t_us = struct.unpack_from('<BI', self.records, pos + 3)
+            counts[rtype] += 1
+            if rtype == 1:
+                times.append(t_us)
+            if last is not None:
+                dropped += (seq - last - 1) % 256
+            last = seq
+            pos += 3 + size
+        return {
+            'samples': counts[1],
+            'events': counts[2],
+            'dropped': dropped,
+            'sample_t_us': [times[0], times[-1]] if times else [],
+        }
+
+
+def summary(sim: board.Board, show: bool):
+    moves = sim.reports('mouse')
+    keys = [r for r in sim.reports('keys') if r[2]]
+    print(f'[SIM ] {sim.clock.now / 1e6:.3f} s simulated')
+    print(f'[SIM ] {len(moves)} mouse reports, {len(keys)} key presses, '
+          f'{sim.mpu6500.samples} gyro samples, {sim.mfrc522.frames} RFID frames, {sim.remote.frames} IR frames')
+    if moves:
+        print(f'[SIM ] first mouse report at {moves[0][0] / 1e6:.3f} s')
+    for t, _, payload in keys:
+        print(f'[SIM ] keys {payload} at {t / 1e6:.3f} s')
+    if show:
+        print(sim.screen)
+
+
+def main(argv: list[str]) -> int:
+    import argparse  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=25., help='virtual run time')
+    parser.add_argument('--seed', type=int, default=1, help='sensor noise seed')
+    parser.add_argument('--cpu-scale', type=float, default=0.,
+                        help='also charge host CPU time, this many times slower (not deterministic)')
+    parser.add_argument('--show', action='store_true', help='print the OLED contents at the end')
+    parser.add_argument('--root', default='.', help='repository root holding main.py')
+    parser.add_argument('--telemetry', metavar='FILE', help='emit binary telemetry and save the serial link')
+    args = parser.parse_args(argv)
+
+    sim = board.Board(seconds=args.seconds, seed=args.seed, cpu_scale=args.cpu_scale)
+    scenario(sim)
+    capture_display(sim)
+    link = None
+    if args.telemetry:
+        # main.py imports the already configured controller module
+        if args.root not in sys.path:
+            sys.path.insert(0, args.root)
+        import controller  # pylint: disable=import-outside-toplevel
+        import telemetry  # pylint: disable=import-outside-toplevel
+        controller.TELEMETRY_BINARY = telemetry.ALL
+        link = Link(sys.stdout)
+        sys.stdout = link
+    try:
+        run_main(args.root)
+    finally:
+        if link is not None:
+            sys.stdout = link.echo
+    summary(sim, args.show)
+    if link is not None:
+        with open(args.telemetry, 'wb') as f:
+            f.write(link.data)
+        with open(os.path.splitext(args.telemetry)[0] + '.json', 'w') as f:
+            json.dump(link.truth(), f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'[SIM ] {len(link.data)} bytes of serial output, {link.flushes} telemetry flushes')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1 @@
+# Fake micropython-lib `usb` package, see sim/usb/device.
@@ -0,0 +1,44 @@
+# Fake `usb.device`. The host enumerates the device a while after init(), and
+# HID interfaces only report being open after that.
+
+from sim import world
+
+# Time from init() until the host has configured the device
+ENUMERATION_US = 300_000
+
+
+class Device:
+    """The simulated USB device and its interfaces."""
+    def __init__(self):
+        self.interfaces = ()
+        self.open_at = None
+
+    def init(self, *interfaces, builtin_driver: bool=False):
+        self.interfaces = interfaces
+        self.open_at = world.current.clock.now + ENUMERATION_US
+        for interface in interfaces:
+            interface._device = self
+
+    def active(self) -> bool:
+        return self.open_at is not None and world.current.clock.now >= self.open_at
+
+
+def get() -> Device:
+    if world.current.usb is None:
+        world.current.usb = Device()
+    return world.current.usb
+
+
+class Interface:
+    """Base of the simulated HID interfaces."""
+    def __init__(self):
+        self._device = None
+
+    def is_open(self) -> bool:
+        return self._device is not None and self._device.active()
+
+    def _report(self, kind: str, payload) -> bool:
+        if not self.is_open():
+            return False
+        world.current.report(kind, payload)
+        return True
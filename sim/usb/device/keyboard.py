@@ -0,0 +1,56 @@
+# Fake `usb.device.keyboard`, recording reports as ('keys', (code, ...)).
+
+from sim.usb.device import Interface
+
+
+class KeyCode:
+    A = 4
+    B = 5
+    C = 6
+    D = 7
+    E = 8
+    F = 9
+    G = 10
+    H = 11
+    I = 12
+    J = 13
+    K = 14
+    L = 15
+    M = 16
+    N = 17
+    O = 18
+    P = 19
+    Q = 20
+    R = 21
+    S = 22
+    T = 23
+    U = 24
+    V = 25
+    W = 26
+    X = 27
+    Y = 28
+    Z = 29
+    N1 = 30
+    N2 = 31
+    N3 = 32
+    N4 = 33
+    N5 = 34
+    N6 = 35
+    N7 = 36
+    N8 = 37
+    N9 = 38
+    N0 = 39
+    ENTER = 40
+    ESCAPE = 41
+    BACKSPACE = 42
+    TAB = 43
+    SPACE = 44
+
+
+class KeyboardInterface(Interface):
+    def __init__(self):
+        super().__init__()
+        self.on_led_update = None
+
+    def send_keys(self, down_keys, timeout_ms: int=100) -> bool:
+        return self._report('keys', tuple(down_keys))
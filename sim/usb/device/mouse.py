@@ -0,0 +1,37 @@
+# Fake `usb.device.mouse`, recording reports as ('mouse', (dx, dy, buttons)).
+
+from sim.usb.device import Interface
+
+_BUTTON_LEFT = 1
+_BUTTON_RIGHT = 2
+_BUTTON_MIDDLE = 4
+
+
+class MouseInterface(Interface):
+    def __init__(self, interface_str: str='MicroPython Mouse'):
+        super().__init__()
+        self._buttons = 0
+
+    def _send(self, dx: int=0, dy: int=0) -> bool:
+        if not -127 <= dx <= 127 or not -127 <= dy <= 127:
+            raise ValueError('move out of range')
+        return self._report('mouse', (dx, dy, self._buttons))
+
+    def move_by(self, dx: int, dy: int) -> bool:
+        return self._send(dx, dy)
+
+    def _button(self, mask: int, down: bool) -> bool:
+        if down:
+            self._buttons |= mask
+        else:
+            self._buttons &= ~mask
+        return self._send()
+
+    def click_left(self, down: bool=True) -> bool:
+        return self._button(_BUTTON_LEFT, down)
+
+    def click_right(self, down: bool=True) -> bool:
+        return self._button(_BUTTON_RIGHT, down)
+
+    def click_middle(self, down: bool=True) -> bool:
+        return self._button(_BUTTON_MIDDLE, down)
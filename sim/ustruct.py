@@ -0,0 +1,49 @@
+# Fake `ustruct` for CPython. MicroPython truncates integers that don't fit
+# their format instead of raising, and the drivers rely on it (e.g. packing
+# 0x80 as 'b'), so out of range values are wrapped first.
+
+from struct import calcsize, error, unpack, unpack_from
+import struct
+
+_BITS = {'b': 8, 'B': 8, 'h': 16, 'H': 16, 'i': 32, 'I': 32, 'l': 32, 'L': 32, 'q': 64, 'Q': 64}
+
+
+def _wrap(fmt: str, values: tuple) -> tuple:
+    codes = []
+    count = ''
+    for ch in fmt:
+        if ch.isdigit():
+            count += ch
+            continue
+        n = int(count) if count else 1
+        count = ''
+        if ch in '<>!=@x':
+            continue
+        # A counted string is a single value
+        codes.extend(ch if ch == 's' else ch * n)
+    wrapped = []
+    for code, value in zip(codes, values):
+        bits = _BITS.get(code)
+        if bits is not None and isinstance(value, int):
+            value &= (1 << bits) - 1
+            if code.islower() and value >> (bits - 1):
+                value -= 1 << bits
+        wrapped.append(value)
+    return tuple(wrapped)
+
+
+def pack(fmt: str, *values) -> bytes:
+    try:
+        return struct.pack(fmt, *values)
+    except error:
+        return struct.pack(fmt, *_wrap(fmt, values))
+
+
+def pack_into(fmt: str, buffer, offset: int, *values):
+    try:
+        struct.pack_into(fmt, buffer, offset, *values)
+    except error:
+        struct.pack_into(fmt, buffer, offset, *_wrap(fmt, values))
+
+
+__all__ = ('calcsize', 'pack', 'pack_into', 'unpack', 'unpack_from')
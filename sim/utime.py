@@ -0,0 +1,38 @@
+# Fake `utime` module running on the simulator's virtual clock.
+
+from sim import clock, world
+
+ticks_diff = clock.ticks_diff
+ticks_add = clock.ticks_add
+
+
+def ticks_us() -> int:
+    return world.current.clock.ticks_us()
+
+
+def ticks_ms() -> int:
+    return world.current.clock.ticks_ms()
+
+
+def ticks_cpu() -> int:
+    return world.current.clock.ticks_us()
+
+
+def sleep_us(us: int):
+    world.current.clock.advance(us)
+
+
+def sleep_ms(ms: int):
+    world.current.clock.advance(ms * 1000)
+
+
+def sleep(s: float):
+    world.current.clock.advance(int(s * 1_000_000))
+
+
+def time() -> int:
+    return world.current.clock.now // 1_000_000
+
+
+def time_ns() -> int:
+    return world.current.clock.now * 1000
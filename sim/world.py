@@ -0,0 +1,136 @@
+# The simulated board: clock, pins, buses and recorded HID output.
+#
+# The fake machine/utime/usb modules all look up `current`, so install() has
+# to be called with a World before any code under test is imported.
+
+import sys
+
+from sim.clock import Clock
+
+# World used by the fake modules
+current = None
+
+
+class PinState:
+    """Level, IRQ handler and watchers of one GPIO."""
+    def __init__(self, level: int=0):
+        self.level = level
+        self.mode = -1
+        self.handler = None
+        self.trigger = 0
+        self.pin = None
+        self.listeners = []
+
+
+class SPIBus:
+    """Devices on an SPI bus, each behind its own chip select pin."""
+    def __init__(self, world):
+        self._world = world
+        self.devices = []
+
+    def selected(self):
+        for cs, device in self.devices:
+            if self._world.pin(cs).level == 0:
+                return device
+        return None
+
+
+class World:
+    """Everything outside the MCU."""
+    def __init__(self, seconds: float=None, tick_cost_us: int=1, cpu_scale: float=0.):
+        deadline = int(seconds * 1_000_000) if seconds is not None else None
+        self.clock = Clock(deadline_us=deadline, tick_cost_us=tick_cost_us, cpu_scale=cpu_scale)
+        self.pins = {}
+        self.i2c = {}
+        self.spi = {}
+        # HID reports as (time us, kind, payload), see sim/usb
+        self.reports = []
+        self.usb = None
+
+    def pin(self, pin_id) -> PinState:
+        if (state := self.pins.get(pin_id)) is None:
+            state = PinState()
+            self.pins[pin_id] = state
+        return state
+
+    def drive(self, pin_id, level: int):
+        """
+        Set a pin level, notifying watchers and firing its IRQ on an edge.
+        """
+        state = self.pin(pin_id)
+        if level == state.level:
+            return
+        state.level = level
+        for listener in state.listeners:
+            listener(level)
+        if state.handler is not None and state.trigger & (8 if level else 4):
+            state.handler(state.pin)
+
+    def watch(self, pin_id, listener):
+        self.pin(pin_id).listeners.append(listener)
+
+    def i2c_bus(self, bus_id: int) -> dict:
+        if (bus := self.i2c.get(bus_id)) is None:
+            bus = {}
+            self.i2c[bus_id] = bus
+        return bus
+
+    def spi_bus(self, bus_id: int) -> SPIBus:
+        if (bus := self.spi.get(bus_id)) is None:
+            bus = SPIBus(self)
+            self.spi[bus_id] = bus
+        return bus
+
+    def add_i2c(self, bus_id: int, addr: int, device):
+        self.i2c_bus(bus_id)[addr] = device
+
+    def add_spi(self, bus_id: int, cs, device):
+        bus = self.spi_bus(bus_id)
+        # Chip selects idle high
+        self.pin(cs).level = 1
+        bus.devices.append((cs, device))
+        self.watch(cs, device.select)
+
+    def report(self, kind: str, payload):
+        self.reports.append((self.clock.now, kind, payload))
+
+
+def install(world: World):
+    """
+    Make `world` current and put the fake MicroPython modules in place of
+    the real ones.
+    """
+    global current
+    current = world
+
+    # pylint: disable=import-outside-toplevel
+    import builtins
+
+    import sim.gc
+    import sim.machine
+    import sim.micropython
+    import sim.framebuf
+    import sim.ustruct
+    import sim.utime
+    import sim.usb
+    import sim.usb.device
+    import sim.usb.device.keyboard
+    import sim.usb.device.mouse
+    # pylint: enable=import-outside-toplevel
+
+    modules = sys.modules
+    modules['machine'] = sim.machine
+    modules['micropython'] = sim.micropython
+    modules['utime'] = sim.utime
+    modules['framebuf'] = sim.framebuf
+    modules['usb'] = sim.usb
+    modules['usb.device'] = sim.usb.device
+    modules['usb.device.keyboard'] = sim.usb.device.keyboard
+    modules['usb.device.mouse'] = sim.usb.device.mouse
+    if 'ustruct' not in modules:
+        modules['ustruct'] = sim.ustruct
+    # CPython has no heap counters, the MicroPython Unix port keeps its own
+    if not hasattr(sim.gc.gc, 'mem_free'):
+        modules['gc'] = sim.gc
+    # Drivers use const() without importing it, as the compiler allows
+    builtins.const = sim.micropython.const
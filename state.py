@@ -1,44 +1,176 @@
 # pylint: disable=import-error
+from array import array
+
 from usb.device.keyboard import KeyCode
 # pylint: enable=import-error
 
+# Feature flag bits of SystemState.flags
+MOUSE = 0x01
+KEYBOARD = 0x02
+OLED = 0x04
+RFID = 0x08
+IR = 0x10
+GYRO = 0x20
+ALL = 0x3f
+
+# Snapshot attempts before giving up on a writer that doesn't finish, as when
+# an IRQ handler interrupted it
+_SNAPSHOT_TRIES = 4
+
+# `seq` wraps within MicroPython's small int range, so bumping it never
+# allocates; the range has an even size, so odd still means mid update
+_SEQ_MASK = 0x3fffffff
+
 class EyeMode:
     """Class for eye display mode."""
-    def __init__(self, name: str, rfid: str, key: KeyCode, ir: int):
+    def __init__(self, name: str, rfid: str, key: KeyCode, ir: int, preview: int=None):
         self.name: str = name
         self.rfid: str = rfid
         self.key: KeyCode = key
         self.ir: int = ir
+        # Index of the eye's bitmap in the preview asset pack, looked up by
+        # name when the controller starts if not given
+        self.preview: int = preview
 
         self.pos: int = 0
 
+def _flag(bit: int) -> property:
+    def get(self) -> bool:
+        return bool(self.flags & bit)
+
+    def set(self, enabled: bool):
+        self.seq = (self.seq + 1) & _SEQ_MASK
+        if enabled:
+            self.flags |= bit
+        else:
+            self.flags &= ~bit
+        self.seq = (self.seq + 1) & _SEQ_MASK
+
+    return property(get, set)
+
+class Snapshot:
+    """Consistent copy of the numeric SystemState fields."""
+    def __init__(self):
+        self.gyro = array('f', (0., 0., 0.))
+        self.magnet = array('f', (0., 0., 0.))
+        self.mouse = array('i', (0, 0))
+        self.selection = 0
+        self.flags = 0
+        self.seq = 0
+
 class SystemState:
-    """Class to keep track of system state."""
+    """
+    Class to keep track of system state. Numeric fields live in arrays that
+    are updated in place, and every update bumps `seq` to odd before and to
+    even after, so readers can take lock-free snapshots.
+    """
     def __init__(self, initial_eye: EyeMode):
-        # IN data
-        self.gyro: tuple[float, float, float] = (0., 0., 0.)
-        self.magnet: tuple[float, float, float] = (0., 0., 0.)
+        self.seq = 0
+
+        # IN data, in rad/s and uT
+        self._gyro = array('f', (0., 0., 0.))
+        self._magnet = array('f', (0., 0., 0.))
         self.rfid: str = ''
 
         # OUT data
-        self.mouse: tuple[int, int] = (0, 0)
+        self._mouse = array('i', (0, 0))
         # self.keyboard: str = ''
 
         # Control data
         self.current_eye: EyeMode = initial_eye
         self.next_eye: EyeMode = None
-        self.ordered_selection_idx = 0
-        self.display_line: int = 0
-        self.display_text: list[str] = ['', '', '', '', '', '']
-        self.display_updated: bool = False
+        self._selection = 0
 
         # Feature flags
-        self.enable_gyro: bool = True
-        self.enable_ir: bool = True
-        self.enable_rfid: bool = True
-        self.enable_oled: bool = True
-        self.enable_keyboard: bool = True
-        self.enable_mouse: bool = True
+        self.flags = ALL
 
         self.last_exception: Exception = None
-        self.last_exception_module: str = None
+        self._last_exception_module: str = None
+        # Faults recorded per module
+        self.exception_counts: dict[str, int] = {}
+
+    enable_gyro = _flag(GYRO)
+    enable_ir = _flag(IR)
+    enable_rfid = _flag(RFID)
+    enable_oled = _flag(OLED)
+    enable_keyboard = _flag(KEYBOARD)
+    enable_mouse = _flag(MOUSE)
+
+    def begin_update(self):
+        """
+        Start changing the arrays returned by `gyro`, `magnet` or `mouse` in
+        place; end_update() when done.
+        """
+        self.seq = (self.seq + 1) & _SEQ_MASK
+
+    def end_update(self):
+        self.seq = (self.seq + 1) & _SEQ_MASK
+
+    @property
+    def ordered_selection_idx(self) -> int:
+        return self._selection
+
+    @ordered_selection_idx.setter
+    def ordered_selection_idx(self, idx: int):
+        self.seq = (self.seq + 1) & _SEQ_MASK
+        self._selection = idx
+        self.seq = (self.seq + 1) & _SEQ_MASK
+
+    @property
+    def gyro(self) -> array:
+        return self._gyro
+
+    @gyro.setter
+    def gyro(self, value: tuple[float, float, float]):
+        self._set(self._gyro, value)
+
+    @property
+    def magnet(self) -> array:
+        return self._magnet
+
+    @magnet.setter
+    def magnet(self, value: tuple[float, float, float]):
+        self._set(self._magnet, value)
+
+    @property
+    def mouse(self) -> array:
+        return self._mouse
+
+    @mouse.setter
+    def mouse(self, value: tuple[int, int]):
+        self._set(self._mouse, value)
+
+    def _set(self, slots: array, value):
+        self.seq = (self.seq + 1) & _SEQ_MASK
+        for i in range(len(slots)):
+            slots[i] = value[i]
+        self.seq = (self.seq + 1) & _SEQ_MASK
+
+    def snapshot(self, snap: Snapshot) -> bool:
+        """
+        Copy the numeric fields into `snap` without locking or allocating,
+        safe from an IRQ handler or the other core. Returns False if an
+        update kept running during every attempt.
+        """
+        for _ in range(_SNAPSHOT_TRIES):
+            seq = self.seq
+            if seq & 1:
+                continue
+            snap.gyro[:] = self._gyro
+            snap.magnet[:] = self._magnet
+            snap.mouse[:] = self._mouse
+            snap.selection = self._selection
+            snap.flags = self.flags
+            if self.seq == seq:
+                snap.seq = seq
+                return True
+        return False
+
+    @property
+    def last_exception_module(self) -> str:
+        return self._last_exception_module
+
+    @last_exception_module.setter
+    def last_exception_module(self, module: str):
+        self._last_exception_module = module
+        self.exception_counts[module] = self.exception_counts.get(module, 0) + 1
@@ -0,0 +1,135 @@
+# Binary telemetry over the USB serial link.
+#
+# Records are packed into a preallocated buffer and written out in bulk at a
+# bounded rate, instead of formatting text on every loop. Each record is
+#   sync (0xA5), type (u8), payload length (u8), payload
+# with little endian payloads:
+#   SAMPLE  seq (u8), ticks_us (u32), gyro x/y/z (i16, mrad/s),
+#           mouse x/y (i8), input/process/output/bus stage time (u16, us),
+#           feature flags (u8)
+#   EVENT   seq (u8), ticks_us (u32), channel (u8), arg (u8), value (u32)
+# The sequence number is shared by all records, so a gap tells the host how
+# many records were dropped. Text output is kept for the REPL, gated per
+# channel; both masks can be changed at runtime.
+
+# pylint: disable=import-error
+import sys
+
+import ustruct
+from utime import ticks_ms, ticks_us, ticks_diff
+# pylint: enable=import-error
+
+SYNC = 0xA5
+
+# Record types
+SAMPLE = 1
+EVENT = 2
+
+_HEADER_SIZE = 3
+_SAMPLE = '<BIhhhbbHHHHB'
+_SAMPLE_SIZE = 22
+_EVENT = '<BIBBI'
+_EVENT_SIZE = 11
+
+# Channels
+GYRO = 0x01
+DISP = 0x02
+RFID = 0x04
+IR = 0x08
+CTRL = 0x10
+ALL = 0x1f
+
+
+def _clamp(value: int, limit: int) -> int:
+    if value > limit:
+        return limit
+    if value < -limit:
+        return -limit
+    return value
+
+
+class Telemetry:
+    """Buffered binary records plus channel-gated text output."""
+    def __init__(self, out=None, size: int=2048, flush_ms: int=50, binary: int=0, text: int=ALL):
+        # Channels emitting binary records and printing text
+        self.binary = binary
+        self.text = text
+        self.flush_ms = flush_ms
+        self.dropped = 0
+        self.written = 0
+
+        self._out = out if out is not None else sys.stdout.buffer
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._len = 0
+        self._seq = 0
+        self._flushed = ticks_ms()
+
+    def log(self, channel: int, text: str):
+        if self.text & channel:
+            print(text)
+
+    def _record(self, rtype: int, size: int) -> int:
+        # Reserve a record, returning the payload offset or -1 if full
+        pos = self._len
+        if pos + _HEADER_SIZE + size > len(self._buf):
+            self.dropped += 1
+            self._seq = (self._seq + 1) & 0xff
+            return -1
+        buf = self._buf
+        buf[pos] = SYNC
+        buf[pos + 1] = rtype
+        buf[pos + 2] = size
+        self._len = pos + _HEADER_SIZE + size
+        return pos + _HEADER_SIZE
+
+    def sample(self, gyro, mouse, t_input: int, t_process: int, t_output: int, t_bus: int, flags: int):
+        """
+        Queue a SAMPLE record of one loop iteration: gyro in rad/s, mouse
+        deltas and stage times in us.
+        """
+        if not self.binary & GYRO:
+            return
+        pos = self._record(SAMPLE, _SAMPLE_SIZE)
+        if pos < 0:
+            return
+        ustruct.pack_into(_SAMPLE, self._buf, pos, self._seq, ticks_us(),
+                          _clamp(int(gyro[0] * 1000), 32767),
+                          _clamp(int(gyro[1] * 1000), 32767),
+                          _clamp(int(gyro[2] * 1000), 32767),
+                          _clamp(mouse[0], 127), _clamp(mouse[1], 127),
+                          min(t_input, 0xffff), min(t_process, 0xffff),
+                          min(t_output, 0xffff), min(t_bus, 0xffff), flags)
+        self._seq = (self._seq + 1) & 0xff
+
+    def event(self, channel: int, arg: int, value: int):
+        """
+        Queue an EVENT record for `channel` if it is enabled.
+        """
+        if not self.binary & channel:
+            return
+        pos = self._record(EVENT, _EVENT_SIZE)
+        if pos < 0:
+            return
+        ustruct.pack_into(_EVENT, self._buf, pos, self._seq, ticks_us(), channel, arg & 0xff, value & 0xffffffff)
+        self._seq = (self._seq + 1) & 0xff
+
+    def poll(self) -> bool:
+        """
+        Write out queued records if `flush_ms` passed since the last write.
+        """
+        if not self._len:
+            return False
+        now = ticks_ms()
+        if ticks_diff(now, self._flushed) < self.flush_ms:
+            return False
+        self._flushed = now
+        self.flush()
+        return True
+
+    def flush(self):
+        n = self._len
+        if n:
+            self._out.write(self._view[:n])
+            self.written += n
+            self._len = 0
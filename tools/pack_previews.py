@@ -0,0 +1,132 @@
+"""
+Build an eye preview asset pack (see display/assets.py) from PBM images.
+
+Runs under CPython on the host:
+
+    python tools/pack_previews.py previews.skp default.pbm vu.pbm ...
+
+Each image is packed under its file name without the extension, which the
+controller matches with the eye names. Images must all have the same size,
+at most the preview slot left of the OLED layout text. Copy the result to the
+device filesystem (e.g. `mpremote cp previews.skp :`).
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+# Pack format and preview slot, see display/assets.py and PREVIEW_* in
+# controller.py; those modules need MicroPython to import
+MAGIC = b'SKP2'
+NAME_SIZE = 16
+SLOT_WIDTH = 28
+SLOT_HEIGHT = 54
+
+
+def read_pbm(path: str) -> tuple[int, int, bytes]:
+    """Read a binary (P4) PBM image, returning (width, height, rows)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    fields = []
+    pos = 0
+    while len(fields) < 3:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':
+            pos = data.index(b'\n', pos)
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b'P4':
+        raise ValueError(f'{path}: not a binary PBM (P4) image')
+    width, height = int(fields[1]), int(fields[2])
+    return width, height, data[pos + 1:pos + 1 + ((width + 7) // 8) * height]
+
+
+def to_mono_vlsb(width: int, height: int, rows: bytes) -> bytes:
+    """Convert row-major MSB-first pixels to SSD1306 MONO_VLSB pages."""
+    stride = (width + 7) // 8
+    out = bytearray(width * ((height + 7) // 8))
+    for y in range(height):
+        for x in range(width):
+            if rows[y * stride + x // 8] & (0x80 >> (x % 8)):
+                out[(y // 8) * width + x] |= 1 << (y % 8)
+    return bytes(out)
+
+
+def encode_rle(data: bytes) -> bytes:
+    """PackBits-style encoding matching AssetPack.load()."""
+    out = bytearray()
+    literal = bytearray()
+    i = 0
+    while i < len(data):
+        run = 1
+        while i + run < len(data) and run < 129 and data[i + run] == data[i]:
+            run += 1
+        if run >= 2:
+            if literal:
+                out += bytes((len(literal) - 1,)) + literal
+                literal = bytearray()
+            out += bytes((run + 0x7e, data[i]))
+            i += run
+            continue
+        literal.append(data[i])
+        if len(literal) == 128:
+            out += bytes((127,)) + literal
+            literal = bytearray()
+        i += 1
+    if literal:
+        out += bytes((len(literal) - 1,)) + literal
+    return bytes(out)
+
+
+def pack(bitmaps: list[bytes], names: list[str], width: int, height: int) -> bytes:
+    streams = [encode_rle(bitmap) for bitmap in bitmaps]
+    header = struct.pack('<4sHBB', MAGIC, len(streams), width, height)
+    offset = len(header) + (6 + NAME_SIZE) * len(streams)
+    index = b''
+    for stream, name in zip(streams, names):
+        index += struct.pack(f'<IH{NAME_SIZE}s', offset, len(stream), name.encode())
+        offset += len(stream)
+    return header + index + b''.join(streams)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('output')
+    parser.add_argument('images', nargs='+')
+    args = parser.parse_args(argv)
+
+    size = None
+    bitmaps = []
+    names = []
+    for path in args.images:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if len(name.encode()) > NAME_SIZE:
+            parser.error(f'{path}: name longer than {NAME_SIZE} bytes')
+        if name in names:
+            parser.error(f'{path}: {name} packed twice')
+        width, height, rows = read_pbm(path)
+        if width > SLOT_WIDTH or height > SLOT_HEIGHT:
+            parser.error(f'{path}: {width}x{height} exceeds the {SLOT_WIDTH}x{SLOT_HEIGHT} preview slot')
+        if size is None:
+            size = (width, height)
+        elif size != (width, height):
+            parser.error(f'{path}: {width}x{height} differs from {size[0]}x{size[1]}')
+        bitmaps.append(to_mono_vlsb(width, height, rows))
+        names.append(name)
+
+    data = pack(bitmaps, names, *size)
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    raw = sum(len(b) for b in bitmaps)
+    print(f'{args.output}: {len(bitmaps)} bitmaps, {len(data)} bytes ({raw} raw)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
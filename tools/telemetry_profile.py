@@ -0,0 +1,253 @@
+"""
+Decode the controller's binary telemetry (see telemetry.py) and profile it.
+
+Runs under CPython on the host, reading a serial port, a pty or a recorded
+capture file:
+
+    python tools/telemetry_profile.py /dev/ttyACM0 --seconds 30 --record run.bin
+    python tools/telemetry_profile.py run.bin --plot mouse.png
+
+--check compares what was decoded with a summary of the records actually
+sent, as written by `python -m sim.run --telemetry FILE`. The simulator
+capture sim/telemetry_capture.bin, text and stray headers included, checks
+the decoder round trip:
+
+    python tools/telemetry_profile.py sim/telemetry_capture.bin --check sim/telemetry_capture.json
+
+Prints per-stage loop latency statistics and histograms, the sample rate and
+the number of records dropped on the device. Text printed on the same link is
+skipped. Requires NumPy; reading serial ports requires pyserial and --plot
+requires matplotlib.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+SYNC = 0xA5
+SAMPLE = 1
+EVENT = 2
+HEADER_SIZE = 3
+TICKS_PERIOD = 1 << 30  # MicroPython ticks_us wraps at 2**30
+
+SAMPLE_DTYPE = np.dtype([
+    ('seq', '<u1'), ('t_us', '<u4'),
+    ('gx', '<i2'), ('gy', '<i2'), ('gz', '<i2'),
+    ('mx', 'i1'), ('my', 'i1'),
+    ('input', '<u2'), ('process', '<u2'), ('output', '<u2'), ('bus', '<u2'),
+    ('flags', '<u1'),
+])
+EVENT_DTYPE = np.dtype([
+    ('seq', '<u1'), ('t_us', '<u4'), ('channel', '<u1'), ('arg', '<u1'), ('value', '<u4'),
+])
+PAYLOADS = {SAMPLE: SAMPLE_DTYPE, EVENT: EVENT_DTYPE}
+
+STAGES = ('input', 'process', 'output', 'bus')
+CHANNELS = {0x01: 'gyro', 0x02: 'disp', 0x04: 'rfid', 0x08: 'ir', 0x10: 'ctrl'}
+
+
+def capture(source: str, seconds: float, baud: int) -> bytes:
+    """Read raw bytes from a capture file, or from a serial port / pty for `seconds`."""
+    if not source.startswith(('/dev/', 'COM')):
+        with open(source, 'rb') as f:
+            return f.read()
+
+    try:
+        import serial  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        serial = None
+    if serial is not None:
+        port = serial.Serial(source, baud, timeout=0.1)
+        read = lambda: port.read(4096)
+    else:
+        port = open(source, 'rb', buffering=0)  # pylint: disable=consider-using-with
+        read = lambda: port.read(4096)
+
+    chunks = []
+    end = time.monotonic() + seconds
+    try:
+        while time.monotonic() < end:
+            chunk = read()
+            if chunk:
+                chunks.append(chunk)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        port.close()
+    return b''.join(chunks)
+
+
+def frame(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Locate records in `data`, returning their start offsets and types. Any
+    0xA5 byte followed by a known type and its payload length is a
+    candidate. Text on the link can hold such a header too, so a candidate is
+    only accepted when its sequence number continues a neighbour: the last
+    accepted record, or a candidate starting exactly where it ends or ending
+    exactly where it starts (records flushed together are back to back).
+    Candidates starting inside an accepted record are skipped.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts = np.flatnonzero(buf[:-HEADER_SIZE] == SYNC)
+    types = buf[starts + 1]
+    sizes = buf[starts + 2].astype(np.int64)
+    valid = np.zeros(len(starts), dtype=bool)
+    for rtype, dtype in PAYLOADS.items():
+        valid |= (types == rtype) & (sizes == dtype.itemsize)
+    valid &= starts + HEADER_SIZE + sizes <= len(buf)
+    starts, types, sizes = starts[valid], types[valid], sizes[valid]
+
+    seqs = buf[starts + HEADER_SIZE].astype(np.int64)
+    ends = starts + HEADER_SIZE + sizes
+    after = np.searchsorted(starts, ends)
+    has_after = np.flatnonzero(after < len(starts))
+    chained = np.zeros(len(starts), dtype=bool)
+    linked = has_after[(starts[after[has_after]] == ends[has_after]) &
+                       (seqs[after[has_after]] == (seqs[has_after] + 1) % 256)]
+    chained[linked] = True
+    chained[after[linked]] = True
+
+    keep = np.zeros(len(starts), dtype=bool)
+    end = 0
+    last = -1
+    for i, start in enumerate(starts):
+        if start < end:
+            continue
+        if not chained[i] and seqs[i] != (last + 1) % 256:
+            continue
+        keep[i] = True
+        end = ends[i]
+        last = seqs[i]
+    return starts[keep], types[keep]
+
+
+def decode(data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split `data` into SAMPLE and EVENT record arrays, plus the sequence numbers of all records."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts, types = frame(data)
+    records = []
+    for rtype, dtype in PAYLOADS.items():
+        offsets = starts[types == rtype] + HEADER_SIZE
+        rows = buf[offsets[:, None] + np.arange(dtype.itemsize)]
+        records.append(np.ascontiguousarray(rows).view(dtype).reshape(-1))
+    seq = buf[starts + HEADER_SIZE]
+    return records[0], records[1], seq
+
+
+def dropped(seq: np.ndarray) -> int:
+    if len(seq) < 2:
+        return 0
+    return int(((np.diff(seq.astype(np.int16)) - 1) % 256).sum())
+
+
+def elapsed_us(t_us: np.ndarray) -> np.ndarray:
+    """Microseconds since the first sample, unwrapping the device tick counter."""
+    steps = np.diff(t_us.astype(np.int64)) % TICKS_PERIOD
+    return np.concatenate(([0], np.cumsum(steps)))
+
+
+def histogram(values: np.ndarray, width: int=40) -> list[str]:
+    """Text histogram over log2 buckets."""
+    edges = 2 ** np.arange(0, max(1, int(values.max()).bit_length()) + 1)
+    counts, _ = np.histogram(values, bins=np.concatenate(([0], edges)))
+    scale = width / max(1, counts.max())
+    lines = []
+    for lo, hi, count in zip(np.concatenate(([0], edges[:-1])), edges, counts):
+        if count:
+            lines.append(f'    {lo:>6}-{hi - 1:<6} {count:>9} {"#" * max(1, int(count * scale))}')
+    return lines
+
+
+def summary(samples: np.ndarray, events: np.ndarray, seq: np.ndarray) -> dict:
+    """Counts of the decoded records, in the format of sim.run --telemetry."""
+    return {
+        'samples': len(samples),
+        'events': len(events),
+        'dropped': dropped(seq),
+        'sample_t_us': [int(samples['t_us'][0]), int(samples['t_us'][-1])] if len(samples) else [],
+    }
+
+
+def report(samples: np.ndarray, events: np.ndarray, seq: np.ndarray, show_histograms: bool):
+    print(f'{len(samples)} samples, {len(events)} events, {dropped(seq)} records dropped')
+    if len(samples) > 1:
+        t = elapsed_us(samples['t_us'])
+        dt = np.diff(t)
+        print(f'duration {t[-1] / 1e6:.2f} s, sample rate {1e6 * (len(t) - 1) / t[-1]:.1f} Hz '
+              f'(median interval {np.median(dt):.0f} us, max {dt.max()} us)')
+
+    if len(samples):
+        total = sum(samples[stage].astype(np.int64) for stage in STAGES)
+        print(f'{"stage":>8} {"min":>7} {"mean":>9} {"p50":>7} {"p99":>7} {"max":>7}  (us)')
+        for name, values in [(stage, samples[stage]) for stage in STAGES] + [('total', total)]:
+            print(f'{name:>8} {values.min():>7} {values.mean():>9.1f} {np.percentile(values, 50):>7.0f} '
+                  f'{np.percentile(values, 99):>7.0f} {values.max():>7}')
+            if show_histograms:
+                print('\n'.join(histogram(values)))
+
+    if len(events):
+        for channel, name in CHANNELS.items():
+            count = int((events['channel'] == channel).sum())
+            if count:
+                print(f'{name} events: {count}')
+
+
+def plot(samples: np.ndarray, path: str):
+    import matplotlib  # pylint: disable=import-outside-toplevel
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt  # pylint: disable=import-outside-toplevel
+
+    t = elapsed_us(samples['t_us']) / 1e6
+    fig, (ax_gyro, ax_mouse) = plt.subplots(2, 1, sharex=True, figsize=(12, 6))
+    for axis in ('gx', 'gy', 'gz'):
+        ax_gyro.plot(t, samples[axis] / 1000, label=axis, linewidth=0.6)
+    ax_gyro.set_ylabel('rad/s')
+    ax_gyro.legend(loc='upper right')
+    ax_mouse.step(t, samples['mx'], label='mouse x', where='post', linewidth=0.6)
+    ax_mouse.step(t, samples['my'], label='mouse y', where='post', linewidth=0.6)
+    ax_mouse.set_ylabel('counts')
+    ax_mouse.set_xlabel('s')
+    ax_mouse.legend(loc='upper right')
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('source', help='capture file, serial port or pty')
+    parser.add_argument('--seconds', type=float, default=10., help='capture time for ports')
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--record', metavar='FILE', help='save the raw capture')
+    parser.add_argument('--plot', metavar='FILE', help='save a gyro/mouse plot')
+    parser.add_argument('--no-histograms', action='store_true')
+    parser.add_argument('--check', metavar='FILE', help='compare with a JSON summary of the records sent')
+    args = parser.parse_args(argv)
+
+    data = capture(args.source, args.seconds, args.baud)
+    if args.record:
+        with open(args.record, 'wb') as f:
+            f.write(data)
+
+    samples, events, seq = decode(data)
+    report(samples, events, seq, not args.no_histograms)
+    if args.plot and len(samples):
+        plot(samples, args.plot)
+    if args.check:
+        with open(args.check) as f:
+            expected = json.load(f)
+        decoded = summary(samples, events, seq)
+        problems = [f'{key}: decoded {decoded.get(key)}, sent {value}'
+                    for key, value in expected.items() if decoded.get(key) != value]
+        for problem in problems:
+            print(f'check failed, {problem}')
+        if problems:
+            return 1
+        print('check passed')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))